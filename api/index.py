@@ -1,169 +1,335 @@
 from http.server import BaseHTTPRequestHandler
 import json
-import requests
+import logging
 import os
-import pandas as pd
-from io import BytesIO
-from urllib.parse import parse_qs, urlparse, urlencode
-from datetime import datetime
+import time
+from urllib.parse import parse_qs, urlparse
+
+import artifacts
+import batch
+import cache
+import compression
+import exam_index
+import exporter
+import geo
+import fastjson
+import local_search
+import metrics
+import passthrough
+import registry
+import rollup
+import store
+import upstream
+import window
+from fetcher import IncompleteFetchError, extract_items, fetch_all_hospitals
 
 # 환경 변수에서 설정 가져오기
 API_KEY = os.environ.get('API_KEY')
 BASE_URL = os.environ.get('BASE_URL')
 
-def format_hospital_for_gpts(hospital):
-    """GPTs용 병원 정보 포맷팅"""
-    exam_types = []
-    if hospital.get('grenChrgTypeCd') == '1': exam_types.append('일반검진')
-    if hospital.get('ichkChrgTypeCd') == '1': exam_types.append('영유아검진')
-    if hospital.get('bcExmdChrgTypeCd') == '0': exam_types.append('유방암검진')
-    if hospital.get('ccExmdChrgTypeCd') == '0': exam_types.append('대장암검진')
-    if hospital.get('cvxcaExmdChrgTypeCd') == '0': exam_types.append('자궁경부암검진')
-    if hospital.get('lvcaExmdChrgTypeCd') == '0': exam_types.append('간암검진')
-    if hospital.get('stmcaExmdChrgTypeCd') == '0': exam_types.append('위암검진')
-    if hospital.get('mchkChrgTypeCd') == '0': exam_types.append('구강검진')
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def format_hospital_for_gpts(hospital, exam_mask=None):
+    """GPTs용 병원 정보 포맷팅 (검진종류는 비트마스크로 한 번에 변환)"""
+    if exam_mask is None:
+        exam_mask = exam_index.exam_mask(hospital)
 
     return {
         "기관명": hospital.get('hmcNm', '-'),
         "전화번호": hospital.get('hmcTelNo', '-'),
         "주소": hospital.get('locAddr', '-'),
         "기관종별": hospital.get('ykindnm', '-'),
-        "검진종류": ', '.join(exam_types) if exam_types else '-'
+        "검진종류": exam_index.exam_labels(exam_mask)
     }
 
 def get_all_hospitals():
-    """모든 검진기관 데이터 조회"""
-    all_hospitals = []
-    page_no = 1
-    max_retries = 3
-    items_per_page = 20  # 한 번에 가져올 데이터 수 줄임
-    
-    while True:
-        retries = 0
-        while retries < max_retries:
-            try:
-                api_params = {
-                    'serviceKey': API_KEY,
-                    'numOfRows': str(items_per_page),
-                    'pageNo': str(page_no),
-                    '_type': 'json'
-                }
-                
-                response = requests.get(BASE_URL, params=api_params, timeout=5)  # 타임아웃 설정
-                if response.status_code != 200:
-                    retries += 1
-                    continue
-                    
-                data = response.json()
-                if data['response']['header']['resultCode'] != '00':
-                    retries += 1
-                    continue
-                    
-                items = data['response']['body']['items'].get('item', [])
-                if not items:
-                    return all_hospitals
-                    
-                if not isinstance(items, list):
-                    items = [items]
-                    
-                all_hospitals.extend(items)
-                total_count = int(data['response']['body']['totalCount'])
-                
-                if len(all_hospitals) >= min(total_count, 1000):  # 최대 1000개로 제한
-                    return all_hospitals
-                    
-                page_no += 1
-                break
-                
-            except Exception as e:
-                print(f"Error on page {page_no}: {str(e)}")
-                retries += 1
-                if retries >= max_retries:
-                    return all_hospitals
-    
-    return all_hospitals
-
-def create_excel(hospitals):
-    """검진기관 데이터로 엑셀 파일 생성"""
-    # 필요한 컬럼만 선택하여 처리
-    selected_columns = [
-        'hmcNm', 'hmcNo', 'hmcTelNo', 'locAddr', 'locPostNo', 'ykindnm',
-        'grenChrgTypeCd', 'ichkChrgTypeCd', 'bcExmdChrgTypeCd', 'ccExmdChrgTypeCd',
-        'cvxcaExmdChrgTypeCd', 'lvcaExmdChrgTypeCd', 'stmcaExmdChrgTypeCd', 'mchkChrgTypeCd'
-    ]
-    
-    # 데이터 정리
-    df = pd.DataFrame(hospitals)[selected_columns]
-    
-    # 컬럼명 한글로 변경
-    column_mapping = {
-        'hmcNm': '검진기관명',
-        'hmcNo': '검진기관번호',
-        'hmcTelNo': '전화번호',
-        'locAddr': '주소',
-        'locPostNo': '우편번호',
-        'ykindnm': '기관종별',
-        'grenChrgTypeCd': '일반검진여부',
-        'ichkChrgTypeCd': '영유아검진여부',
-        'bcExmdChrgTypeCd': '유방암검진여부',
-        'ccExmdChrgTypeCd': '대장암검진여부',
-        'cvxcaExmdChrgTypeCd': '자궁경부암검진여부',
-        'lvcaExmdChrgTypeCd': '간암검진여부',
-        'stmcaExmdChrgTypeCd': '위암검진여부',
-        'mchkChrgTypeCd': '구강검진여부'
+    """모든 검진기관 데이터 조회 (페이지 병렬 조회, 일부 페이지를 받지 못하면 IncompleteFetchError)"""
+    try:
+        hospitals, report = fetch_all_hospitals(BASE_URL, API_KEY)
+    except IncompleteFetchError as e:
+        logger.warning(f"Fetch report (incomplete): {json.dumps(e.report, ensure_ascii=False)}")
+        raise
+    logger.info(f"Fetch report: {json.dumps(report, ensure_ascii=False)}")
+    return hospitals
+
+def gpts_api_params(search_params):
+    """GPTs 검색 조건을 API 호출 파라미터로 변환"""
+    api_params = {
+        'serviceKey': API_KEY,
+        'numOfRows': search_params.get('numOfRows', '5'),  # GPTs용으로 기본값 5개로 제한
+        'pageNo': search_params.get('pageNo', '1'),
+        '_type': 'json'
     }
     
-    df = df.rename(columns=column_mapping)
-    
-    # 검진여부 값 변환 (메모리 효율적인 방식으로 수정)
-    exam_columns = [
-        '일반검진여부', '영유아검진여부', '유방암검진여부', '대장암검진여부',
-        '자궁경부암검진여부', '간암검진여부', '위암검진여부', '구강검진여부'
-    ]
-    
-    for col in exam_columns:
-        df[col] = df[col].map({'1': '가능', '0': '가능', '2': '불가능'})
+    # 선택적 파라미터 추가
+    optional_params = ['hmcNm', 'siDoCd', 'siGunGuCd', 'locAddr', 'hmcRdatCd', 'hchType']
+    for param in optional_params:
+        if param in search_params:
+            api_params[param] = search_params[param]
+    return api_params
+
+def gpts_nearest_result(search_params, api_params):
+    """위치 검색 (lat/lng 또는 postNo): 우편번호 좌표 인덱스에서 가까운 순으로 조회"""
+    nearest = geo.nearest_hospitals({**search_params, **api_params})
+    return {
+        "status": "success",
+        "total_count": len(nearest),
+        "current_page": 1,
+        "hospitals": [
+            dict(format_hospital_for_gpts(hospital, mask), **{"거리(km)": round(distance, 2)})
+            for hospital, distance, mask in nearest
+        ]
+    }
+
+def gpts_response_data(response):
+    """API 응답 본문 (HTTP 200이 아니면 오류)"""
+    if response.status_code != 200:
+        raise Exception(f"API Error: Status code {response.status_code}")
+    try:
+        with metrics.span('parse'):
+            return fastjson.load_response(response)
+    except Exception as e:
+        raise Exception(f"Failed to parse API response: {str(e)}")
+
+@metrics.timed('format')
+def gpts_result(data, api_params, exam_masks=None):
+    """API 응답(또는 로컬 조회 결과)을 GPTs용 응답 형식으로 변환
+
+    exam_masks는 로컬 조회 결과의 항목별 검진종류 비트마스크 (원본 API 응답이면 None)
+    """
+    try:
+        if data['response']['header']['resultCode'] == '00':
+            # 결과가 없으면 items가 빈 문자열로 옴
+            items = extract_items(data)
+            # 로컬 조회 결과에는 저장할 때 계산한 검진종류 비트마스크가 함께 옴 (원본 API 응답이면 여기서 계산)
+            if exam_masks is None or len(exam_masks) != len(items):
+                exam_masks = [None] * len(items)
+            
+            # GPTs용 응답 형식
+            return {
+                "status": "success",
+                "total_count": data['response']['body'].get('totalCount', 0),
+                "current_page": int(api_params['pageNo']),
+                "hospitals": [format_hospital_for_gpts(hospital, mask) for hospital, mask in zip(items, exam_masks)]
+            }
+    except Exception as e:
+        raise Exception(f"Failed to parse API response: {str(e)}")
     
-    # 엑셀 파일 생성 (최적화된 설정)
-    excel_buffer = BytesIO()
-    with pd.ExcelWriter(excel_buffer, engine='openpyxl', mode='w') as writer:
-        df.to_excel(writer, index=False, sheet_name='검진기관목록')
+    raise Exception("API Error: Status code 200")
+
+def search_hospitals_for_gpts(search_params):
+    """GPTs용 검진기관 검색 (search_params는 쿼리 파라미터 dict)"""
+    api_params = gpts_api_params(search_params)
+    if geo.is_geo_query(search_params):
+        return gpts_nearest_result(search_params, api_params)
+
+    # 로컬 데이터(검색 엔진, 검진종류 인덱스, 스냅샷)로 먼저 조회하고, 불가능한 경우에만 API 호출
+    data, exam_masks = local_search.query_with_masks({**search_params, **api_params})
+    if data is None:
+        data = gpts_response_data(cache.cached_get(BASE_URL, params=api_params))
+    return gpts_result(data, api_params, exam_masks)
+
+def web_api_params(params):
+    """웹 UI 검색 조건을 API 호출 파라미터로 변환 (params는 쿼리 파라미터 dict)"""
+    api_params = {
+        'serviceKey': API_KEY,
+        'numOfRows': params.get('numOfRows', '10'),
+        'pageNo': params.get('pageNo', '1'),
+        '_type': 'json'
+    }
     
-    return excel_buffer.getvalue()
+    optional_params = ['hmcNm', 'siDoCd', 'siGunGuCd', 'locAddr', 'hmcRdatCd', 'hchType']
+    for param in optional_params:
+        if param in params:
+            api_params[param] = params[param]
+    return api_params
+
+def parse_web_response(response):
+    """웹 UI용 API 응답 확인 후 JSON으로 변환"""
+    if response.status_code != 200:
+        raise Exception(f"API Error: Status code {response.status_code}")
+
+    response_text = response.text
+    if not response_text:
+        raise Exception("Empty response from API")
+
+    try:
+        with metrics.span('parse'):
+            return response.json()
+    except ValueError:
+        raise Exception(f"Invalid JSON response: {response_text[:200]}...")
+
+class _CountingWriter:
+    """응답 바이트 수를 세는 wfile 래퍼"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.count = 0
+
+    def write(self, data):
+        self.count += len(data)
+        return self.wfile.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.wfile, name)
 
 class handler(BaseHTTPRequestHandler):
+    _metrics = None
+
+    def setup(self):
+        super().setup()
+        self.wfile = _CountingWriter(self.wfile)
+
+    def send_response(self, code, message=None):
+        super().send_response(code, message)
+        if self._metrics is not None:
+            self._metrics.status = code
+
+    def end_headers(self):
+        # 본문 전송 전까지의 단계별 소요 시간
+        if self._metrics is not None:
+            self.send_header('Server-Timing', metrics.server_timing(self._metrics))
+        super().end_headers()
+        self._body_start = self.wfile.count
+
+    def _measured(self, handle):
+        """요청 처리 시간/상태 코드/응답 크기 측정"""
+        with metrics.request(urlparse(self.path).path) as timer:
+            self._metrics = timer
+            self._body_start = self.wfile.count
+            try:
+                handle()
+            finally:
+                self._metrics = None
+                timer.bytes_out = self.wfile.count - self._body_start
+                if timer.status == 404:
+                    timer.route = 'other'  # 알 수 없는 경로로 라벨이 늘어나지 않도록
+
+    def _send_json(self, status, payload):
+        with metrics.span('serialize'):
+            body = fastjson.dumps(payload)
+        self._send_body(status, body)
+
+    def _send_body(self, status, body, content_type='application/json'):
+        # Accept-Encoding에 맞춰 압축 (같은 본문의 압축본은 캐시에서 재사용)
+        body, headers = compression.encode_body(body, content_type, self.headers.get('Accept-Encoding'), status)
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_window(self, params):
+        """offset/limit(또는 cursor) 구간을 NDJSON으로 스트리밍 (HTTP/1.1이면 chunked)"""
+        try:
+            result = window.open_window(params, BASE_URL, API_KEY)
+        except ValueError as e:
+            self._send_json(400, {'status': 'error', 'message': str(e)})
+            return
+
+        chunked = self.protocol_version == 'HTTP/1.1'
+        self.send_response(200)
+        self.send_header('Content-type', window.CONTENT_TYPE)
+        for key, value in result.headers().items():
+            self.send_header(key, value)
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+
+        chunks = result.iter_ndjson()
+        try:
+            for chunk in chunks:
+                self.wfile.write(b'%X\r\n%s\r\n' % (len(chunk), chunk) if chunked else chunk)
+                self.wfile.flush()
+            if chunked:
+                self.wfile.write(b'0\r\n\r\n')
+        except OSError as e:
+            # 클라이언트가 연결을 끊음 (남은 페이지는 받지 않음)
+            logger.info(f"Window stream aborted: {str(e)}")
+        finally:
+            chunks.close()
+
+    def do_POST(self):
+        self._measured(self._handle_post)
+
     def do_GET(self):
+        self._measured(self._handle_get)
+
+    def _handle_post(self):
+        try:
+            parsed_path = urlparse(self.path)
+            logger.info(f"Requested path: {parsed_path.path}")
+            
+            # GPTs용 일괄 검색: {"searches": [{검색 조건}, ...]}
+            if parsed_path.path == '/api/gpts/hospitals/batch':
+                try:
+                    # 본문을 읽기 전에 크기를 확인 (잘못된 헤더나 너무 큰 본문은 읽지 않고 400)
+                    length = batch.body_length(self.headers.get('Content-Length'))
+                    body = json.loads(self.rfile.read(length) or b'null')
+                    specs = batch.parse_specs(body)
+                except ValueError as e:
+                    self.close_connection = True  # 읽지 않은 본문이 남아 있을 수 있음
+                    self._send_json(400, {'status': 'error', 'message': str(e)})
+                    return
+                
+                started = time.perf_counter()
+                results = batch.run_batch(specs, search_hospitals_for_gpts)
+                self._send_json(200, {
+                    'status': 'success',
+                    'count': len(results),
+                    'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+                    'results': results
+                })
+                return
+            
+            self._send_json(404, {'status': 'error', 'message': 'Not Found'})
+            
+        except Exception as e:
+            logger.error(f"Error in handler: {str(e)}")
+            self._send_json(500, {'status': 'error', 'message': str(e)})
+
+    def _handle_get(self):
         try:
             # URL 파싱
             parsed_path = urlparse(self.path)
             print(f"Requested path: {parsed_path.path}")
             
-            # 엑셀 다운로드 요청 처리
+            # 엑셀 다운로드 요청 처리 (format=xlsx|csv|ndjson)
+            # 데이터 버전별로 미리 만들어 둔 파일을 ETag/Last-Modified와 함께 전송
             if parsed_path.path == '/api/hospitals/excel':
-                print("Starting Excel download process...")
-                
-                # 모든 검진기관 데이터 조회
-                hospitals = get_all_hospitals()
-                print(f"Retrieved {len(hospitals)} hospitals")
-                
-                if not hospitals:
-                    raise Exception("No data available")
-                
-                # 엑셀 파일 생성
-                excel_data = create_excel(hospitals)
+                fmt = parse_qs(parsed_path.query).get('format', ['xlsx'])[0]
+                if fmt not in exporter.FORMATS:
+                    raise Exception(f"Unsupported format: {fmt}")
                 
-                # 파일명 생성
-                filename = f"검진기관목록_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+                artifact = artifacts.get_artifact(fmt, get_all_hospitals, self.headers.get('Accept-Encoding'))
+                headers = artifacts.cache_headers(artifact)
+                if artifacts.is_not_modified(artifact, self.headers.get('If-None-Match'),
+                                             self.headers.get('If-Modified-Since')):
+                    self.send_response(304)
+                    for key, value in headers.items():
+                        self.send_header(key, value)
+                    self.send_header('Access-Control-Allow-Origin', '*')
+                    self.end_headers()
+                    return
                 
                 # 응답 헤더 설정
                 self.send_response(200)
-                self.send_header('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-                self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+                self.send_header('Content-Type', artifact['mimetype'])
+                self.send_header('Content-Disposition', exporter.content_disposition(artifact['filename']))
+                self.send_header('Content-Length', str(artifact['size']))
+                for key, value in headers.items():
+                    self.send_header(key, value)
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.end_headers()
                 
-                # 엑셀 파일 전송
-                self.wfile.write(excel_data)
+                # 파일 전송
+                for chunk in artifacts.iter_file(artifact['path']):
+                    self.wfile.write(chunk)
                 return
             
             # 메인 페이지 요청 처리
@@ -186,90 +352,100 @@ class handler(BaseHTTPRequestHandler):
 
             # GPTs용 API 엔드포인트
             if parsed_path.path == '/api/gpts/hospitals':
-                params = parse_qs(parsed_path.query)
-                api_params = {
-                    'serviceKey': API_KEY,
-                    'numOfRows': params.get('numOfRows', ['5'])[0],  # GPTs용으로 기본값 5개로 제한
-                    'pageNo': params.get('pageNo', ['1'])[0],
-                    '_type': 'json'
-                }
-                
-                # 선택적 파라미터 추가
-                optional_params = ['hmcNm', 'siDoCd', 'siGunGuCd', 'locAddr', 'hmcRdatCd', 'hchType']
-                for param in optional_params:
-                    if param in params:
-                        api_params[param] = params[param][0]
-
-                response = requests.get(BASE_URL, params=api_params)
-                
-                if response.status_code == 200:
-                    try:
-                        data = response.json()
-                        if data['response']['header']['resultCode'] == '00':
-                            items = data['response']['body']['items'].get('item', [])
-                            if not isinstance(items, list):
-                                items = [items] if items else []
-                            
-                            # GPTs용 응답 형식
-                            result = {
-                                "status": "success",
-                                "total_count": data['response']['body'].get('totalCount', 0),
-                                "current_page": int(api_params['pageNo']),
-                                "hospitals": [format_hospital_for_gpts(hospital) for hospital in items]
-                            }
-                            
-                            self.send_response(200)
-                            self.send_header('Content-type', 'application/json')
-                            self.send_header('Access-Control-Allow-Origin', '*')
-                            self.end_headers()
-                            self.wfile.write(json.dumps(result, ensure_ascii=False).encode('utf-8'))
-                            return
-                    except Exception as e:
-                        raise Exception(f"Failed to parse API response: {str(e)}")
-                
-                raise Exception(f"API Error: Status code {response.status_code}")
-            
-            # 기존 웹 UI용 API 엔드포인트
-            if parsed_path.path.startswith('/api/hospitals'):
-                params = parse_qs(parsed_path.query)
-                api_params = {
-                    'serviceKey': API_KEY,
-                    'numOfRows': params.get('numOfRows', ['10'])[0],
-                    'pageNo': params.get('pageNo', ['1'])[0],
-                    '_type': 'json'
-                }
-                
-                optional_params = ['hmcNm', 'siDoCd', 'siGunGuCd', 'locAddr', 'hmcRdatCd', 'hchType']
-                for param in optional_params:
-                    if param in params:
-                        api_params[param] = params[param][0]
-
-                response = requests.get(BASE_URL, params=api_params)
-                
-                if response.status_code != 200:
-                    raise Exception(f"API Error: Status code {response.status_code}")
-
-                response_text = response.text
-                if not response_text:
-                    raise Exception("Empty response from API")
-
+                search_params = {key: values[0] for key, values in parse_qs(parsed_path.query).items()}
                 try:
-                    response_data = response.json()
-                except json.JSONDecodeError as e:
-                    raise Exception(f"Invalid JSON response: {response_text[:200]}...")
-
+                    result = search_hospitals_for_gpts(search_params)
+                except (geo.GeoNotConfigured, registry.NotReady) as e:
+                    self._send_json(503, {'status': 'error', 'message': str(e)})
+                    return
+                except ValueError as e:
+                    self._send_json(400, {'status': 'error', 'message': str(e)})
+                    return
+                self._send_json(200, result)
+                return
+            
+            # 응답 캐시 통계
+            if parsed_path.path == '/api/cache/stats':
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.end_headers()
-                
-                result = {
+                self.wfile.write(json.dumps({
+                    'status': 'success', 'cache': cache.stats(), 'upstream': upstream.stats()
+                }).encode('utf-8'))
+                return
+            
+            # Prometheus 형식 성능 지표
+            if parsed_path.path == '/metrics':
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-type', metrics.CONTENT_TYPE)
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            
+            # 가장 느린 요청 목록 (단계별 소요 시간, 프로파일)
+            if parsed_path.path == '/api/metrics/slowest':
+                self._send_json(200, {'status': 'success', 'requests': metrics.slowest()})
+                return
+            
+            # 스냅샷 변경 내역 (since 이후, 오래된 순)
+            if parsed_path.path == '/api/hospitals/changes':
+                query = {key: values[0] for key, values in parse_qs(parsed_path.query).items()}
+                try:
+                    since, cursor, limit, offset = store.change_params(query)
+                except ValueError as e:
+                    self._send_json(400, {'status': 'error', 'message': str(e)})
+                    return
+                cursor, total_count, changes = store.changes(since=since, cursor=cursor, limit=limit, offset=offset)
+                self._send_json(200, {
+                    'status': 'success',
+                    'cursor': cursor,
+                    'total_count': total_count,
+                    'has_more': offset + len(changes) < total_count,
+                    'changes': changes
+                })
+                return
+            
+            # 집계 통계 (스냅샷의 미리 계산한 집계만 사용)
+            if parsed_path.path == '/api/hospitals/stats':
+                query = {key: values[0] for key, values in parse_qs(parsed_path.query).items()}
+                try:
+                    result = rollup.query(query)
+                except ValueError as e:
+                    self._send_json(400, {'status': 'error', 'message': str(e)})
+                    return
+                if result is None:
+                    self._send_json(503, {'status': 'error', 'message': 'No snapshot available for stats'})
+                    return
+                self._send_json(200, result)
+                return
+            
+            # 기존 웹 UI용 API 엔드포인트
+            if parsed_path.path.startswith('/api/hospitals'):
+                search_params = {key: values[0] for key, values in parse_qs(parsed_path.query).items()}
+                if window.is_window_request(search_params):
+                    self._send_window(search_params)
+                    return
+                api_params = web_api_params(search_params)
+
+                # 로컬 데이터(검색 엔진, 검진종류 인덱스, 스냅샷)로 먼저 조회하고, 불가능한 경우에만 API 호출
+                response_data = local_search.query({**search_params, **api_params})
+                if response_data is None:
+                    response = cache.cached_get(BASE_URL, params=api_params)
+                    # 원본 응답 본문을 파싱하지 않고 그대로 전달
+                    with metrics.span('serialize'):
+                        body = passthrough.web_body(api_params, response)
+                    if body is not None:
+                        self._send_body(200, body)
+                        return
+                    response_data = parse_web_response(response)
+
+                self._send_json(200, {
                     'status': 'success',
                     'request_params': api_params,
                     'data': response_data
-                }
-                
-                self.wfile.write(json.dumps(result, ensure_ascii=False).encode('utf-8'))
+                })
                 return
             
             # 알 수 없는 경로
@@ -281,6 +457,9 @@ class handler(BaseHTTPRequestHandler):
                 'message': 'Not Found'
             }).encode('utf-8'))
             
+        except registry.NotReady as e:
+            # 전체 목록을 읽는 중이면 조건을 뺀 원본 API 결과 대신 503
+            self._send_json(503, {'status': 'error', 'message': str(e)})
         except Exception as e:
             print(f"Error in handler: {str(e)}")
             self.send_response(500)
@@ -1,107 +1,47 @@
-from flask import Flask, send_file, jsonify, request
+from flask import Flask, Response, jsonify, request
 import json
-import requests
 import os
 from dotenv import load_dotenv
-import pandas as pd
-from io import BytesIO
-from datetime import datetime
+
+import artifacts
+import cache
+import compression
+import exporter
+import fastjson
+import local_search
+import metrics
+import passthrough
+import prefetch
+import registry
+import rollup
+import store
+import upstream
+import window
+from fetcher import IncompleteFetchError, fetch_all_hospitals
 
 # .env 파일 로드
 load_dotenv()
 
 app = Flask(__name__)
+metrics.init_flask(app)  # 요청별 Server-Timing 헤더, /metrics
+compression.init_flask(app)  # Accept-Encoding에 맞춰 응답 압축 (gzip, br)
 
 # 환경 변수에서 설정 가져오기
 API_KEY = os.getenv('API_KEY')
 BASE_URL = os.getenv('BASE_URL')
 
+if prefetch.PREFETCH:
+    prefetch.start(BASE_URL, API_KEY)  # 인기 검색을 만료 전에 미리 갱신 (시작 시 상위 검색 미리 받음)
+
 def get_all_hospitals():
-    """모든 검진기관 데이터 조회"""
-    all_hospitals = []
-    page_no = 1
-    
-    while True:
-        try:
-            api_params = {
-                'serviceKey': API_KEY,
-                'numOfRows': '100',  # 로컬에서는 더 많은 데이터를 한 번에 가져올 수 있음
-                'pageNo': str(page_no),
-                '_type': 'json'
-            }
-            
-            response = requests.get(BASE_URL, params=api_params)
-            if response.status_code != 200:
-                break
-                
-            data = response.json()
-            if data['response']['header']['resultCode'] != '00':
-                break
-                
-            items = data['response']['body']['items'].get('item', [])
-            if not items:
-                break
-                
-            if not isinstance(items, list):
-                items = [items]
-                
-            all_hospitals.extend(items)
-            total_count = int(data['response']['body']['totalCount'])
-            
-            if len(all_hospitals) >= total_count:
-                break
-                
-            page_no += 1
-            
-        except Exception as e:
-            print(f"Error fetching data: {str(e)}")
-            break
-    
-    return all_hospitals
-
-def create_excel(hospitals):
-    """검진기관 데이터로 엑셀 파일 생성"""
-    selected_columns = [
-        'hmcNm', 'hmcNo', 'hmcTelNo', 'locAddr', 'locPostNo', 'ykindnm',
-        'grenChrgTypeCd', 'ichkChrgTypeCd', 'bcExmdChrgTypeCd', 'ccExmdChrgTypeCd',
-        'cvxcaExmdChrgTypeCd', 'lvcaExmdChrgTypeCd', 'stmcaExmdChrgTypeCd', 'mchkChrgTypeCd'
-    ]
-    
-    df = pd.DataFrame(hospitals)[selected_columns]
-    
-    column_mapping = {
-        'hmcNm': '검진기관명',
-        'hmcNo': '검진기관번호',
-        'hmcTelNo': '전화번호',
-        'locAddr': '주소',
-        'locPostNo': '우편번호',
-        'ykindnm': '기관종별',
-        'grenChrgTypeCd': '일반검진여부',
-        'ichkChrgTypeCd': '영유아검진여부',
-        'bcExmdChrgTypeCd': '유방암검진여부',
-        'ccExmdChrgTypeCd': '대장암검진여부',
-        'cvxcaExmdChrgTypeCd': '자궁경부암검진여부',
-        'lvcaExmdChrgTypeCd': '간암검진여부',
-        'stmcaExmdChrgTypeCd': '위암검진여부',
-        'mchkChrgTypeCd': '구강검진여부'
-    }
-    
-    df = df.rename(columns=column_mapping)
-    
-    exam_columns = [
-        '일반검진여부', '영유아검진여부', '유방암검진여부', '대장암검진여부',
-        '자궁경부암검진여부', '간암검진여부', '위암검진여부', '구강검진여부'
-    ]
-    
-    for col in exam_columns:
-        df[col] = df[col].map({'1': '가능', '0': '가능', '2': '불가능'})
-    
-    excel_buffer = BytesIO()
-    with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='검진기관목록')
-    
-    excel_buffer.seek(0)
-    return excel_buffer
+    """모든 검진기관 데이터 조회 (페이지 병렬 조회, 일부 페이지를 받지 못하면 IncompleteFetchError)"""
+    try:
+        hospitals, report = fetch_all_hospitals(BASE_URL, API_KEY)
+    except IncompleteFetchError as e:
+        print(f"Fetch report (incomplete): {json.dumps(e.report, ensure_ascii=False)}")
+        raise
+    print(f"Fetch report: {json.dumps(report, ensure_ascii=False)}")
+    return hospitals
 
 @app.route('/')
 def index():
@@ -109,32 +49,62 @@ def index():
 
 @app.route('/api/hospitals/excel')
 def download_excel():
+    """전체 검진기관 목록 내보내기 (format=xlsx|csv|ndjson)
+
+    데이터 버전별로 미리 만들어 둔 파일을 ETag/Last-Modified와 함께 전송한다.
+    """
     try:
-        print("Starting Excel download process...")
-        hospitals = get_all_hospitals()
-        print(f"Retrieved {len(hospitals)} hospitals")
+        fmt = request.args.get('format', 'xlsx')
+        if fmt not in exporter.FORMATS:
+            return jsonify({'status': 'error', 'message': f'Unsupported format: {fmt}'}), 400
         
-        if not hospitals:
-            return jsonify({'status': 'error', 'message': 'No data available'}), 500
+        artifact = artifacts.get_artifact(fmt, get_all_hospitals, request.headers.get('Accept-Encoding'))
+        headers = artifacts.cache_headers(artifact)
+        if artifacts.is_not_modified(artifact, request.headers.get('If-None-Match'),
+                                     request.headers.get('If-Modified-Since')):
+            return Response(status=304, headers=headers)
         
-        excel_buffer = create_excel(hospitals)
-        filename = f"검진기관목록_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        
-        return send_file(
-            excel_buffer,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
+        headers['Content-Disposition'] = exporter.content_disposition(artifact['filename'])
+        headers['Content-Length'] = str(artifact['size'])
+        return Response(artifacts.iter_file(artifact['path']), mimetype=artifact['mimetype'], headers=headers)
         
     except Exception as e:
         print(f"Error in download_excel: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/cache/stats')
+def cache_stats():
+    return jsonify({'status': 'success', 'cache': cache.stats(), 'upstream': upstream.stats(),
+                    'prefetch': prefetch.stats()})
+
+@app.route('/api/hospitals/stats')
+def hospital_stats():
+    """집계 통계 (스냅샷의 미리 계산한 집계만 사용)"""
+    try:
+        result = rollup.query(request.args.to_dict())
+        if result is None:
+            return jsonify({'status': 'error', 'message': 'No snapshot available for stats'}), 503
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+def hospitals_window(params):
+    """offset/limit(또는 cursor) 구간을 원본 페이지를 동시에 받아 NDJSON으로 스트리밍"""
+    try:
+        result = window.open_window(params, BASE_URL, API_KEY)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return Response(result.iter_ndjson(), content_type=window.CONTENT_TYPE, headers=result.headers())
+
 @app.route('/api/hospitals')
 def get_hospitals():
     try:
         params = request.args.to_dict()
+        if window.is_window_request(params):
+            return hospitals_window(params)
+
         api_params = {
             'serviceKey': API_KEY,
             'numOfRows': params.get('numOfRows', '10'),
@@ -147,19 +117,32 @@ def get_hospitals():
             if param in params:
                 api_params[param] = params[param]
 
-        response = requests.get(BASE_URL, params=api_params)
-        
-        if response.status_code != 200:
-            return jsonify({'status': 'error', 'message': f'API Error: Status code {response.status_code}'}), 500
+        # 로컬 데이터(검색 엔진, 검진종류 인덱스, 스냅샷)로 먼저 조회하고, 불가능한 경우에만 API 호출
+        response_data = local_search.query({**params, **api_params})
+        if response_data is None:
+            response = cache.cached_get(BASE_URL, params=api_params)
+
+            if response.status_code != 200:
+                return jsonify({'status': 'error', 'message': f'API Error: Status code {response.status_code}'}), 500
+
+            # 원본 응답 본문을 파싱하지 않고 그대로 전달
+            with metrics.span('serialize'):
+                body = passthrough.web_body(api_params, response)
+            if body is not None:
+                return Response(body, mimetype='application/json')
 
-        response_data = response.json()
+            with metrics.span('parse'):
+                response_data = fastjson.load_response(response)
         
-        return jsonify({
-            'status': 'success',
-            'request_params': api_params,
-            'data': response_data
-        })
+        with metrics.span('serialize'):
+            return Response(fastjson.dumps({
+                'status': 'success',
+                'request_params': api_params,
+                'data': response_data
+            }), mimetype='application/json')
         
+    except registry.NotReady as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -0,0 +1,251 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+
+import compression
+import exam_index
+import exporter
+import metrics
+import registry
+import store
+
+# 내보내기 파일 저장 설정
+EXPORT_DIR = os.environ.get('EXPORT_DIR', os.path.join(store.DATA_DIR, 'exports'))
+EXPORT_REFRESH_INTERVAL = int(os.environ.get('EXPORT_REFRESH_INTERVAL', '3600'))  # 데이터 변경 확인 주기(초)
+# 새 버전으로 바뀐 뒤 이전 파일을 남겨 두는 시간(초, 받는 중인 요청이 파일을 잃지 않도록)
+EXPORT_RETENTION = int(os.environ.get('EXPORT_RETENTION', '3600'))
+MANIFEST_PATH = os.path.join(EXPORT_DIR, 'manifest.json')
+
+# 빌드는 한 번에 하나만 (동시 요청은 같은 빌드 결과를 공유)
+_build_lock = threading.Lock()
+
+
+def data_version(hospitals):
+    """데이터 내용 해시 (데이터가 같으면 항상 같은 값)"""
+    payload = json.dumps(hospitals, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+def load_manifest():
+    """현재 내보내기 파일 정보 (없으면 None)"""
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(manifest):
+    tmp_path = f'{MANIFEST_PATH}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def _usable(manifest, fmt):
+    return bool(manifest) and fmt in manifest['files'] and \
+        os.path.exists(os.path.join(EXPORT_DIR, manifest['files'][fmt]))
+
+
+def _files(manifest):
+    """manifest가 가리키는 모든 파일 이름 (압축본 포함)"""
+    names = set(manifest['files'].values())
+    for encoded in manifest.get('encoded', {}).values():
+        names.update(encoded.values())
+    return names
+
+
+def _retire_old_files(keep, retired, now):
+    """현재 버전이 아닌 파일은 교체된 시각을 기록하고, EXPORT_RETENTION이 지난 파일만 삭제
+
+    반환값: 아직 남겨 둔 이전 파일 -> 교체된 시각
+    """
+    remaining = {}
+    for filename in os.listdir(EXPORT_DIR):
+        if filename == 'manifest.json' or filename in keep or filename.endswith('.tmp'):
+            continue
+        retired_at = retired.get(filename, now)
+        if now - retired_at < EXPORT_RETENTION:
+            remaining[filename] = retired_at
+            continue
+        try:
+            os.remove(os.path.join(EXPORT_DIR, filename))
+        except OSError:
+            pass
+    return remaining
+
+
+def _load_hospitals(fetch_all):
+    """내보낼 전체 목록: 만료되지 않은 스냅샷이 있으면 메모리 목록(스냅샷), 없으면 fetch_all()로 원본 API에서 수집"""
+    if registry.snapshot_version() is not None:
+        hospitals = registry.get_hospitals()
+        if hospitals:
+            return hospitals
+    return fetch_all()
+
+
+def build(fetch_all):
+    """전체 데이터를 받아 데이터 버전이 바뀐 경우에만 모든 형식의 파일을 새로 생성
+
+    스냅샷이 있으면 스냅샷 데이터로, 없을 때만 fetch_all()로 받는다.
+    _build_lock을 잡은 상태에서 호출해야 한다.
+    """
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    hospitals = _load_hospitals(fetch_all)
+    if not hospitals:
+        raise Exception("No data available")
+
+    now = time.time()
+    version = data_version(hospitals)
+    manifest = load_manifest()
+    if manifest and manifest['version'] == version and 'encoded' in manifest and \
+            all(_usable(manifest, fmt) for fmt in exporter.FORMATS):
+        # 데이터가 바뀌지 않았으면 확인 시각만 갱신
+        manifest['checked_at'] = now
+        _write_manifest(manifest)
+        return manifest
+
+    files = {}
+    encoded = {}
+    # 검진여부 열은 형식마다 다시 계산하지 않도록 한 번만 계산
+    exam_statuses = [exam_index.exam_status(hospital) for hospital in hospitals]
+    for fmt, (_, ext) in exporter.FORMATS.items():
+        filename = f'{version[:16]}.{ext}'
+        path = os.path.join(EXPORT_DIR, filename)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f, metrics.span(f'export_{fmt}'):
+            if fmt == 'xlsx':
+                exporter.write_xlsx(hospitals, f, exam_statuses)
+            else:
+                for chunk in exporter.iter_export(hospitals, fmt, exam_statuses):
+                    f.write(chunk)
+        os.replace(tmp_path, path)
+        files[fmt] = filename
+
+        # 압축할 수 있는 형식은 압축본도 미리 만들어 요청마다 압축하지 않음
+        if compression.compressible(exporter.FORMATS[fmt][0], os.path.getsize(path)):
+            encoded[fmt] = {}
+            for encoding in compression.ENCODINGS:
+                encoded_name = filename + compression.FILE_SUFFIXES[encoding]
+                with metrics.span(f'compress_{fmt}'):
+                    compression.compress_file(path, tmp_path, encoding)
+                os.replace(tmp_path, os.path.join(EXPORT_DIR, encoded_name))
+                encoded[fmt][encoding] = encoded_name
+
+    manifest = {
+        'version': version,
+        'count': len(hospitals),
+        'built_at': now,
+        'checked_at': now,
+        'files': files,
+        'encoded': encoded,
+        # 이전 버전 파일은 이미 응답 중인 요청을 위해 EXPORT_RETENTION 동안 남겨둠
+        'retired': _retire_old_files(_files({'files': files, 'encoded': encoded}),
+                                     (manifest or {}).get('retired', {}), now)
+    }
+    _write_manifest(manifest)
+    print(f"Export artifacts built: version {version[:16]}, {len(hospitals)} hospitals")
+    return manifest
+
+
+def _needs_refresh(manifest):
+    """확인 주기가 지났거나 스냅샷 데이터가 그 이후에 바뀐 경우"""
+    if time.time() - manifest['checked_at'] > EXPORT_REFRESH_INTERVAL:
+        return True
+    changed_at = store.data_version()
+    return changed_at is not None and changed_at > manifest['checked_at']
+
+
+def refresh_in_background(fetch_all):
+    """백그라운드에서 데이터 변경 확인 및 재생성 (이미 빌드 중이면 무시)"""
+    if not _build_lock.acquire(blocking=False):
+        return False
+
+    def run():
+        try:
+            build(fetch_all)
+        except Exception as e:
+            print(f"Error refreshing export artifacts: {str(e)}")
+        finally:
+            _build_lock.release()
+
+    threading.Thread(target=run, daemon=True).start()
+    return True
+
+
+def get_artifact(fmt, fetch_all, accept_encoding=None):
+    """fmt 형식의 내보내기 파일 정보
+
+    파일이 있으면 바로 반환하고(필요 시 백그라운드 갱신), 없으면 생성될 때까지 기다린다.
+    Accept-Encoding에 맞는 압축본이 있으면 압축본 정보를 반환한다 (encoding 항목).
+    """
+    manifest = load_manifest()
+    if not _usable(manifest, fmt):
+        with _build_lock:
+            manifest = load_manifest()
+            if not _usable(manifest, fmt):
+                manifest = build(fetch_all)
+    elif _needs_refresh(manifest):
+        refresh_in_background(fetch_all)
+
+    path = os.path.join(EXPORT_DIR, manifest['files'][fmt])
+    etag = f'{manifest["version"][:16]}-{fmt}'
+    encodings = manifest.get('encoded', {}).get(fmt, {})
+    encoding = compression.negotiate(accept_encoding) if encodings else None
+    if encoding in encodings and os.path.exists(os.path.join(EXPORT_DIR, encodings[encoding])):
+        path = os.path.join(EXPORT_DIR, encodings[encoding])
+        etag = f'{etag}-{encoding}'
+    else:
+        encoding = None
+    built_at = manifest['built_at']
+    return {
+        'path': path,
+        'size': os.path.getsize(path),
+        'etag': f'"{etag}"',
+        'encoding': encoding,
+        'vary': bool(encodings),
+        'last_modified': int(built_at),
+        'mimetype': exporter.FORMATS[fmt][0],
+        'filename': f"검진기관목록_{datetime.fromtimestamp(built_at).strftime('%Y%m%d_%H%M%S')}.{exporter.FORMATS[fmt][1]}"
+    }
+
+
+def is_not_modified(artifact, if_none_match=None, if_modified_since=None):
+    """조건부 요청 헤더 확인 (304 응답 여부)"""
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or artifact['etag'] in tags or f"W/{artifact['etag']}" in tags
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(if_modified_since).timestamp() >= artifact['last_modified']
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def cache_headers(artifact):
+    """ETag/Last-Modified 응답 헤더 (압축본이 있는 형식이면 Vary, 압축본이면 Content-Encoding 포함)"""
+    headers = {
+        'ETag': artifact['etag'],
+        'Last-Modified': formatdate(artifact['last_modified'], usegmt=True),
+        'Cache-Control': 'no-cache'
+    }
+    if artifact.get('vary'):
+        headers['Vary'] = 'Accept-Encoding'
+    if artifact.get('encoding'):
+        headers['Content-Encoding'] = artifact['encoding']
+    return headers
+
+
+def iter_file(path):
+    """파일을 청크 단위로 읽기"""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(exporter.CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,285 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import artifacts
+import cache
+import compression
+import exporter
+import geo
+import local_search
+import fastjson
+import main
+import metrics
+import passthrough
+import prefetch
+import registry
+import rollup
+import upstream
+import window
+from api import index
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 환경 변수에서 설정 가져오기
+BASE_URL = os.environ.get('BASE_URL')
+
+
+class KoreanJSONResponse(JSONResponse):
+    """한글을 이스케이프하지 않는 JSON 응답"""
+
+    def render(self, content):
+        with metrics.span('serialize'):
+            return fastjson.dumps(content)
+
+
+class MetricsMiddleware:
+    """요청별 단계 소요 시간을 Server-Timing 헤더로 보내고 지표에 반영"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        # 이벤트 루프의 다른 요청까지 함께 측정되므로 cProfile은 사용하지 않음
+        with metrics.request(scope['path'], profile=False) as timer:
+            async def send_with_metrics(message):
+                if message['type'] == 'http.response.start':
+                    timer.status = message['status']
+                    message['headers'] = list(message.get('headers', [])) + [
+                        (b'server-timing', metrics.server_timing(timer).encode('latin-1'))
+                    ]
+                elif message['type'] == 'http.response.body':
+                    timer.bytes_out += len(message.get('body', b''))
+                await send(message)
+
+            await self.app(scope, receive, send_with_metrics)
+            if timer.status == 404:
+                timer.route = 'other'  # 알 수 없는 경로로 라벨이 늘어나지 않도록
+
+
+class CompressionMiddleware:
+    """본문을 한 번에 보내는 응답을 Accept-Encoding에 맞게 압축 (스트리밍 응답은 그대로 전달)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for key, value in scope['headers']:
+            if key == b'accept-encoding':
+                accept_encoding = value.decode('latin-1')
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                start = message
+                return
+            if start is not None:
+                if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                    headers = [(key, value) for key, value in start.get('headers', [])]
+                    names = {key.lower(): value for key, value in headers}
+                    if start['status'] == 200 and b'content-encoding' not in names:
+                        body, extra = compression.encode_body(
+                            message.get('body', b''), names.get(b'content-type', b'').decode('latin-1'),
+                            accept_encoding, start['status'])
+                        if extra:
+                            headers = [(key, value) for key, value in headers if key.lower() != b'content-length']
+                            headers += [(key.lower().encode('latin-1'), value.encode('latin-1'))
+                                        for key, value in extra.items()]
+                            headers.append((b'content-length', str(len(body)).encode('latin-1')))
+                            start = dict(start, headers=headers)
+                            message = dict(message, body=body)
+                await send(start)
+                start = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+
+def error_response(e, status_code=500):
+    return KoreanJSONResponse({'status': 'error', 'message': str(e)}, status_code=status_code)
+
+
+async def search_hospitals(request):
+    """검진기관 검색 API (main.py /api/hospitals/search와 같은 응답)"""
+    try:
+        search_params = main.parse_search_params(request.query_params)
+        params = main.build_api_params(search_params)
+
+        # 로컬 조회는 CPU 작업이므로 이벤트 루프를 막지 않도록 스레드에서 실행
+        result = await asyncio.to_thread(local_search.query, search_params)
+        if result is None:
+            response = await cache.async_cached_get(BASE_URL, params=params)
+            logger.info(f"API Response Status: {response.status_code}")
+
+            if response.status_code != 200:
+                body, status = main.api_error(search_params, response.status_code)
+                return KoreanJSONResponse(body, status_code=status)
+
+            with metrics.span('parse'):
+                result = fastjson.load_response(response)
+
+        body, status = main.search_result(search_params, result)
+        return KoreanJSONResponse(body, status_code=status)
+
+    except registry.NotReady as e:
+        return error_response(e, status_code=503)
+    except Exception as e:
+        logger.error(f"Error in search_hospitals: {str(e)}")
+        return error_response(e)
+
+
+async def get_hospitals(request):
+    """검진기관 정보 조회 API (웹 UI용, api/index.py /api/hospitals와 같은 응답)"""
+    try:
+        search_params = dict(request.query_params)
+        if window.is_window_request(search_params):
+            # offset/limit(또는 cursor) 구간: 첫 페이지만 받은 뒤 나머지는 스트리밍하며 받음
+            try:
+                result = await asyncio.to_thread(window.open_window, search_params, BASE_URL, index.API_KEY)
+            except ValueError as e:
+                return error_response(e, 400)
+            return StreamingResponse(result.iter_ndjson(), media_type=window.CONTENT_TYPE, headers=result.headers())
+        api_params = index.web_api_params(search_params)
+
+        response_data = await asyncio.to_thread(local_search.query, {**search_params, **api_params})
+        if response_data is None:
+            response = await cache.async_cached_get(BASE_URL, params=api_params)
+            # 원본 응답 본문을 파싱하지 않고 그대로 전달
+            with metrics.span('serialize'):
+                body = passthrough.web_body(api_params, response)
+            if body is not None:
+                return Response(body, media_type='application/json')
+            response_data = index.parse_web_response(response)
+
+        return KoreanJSONResponse({
+            'status': 'success',
+            'request_params': api_params,
+            'data': response_data
+        })
+
+    except registry.NotReady as e:
+        return error_response(e, status_code=503)
+    except Exception as e:
+        logger.error(f"Error in get_hospitals: {str(e)}")
+        return error_response(e)
+
+
+async def search_hospitals_for_gpts(request):
+    """GPTs용 검진기관 검색 (api/index.py /api/gpts/hospitals와 같은 응답)"""
+    try:
+        search_params = dict(request.query_params)
+        api_params = index.gpts_api_params(search_params)
+        if geo.is_geo_query(search_params):
+            return KoreanJSONResponse(await asyncio.to_thread(index.gpts_nearest_result, search_params, api_params))
+
+        data, exam_masks = await asyncio.to_thread(local_search.query_with_masks, {**search_params, **api_params})
+        if data is None:
+            data = index.gpts_response_data(await cache.async_cached_get(BASE_URL, params=api_params))
+        return KoreanJSONResponse(index.gpts_result(data, api_params, exam_masks))
+
+    except (geo.GeoNotConfigured, registry.NotReady) as e:
+        return error_response(e, status_code=503)
+    except ValueError as e:
+        return error_response(e, status_code=400)
+    except Exception as e:
+        logger.error(f"Error in search_hospitals_for_gpts: {str(e)}")
+        return error_response(e)
+
+
+async def download_excel(request):
+    """전체 검진기관 목록 내보내기 (format=xlsx|csv|ndjson)"""
+    try:
+        fmt = request.query_params.get('format', 'xlsx')
+        if fmt not in exporter.FORMATS:
+            return error_response(f'Unsupported format: {fmt}', 400)
+
+        # 파일이 없으면 전체 목록 수집과 파일 생성이 필요하므로 스레드에서 실행
+        artifact = await asyncio.to_thread(artifacts.get_artifact, fmt, index.get_all_hospitals,
+                                         request.headers.get('Accept-Encoding'))
+        headers = artifacts.cache_headers(artifact)
+        if artifacts.is_not_modified(artifact, request.headers.get('If-None-Match'),
+                                     request.headers.get('If-Modified-Since')):
+            return Response(status_code=304, headers=headers)
+
+        headers['Content-Disposition'] = exporter.content_disposition(artifact['filename'])
+        headers['Content-Length'] = str(artifact['size'])
+        return StreamingResponse(artifacts.iter_file(artifact['path']), media_type=artifact['mimetype'],
+                                 headers=headers)
+
+    except Exception as e:
+        logger.error(f"Error in download_excel: {str(e)}")
+        return error_response(e)
+
+
+async def hospital_stats(request):
+    """집계 통계 (스냅샷의 미리 계산한 집계만 사용)"""
+    try:
+        result = rollup.query(dict(request.query_params))
+        if result is None:
+            return error_response('No snapshot available for stats', 503)
+        return KoreanJSONResponse(result)
+    except ValueError as e:
+        return error_response(e, 400)
+    except Exception as e:
+        logger.error(f"Error in hospital_stats: {str(e)}")
+        return error_response(e)
+
+
+async def cache_stats(request):
+    return KoreanJSONResponse({'status': 'success', 'cache': cache.stats(), 'upstream': upstream.stats(),
+                               'prefetch': prefetch.stats()})
+
+
+async def metrics_endpoint(request):
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+async def slowest_requests(request):
+    return KoreanJSONResponse({'status': 'success', 'requests': metrics.slowest()})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await upstream.async_client.aclose()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/hospitals', get_hospitals),
+        Route('/api/hospitals/search', search_hospitals),
+        Route('/api/gpts/hospitals', search_hospitals_for_gpts),
+        Route('/api/hospitals/excel', download_excel),
+        Route('/api/hospitals/stats', hospital_stats),
+        Route('/api/cache/stats', cache_stats),
+        Route('/metrics', metrics_endpoint),
+        Route('/api/metrics/slowest', slowest_requests)
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*']), Middleware(MetricsMiddleware),
+                Middleware(CompressionMiddleware)],
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', '8000')))
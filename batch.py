@@ -0,0 +1,75 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cache
+
+# 일괄 검색 설정
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', '8'))
+BATCH_MAX_SPECS = int(os.environ.get('BATCH_MAX_SPECS', '20'))
+BATCH_MAX_BODY = int(os.environ.get('BATCH_MAX_BODY', str(64 * 1024)))  # 요청 본문 최대 크기(바이트)
+
+
+def body_length(value):
+    """Content-Length 헤더 값을 본문 크기로 변환 (형식이 잘못되었거나 BATCH_MAX_BODY를 넘으면 ValueError)"""
+    try:
+        length = int(value or 0)
+    except ValueError:
+        raise ValueError(f"Invalid Content-Length: {value}")
+    if length < 0:
+        raise ValueError(f"Invalid Content-Length: {value}")
+    if length > BATCH_MAX_BODY:
+        raise ValueError(f"Request body too large: {length} bytes (max {BATCH_MAX_BODY})")
+    return length
+
+
+def parse_specs(body):
+    """요청 본문에서 검색 조건 목록 추출 ({"searches": [...]} 또는 [...])"""
+    specs = body.get('searches') if isinstance(body, dict) else body
+    if not isinstance(specs, list) or not specs:
+        raise ValueError("Request body must be a non-empty list of searches")
+    if len(specs) > BATCH_MAX_SPECS:
+        raise ValueError(f"Too many searches: {len(specs)} (max {BATCH_MAX_SPECS})")
+    for spec in specs:
+        if not isinstance(spec, dict):
+            raise ValueError("Each search must be an object of query parameters")
+    # 쿼리 문자열과 같은 형태가 되도록 값은 문자열로 변환
+    return [{key: str(value) for key, value in spec.items() if value is not None} for spec in specs]
+
+
+def run_batch(specs, search, max_workers=BATCH_WORKERS):
+    """검색 조건들을 스레드 풀에서 동시에 실행
+
+    같은 조건은 한 번만 실행하고 결과를 공유한다. 각 조건의 성공/실패와 소요 시간을
+    요청 순서대로 반환한다.
+    """
+    unique = {}
+    keys = []
+    for spec in specs:
+        key = cache.normalize_params(spec)
+        keys.append(key)
+        unique.setdefault(key, spec)
+
+    def run(spec):
+        started = time.perf_counter()
+        try:
+            return {'status': 'success', 'result': search(spec)}, time.perf_counter() - started
+        except Exception as e:
+            return {'status': 'error', 'message': str(e)}, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique))) as executor:
+        outcomes = dict(zip(unique, executor.map(run, unique.values())))
+
+    results = []
+    seen = set()
+    for index, (spec, key) in enumerate(zip(specs, keys)):
+        outcome, elapsed = outcomes[key]
+        results.append(dict(
+            outcome,
+            index=index,
+            search_params=spec,
+            elapsed_ms=round(elapsed * 1000, 1),
+            deduplicated=key in seen
+        ))
+        seen.add(key)
+    return results
@@ -0,0 +1,129 @@
+# 콜드 스타트 벤치마크: 스냅샷을 불러오는 방식별 로드 시간, 메모리(RSS), 첫 검색 시간
+#   python bench/columnar_bench.py --rows 12000 --repeat 5
+# 방식마다 새 프로세스에서 측정한다 (서버리스 함수가 새로 뜰 때와 같은 상태).
+#   json           JSON 파일 전체를 dict 목록으로 읽고 목록에서 검색
+#   sqlite         SQLite 스냅샷 전체를 dict 목록으로 읽음 (store.load_all, registry 방식)
+#   sqlite_query   SQLite 스냅샷에서 바로 검색 (store.query)
+#   columnar       열 단위 스냅샷을 mmap으로 열고 바로 검색 (columnar.query)
+#   columnar_all   열 단위 스냅샷을 연 뒤 전체를 dict 목록으로 변환 (columnar.load_all)
+# RSS는 측정 전후 /proc/self/statm 차이 (Linux 전용)
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = ['json', 'sqlite', 'sqlite_query', 'columnar', 'columnar_all']
+
+# 첫 검색 조건 (지역 + 기관명 부분 일치)
+QUERY = {'siDoCd': '11', 'hmcNm': '병원', 'pageNo': 1, 'numOfRows': 10}
+
+
+def rss_bytes():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+def list_query(hospitals, params):
+    """dict 목록에서 store.query와 같은 조건으로 검색한 결과 수"""
+    return sum(
+        1 for hospital in hospitals
+        if hospital.get('siDoCd') == params['siDoCd'] and params['hmcNm'] in hospital.get('hmcNm', '')
+    )
+
+
+def run_mode(mode, data_dir):
+    """한 방식 측정 (자식 프로세스에서 실행): 결과 dict"""
+    import columnar
+    import store
+
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    if mode == 'json':
+        with open(os.path.join(data_dir, 'hospitals.json'), 'rb') as f:
+            hospitals = json.load(f)
+    elif mode == 'sqlite':
+        hospitals = store.load_all()
+    elif mode == 'sqlite_query':
+        hospitals = None
+    elif mode == 'columnar':
+        hospitals = columnar.get()
+    else:
+        hospitals = columnar.load_all()
+    loaded = time.perf_counter()
+
+    if mode in ('json', 'sqlite', 'columnar_all'):
+        count = list_query(hospitals, QUERY)
+    elif mode == 'sqlite_query':
+        count = store.query(QUERY)['response']['body']['totalCount']
+    else:
+        count = columnar.query(QUERY)['response']['body']['totalCount']
+    queried = time.perf_counter()
+
+    return {
+        'mode': mode,
+        'load_ms': round((loaded - started) * 1000, 2),
+        'first_query_ms': round((queried - loaded) * 1000, 2),
+        'rss_mb': round((rss_bytes() - rss_before) / 1024 / 1024, 2),
+        'matches': count
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=12000)
+    parser.add_argument('--repeat', type=int, default=5, help='방식별 측정 횟수 (중앙값 보고)')
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.child, os.environ['DATA_DIR'])))
+        return
+
+    data_dir = tempfile.mkdtemp(prefix='columnar_bench_')
+    env = dict(os.environ, DATA_DIR=data_dir, COLUMNAR_BUNDLE='')
+    # 스냅샷 생성도 같은 DATA_DIR을 쓰도록 자식 프로세스에서 실행
+    subprocess.run([sys.executable, '-c', (
+        'import json, os, sys, store\n'
+        'from bench.synthetic import make_hospitals\n'
+        f'hospitals = make_hospitals({args.rows})\n'
+        'store.write_snapshot(hospitals)\n'
+        'with open(os.path.join(os.environ["DATA_DIR"], "hospitals.json"), "w", encoding="utf-8") as f:\n'
+        '    json.dump(hospitals, f, ensure_ascii=False)\n'
+    )], env=env, cwd=ROOT, check=True)
+    sizes = {
+        'json': os.path.getsize(os.path.join(data_dir, 'hospitals.json')),
+        'sqlite': os.path.getsize(os.path.join(data_dir, 'hospitals.db')),
+        'columnar': os.path.getsize(os.path.join(data_dir, 'hospitals.col'))
+    }
+    print(json.dumps({'rows': args.rows, 'file_mb': {k: round(v / 1024 / 1024, 2) for k, v in sizes.items()}}))
+
+    results = []
+    for mode in args.modes.split(','):
+        runs = []
+        for _ in range(args.repeat):
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode],
+                                 env=env, cwd=ROOT, check=True, capture_output=True, text=True).stdout
+            runs.append(json.loads(out.strip().splitlines()[-1]))
+        result = {'mode': mode, 'rows': args.rows, 'matches': runs[0]['matches']}
+        for key in ('load_ms', 'first_query_ms', 'rss_mb'):
+            result[key] = round(statistics.median(run[key] for run in runs), 2)
+        results.append(result)
+        print(json.dumps(result), flush=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'file_mb': sizes, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
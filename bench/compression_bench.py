@@ -0,0 +1,149 @@
+# 응답 압축 벤치마크: 인코딩별 전송 바이트, 요청 지연, 압축 CPU 시간 (압축본 캐시 적중/미적중)
+#   python bench/compression_bench.py --requests 200 --bandwidth 10 --output compression_bench.json
+# 측정 항목
+#   response  앱별 응답(numOfRows=100 검색, GPTs 검색, 내보내기 파일)의 전송 바이트와 p50 지연
+#             transfer_ms는 --bandwidth(Mbps) 회선에서 본문 전송에 걸리는 시간 추정치
+#   cpu       같은 본문을 압축할 때 요청당 CPU 시간: 매번 압축 / 압축본 캐시 적중
+# 원본 응답은 캐시되고(첫 요청 제외) 모든 앱이 같은 모의 API를 사용한다.
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import mock_upstream  # noqa: E402
+
+# 앱별 측정 경로
+PATHS = {
+    'index': ['/api/hospitals?numOfRows=100', '/api/gpts/hospitals?numOfRows=100',
+              '/api/hospitals/excel?format=csv', '/api/hospitals/excel?format=ndjson'],
+    'app': ['/api/hospitals?numOfRows=100', '/api/hospitals/excel?format=csv'],
+    'main': ['/api/hospitals/search?numOfRows=100']
+}
+
+
+def serve(name, module):
+    """앱을 스레드 서버로 실행: (server, base_url)"""
+    if name == 'index':
+        handler = type('QuietHandler', (module.handler,), {'log_message': lambda self, format, *args: None})
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    else:
+        from werkzeug.serving import make_server
+
+        server = make_server('127.0.0.1', 0, module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def measure(session, url, encoding, requests_count, bandwidth):
+    """같은 요청을 반복해 전송 바이트와 p50 지연 측정"""
+    times = []
+    size = 0
+    content_encoding = None
+    for _ in range(requests_count):
+        started = time.perf_counter()
+        with session.get(url, headers={'Accept-Encoding': encoding}, stream=True) as response:
+            body = response.raw.read(decode_content=False)
+            content_encoding = response.headers.get('Content-Encoding')
+        times.append(time.perf_counter() - started)
+        size = len(body)
+    return {
+        'encoding': content_encoding or 'identity',
+        'bytes': size,
+        'p50_ms': round(statistics.median(times) * 1000, 2),
+        'transfer_ms': round(size * 8 / (bandwidth * 1000), 1)
+    }
+
+
+def cpu_cost(body, encoding, repeat):
+    """요청당 압축 CPU 시간(µs): 매번 압축 / 압축본 캐시 적중"""
+    import compression
+
+    started = time.process_time()
+    for _ in range(repeat):
+        compression.compress(body, encoding)
+    every_time = (time.process_time() - started) / repeat
+
+    cache = compression.CompressedCache()
+    cache.encode(body, encoding)
+    started = time.process_time()
+    for _ in range(repeat):
+        cache.encode(body, encoding)
+    cached = (time.process_time() - started) / repeat
+    return round(every_time * 1e6, 1), round(cached * 1e6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apps', default=','.join(PATHS))
+    parser.add_argument('--requests', type=int, default=100, help='경로별 반복 요청 수 (중앙값 보고)')
+    parser.add_argument('--rows', type=int, default=12000, help='가상 검진기관 수')
+    parser.add_argument('--latency', type=float, default=20, help='모의 API 응답 지연 (ms)')
+    parser.add_argument('--bandwidth', type=float, default=10, help='전송 시간 추정에 쓰는 회선 속도 (Mbps)')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    args = parser.parse_args()
+
+    server, base_url = mock_upstream.start(rows=args.rows, latency=args.latency / 1000)
+    os.environ.update(BASE_URL=base_url, API_KEY='bench', DATA_DIR=tempfile.mkdtemp(prefix='compression_bench_'),
+                      COLUMNAR_BUNDLE='', UPSTREAM_RATE='0')
+    # 앱들의 요청 로그는 버리고 결과만 출력
+    out = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    import logging
+
+    logging.disable(logging.INFO)
+
+    import requests
+
+    import app
+    import compression
+    import main as main_app
+    from api import index
+
+    modules = {'app': app, 'index': index, 'main': main_app}
+    encodings = ['identity'] + compression.ENCODINGS
+    results = []
+
+    def emit(result):
+        results.append(result)
+        print(json.dumps(result, ensure_ascii=False), file=out, flush=True)
+
+    try:
+        session = requests.Session()
+        sample = None  # CPU 측정에 쓸 검색 응답 본문
+        for name in args.apps.split(','):
+            app_server, url = serve(name, modules[name])
+            for path in PATHS[name]:
+                # 원본 응답 캐시, 내보내기 파일 생성
+                body = session.get(url + path, headers={'Accept-Encoding': 'identity'}).content
+                if sample is None:
+                    sample = body
+                for encoding in encodings:
+                    emit(dict(bench='response', app=name, path=path,
+                              **measure(session, url + path, encoding, args.requests, args.bandwidth)))
+            app_server.shutdown()
+
+        for encoding in compression.ENCODINGS:
+            every_time, cached = cpu_cost(sample, encoding, args.requests)
+            emit({'bench': 'cpu', 'bytes': len(sample), 'encoding': encoding,
+                  'compress_us': every_time, 'cached_us': cached})
+        emit({'bench': 'cache', **compression.stats()})
+    finally:
+        sys.stdout = out
+        server.shutdown()
+        if 'search_log' in sys.modules:
+            sys.modules['search_log'].search_log.close()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
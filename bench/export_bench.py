@@ -0,0 +1,112 @@
+# 내보내기 벤치마크: 기존 pandas create_excel과 스트리밍 내보내기의 최대 RSS/소요 시간 비교
+#   python bench/export_bench.py --rows 20000
+# 각 방식은 별도 프로세스에서 실행하여 최대 RSS가 서로 섞이지 않도록 한다.
+# legacy 방식은 pandas가 필요하다 (서비스 의존성에는 없음: pip install pandas==2.1.4).
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.synthetic import make_hospitals  # noqa: E402
+
+MODES = ['legacy', 'xlsx', 'csv', 'ndjson']
+
+
+def legacy_create_excel(hospitals):
+    """기존 api/index.py의 create_excel (DataFrame + BytesIO + getvalue 복사)"""
+    import pandas as pd
+    from io import BytesIO
+
+    selected_columns = [
+        'hmcNm', 'hmcNo', 'hmcTelNo', 'locAddr', 'locPostNo', 'ykindnm',
+        'grenChrgTypeCd', 'ichkChrgTypeCd', 'bcExmdChrgTypeCd', 'ccExmdChrgTypeCd',
+        'cvxcaExmdChrgTypeCd', 'lvcaExmdChrgTypeCd', 'stmcaExmdChrgTypeCd', 'mchkChrgTypeCd'
+    ]
+    df = pd.DataFrame(hospitals)[selected_columns]
+    column_mapping = {
+        'hmcNm': '검진기관명', 'hmcNo': '검진기관번호', 'hmcTelNo': '전화번호', 'locAddr': '주소',
+        'locPostNo': '우편번호', 'ykindnm': '기관종별', 'grenChrgTypeCd': '일반검진여부',
+        'ichkChrgTypeCd': '영유아검진여부', 'bcExmdChrgTypeCd': '유방암검진여부',
+        'ccExmdChrgTypeCd': '대장암검진여부', 'cvxcaExmdChrgTypeCd': '자궁경부암검진여부',
+        'lvcaExmdChrgTypeCd': '간암검진여부', 'stmcaExmdChrgTypeCd': '위암검진여부', 'mchkChrgTypeCd': '구강검진여부'
+    }
+    df = df.rename(columns=column_mapping)
+    for col in list(column_mapping.values())[6:]:
+        df[col] = df[col].map({'1': '가능', '0': '가능', '2': '불가능'})
+    excel_buffer = BytesIO()
+    with pd.ExcelWriter(excel_buffer, engine='openpyxl', mode='w') as writer:
+        df.to_excel(writer, index=False, sheet_name='검진기관목록')
+    return excel_buffer.getvalue()
+
+
+def max_rss_mb():
+    # Linux에서 ru_maxrss 단위는 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode, rows):
+    """한 가지 방식을 실행하고 결과를 dict로 반환 (자식 프로세스에서 호출)"""
+    hospitals = make_hospitals(rows)
+    if mode == 'legacy':
+        import pandas  # noqa: F401  import 비용은 측정에서 제외
+    else:
+        import exporter
+    baseline = max_rss_mb()
+
+    started = time.perf_counter()
+    size = 0
+    if mode == 'legacy':
+        size = len(legacy_create_excel(hospitals))
+    else:
+        for chunk in exporter.iter_export(hospitals, mode):
+            size += len(chunk)
+    elapsed = time.perf_counter() - started
+
+    peak = max_rss_mb()
+    return {
+        'mode': mode,
+        'rows': rows,
+        'seconds': round(elapsed, 3),
+        'bytes': size,
+        'baseline_rss_mb': round(baseline, 1),
+        'peak_rss_mb': round(peak, 1),
+        'export_rss_mb': round(peak - baseline, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_mode(args.run, args.rows)))
+        return
+
+    results = []
+    for mode in args.modes.split(','):
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run', mode, '--rows', str(args.rows)],
+            capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            results.append({'mode': mode, 'rows': args.rows, 'error': proc.stderr.strip().splitlines()[-1]})
+        else:
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        print(json.dumps(results[-1], ensure_ascii=False))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
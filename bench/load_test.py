@@ -0,0 +1,235 @@
+# 동시 접속 부하 테스트: 스레드 서버(Flask, api/index.py handler)와 ASGI 서버(asgi.py)의 처리량/지연 비교
+#   python bench/load_test.py --clients 100,200 --duration 10 --latency 100
+# 모의 API 서버와 각 앱 서버는 별도 프로세스로 띄우고, 이 프로세스는 부하만 생성한다.
+# 응답 캐시는 끄고(CACHE_MAX_BYTES=0) 요청마다 pageNo를 바꿔 모든 요청이 원본 API까지 가도록 한다.
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 서버 종류별 실행 명령 ({port}는 실행 시 채움)
+SERVERS = {
+    # gunicorn 기본 설정 (sync 워커 1개)
+    'gunicorn': ['gunicorn', '-w', '1', '-b', '127.0.0.1:{port}', 'main:app'],
+    # gunicorn 스레드 워커 (워커 1개, 스레드 수는 --threads)
+    'gunicorn-threads': ['gunicorn', '-w', '1', '--threads', '{threads}', '-b', '127.0.0.1:{port}', 'main:app'],
+    # Procfile과 같은 운영 설정 (gunicorn.conf.py: 워커 수 WEB_CONCURRENCY, 기본 CPU 코어 수)
+    'gunicorn-prefork': ['gunicorn', '-c', 'gunicorn.conf.py', '-b', '127.0.0.1:{port}', 'main:app'],
+    # Flask 개발 서버 (요청마다 스레드 생성)
+    'flask': [sys.executable, '-c', 'import main; main.app.run(host="127.0.0.1", port={port}, threaded=True)'],
+    # Vercel handler를 표준 라이브러리 ThreadingHTTPServer로 실행 (listen 대기열만 늘림)
+    'vercel': [sys.executable, '-c', 'from http.server import ThreadingHTTPServer; from api.index import handler; '
+               'server = type("Server", (ThreadingHTTPServer,), {{"request_queue_size": 1024}}); '
+               'server(("127.0.0.1", {port}), handler).serve_forever()'],
+    # ASGI (이벤트 루프 1개)
+    'asgi': ['uvicorn', '--host', '127.0.0.1', '--port', '{port}', '--log-level', 'warning', 'asgi:app']
+}
+
+# 경로별 요청 URL ({page}는 요청마다 바뀌는 페이지 번호)
+PATHS = {
+    'search': '/api/hospitals/search?hmcNm=%EB%B3%91%EC%9B%90&numOfRows=10&pageNo={page}',
+    'hospitals': '/api/hospitals?numOfRows=10&pageNo={page}',
+    'gpts': '/api/gpts/hospitals?numOfRows=5&pageNo={page}'
+}
+# vercel handler에는 /api/hospitals/search가 없으므로 같은 역할의 /api/hospitals 사용
+VERCEL_PATHS = {'search': 'hospitals'}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def percentile(values, ratio):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+class Connection:
+    """부하 생성용 최소 HTTP/1.1 클라이언트 (접속 하나, keep-alive가 끊기면 다시 연결)
+
+    httpx 등 범용 클라이언트는 동시 접속이 많으면 클라이언트 쪽이 먼저 병목이 되어 직접 구현했다.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.reconnects = 0
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def get(self, path):
+        """GET 요청 후 상태 코드 반환
+
+        재사용한 keep-alive 연결을 서버가 응답 없이 닫았으면 (워커 교체 등) 새로 연결해 한 번 다시 보낸다.
+        """
+        reused = self.writer is not None
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            self.writer.write(f'GET {path} HTTP/1.1\r\nHost: {self.host}\r\n\r\n'.encode('ascii'))
+            await self.writer.drain()
+            status_line = await self.reader.readline()
+        except OSError:
+            if not reused:
+                raise
+            status_line = b''
+        if not status_line:
+            await self.close()
+            if reused:
+                self.reconnects += 1
+                return await self.get(path)
+            raise ConnectionError("Connection closed")
+        version, status = status_line.split()[:2]
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+
+        if 'content-length' in headers:
+            await self.reader.readexactly(int(headers['content-length']))
+        else:
+            await self.reader.read()
+        if version == b'HTTP/1.0' or headers.get('connection', '').lower() == 'close' \
+                or 'content-length' not in headers:
+            await self.close()
+        return int(status)
+
+
+async def run_load(base_url, path, clients, duration, pages=1000):
+    """clients개의 동시 접속이 duration초 동안 쉬지 않고 요청 (페이지 번호는 1~pages를 돌아가며 사용)"""
+    address = urlparse(base_url)
+    page_numbers = itertools.count(1)
+    latencies = []
+    errors = 0
+    reconnects = 0
+    stop_at = time.monotonic() + duration
+
+    async def worker():
+        nonlocal errors, reconnects
+        connection = Connection(address.hostname, address.port)
+        while time.monotonic() < stop_at:
+            # 페이지 번호를 돌려 같은 요청이 겹치지 않게 함
+            url = path.format(page=next(page_numbers) % pages + 1)
+            started = time.perf_counter()
+            try:
+                ok = await connection.get(url) == 200
+            except (OSError, ValueError, asyncio.IncompleteReadError):
+                await connection.close()
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+        reconnects += connection.reconnects
+        await connection.close()
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    elapsed = time.monotonic() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'reconnects': reconnects,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'max_ms': round(max(latencies, default=0) * 1000, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--servers', default='gunicorn,gunicorn-threads,flask,vercel,asgi')
+    parser.add_argument('--paths', default='search')
+    parser.add_argument('--clients', default='100', help='동시 접속 수 (쉼표로 여러 개)')
+    parser.add_argument('--duration', type=float, default=10, help='측정 시간 (초)')
+    parser.add_argument('--latency', type=float, default=100, help='모의 API 응답 지연 (ms)')
+    parser.add_argument('--rows', type=int, default=12000)
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn-threads의 스레드 수')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    args = parser.parse_args()
+
+    mock_port = free_port()
+    mock = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, 'bench', 'mock_upstream.py'),
+        '--port', str(mock_port), '--rows', str(args.rows), '--latency', str(args.latency)
+    ], stdout=subprocess.DEVNULL)
+    wait_for_port(mock_port)
+
+    env = dict(
+        os.environ,
+        BASE_URL=f'http://127.0.0.1:{mock_port}/',
+        API_KEY='bench',
+        DATA_DIR=tempfile.mkdtemp(prefix='load_test_'),  # 스냅샷 없음: 항상 원본 API 호출
+        CACHE_MAX_BYTES='0',
+        UPSTREAM_RATE='0',
+        UPSTREAM_POOL_SIZE=str(max(int(c) for c in args.clients.split(','))),
+        PYTHONPATH=ROOT
+    )
+
+    results = []
+    try:
+        for server in args.servers.split(','):
+            port = free_port()
+            command = [part.format(port=port, threads=args.threads) for part in SERVERS[server]]
+            proc = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_for_port(port)
+                for path_name in args.paths.split(','):
+                    if server == 'vercel':
+                        path_name = VERCEL_PATHS.get(path_name, path_name)
+                    for clients in [int(c) for c in args.clients.split(',')]:
+                        result = asyncio.run(run_load(
+                            f'http://127.0.0.1:{port}', PATHS[path_name], clients, args.duration
+                        ))
+                        result = dict(server=server, path=path_name, clients=clients, **result)
+                        results.append(result)
+                        print(json.dumps(result, ensure_ascii=False), flush=True)
+            finally:
+                proc.terminate()
+                proc.wait()
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'latency_ms': args.latency, 'duration': args.duration, 'results': results},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
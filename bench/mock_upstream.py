@@ -0,0 +1,147 @@
+# 벤치마크용 공공데이터 API(건강검진기관 조회) 모의 서버
+#   python bench/mock_upstream.py --port 18080 --rows 12000 --latency 100 --error-rate 0.05 --max-rows 100
+# 응답 형식은 원본과 같은 response.header/body.items.item 구조이며,
+# 결과가 한 건이면 item이 목록이 아닌 dict로 오는 원본 동작도 그대로 따른다.
+# error-rate 비율만큼 무작위로 HTTP 503 또는 resultCode 오류(01 APPLICATION_ERROR)를 돌려주고,
+# max-rows를 주면 numOfRows를 그 값으로 제한한다 (응답의 numOfRows는 실제 적용된 값).
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.synthetic import make_hospitals  # noqa: E402
+
+# 부분 일치로 거르는 파라미터와 완전 일치로 거르는 파라미터
+CONTAINS_PARAMS = ['hmcNm', 'locAddr']
+EQUAL_PARAMS = ['siDoCd', 'siGunGuCd', 'hmcRdatCd']
+
+# 주입할 오류 종류
+ERROR_KINDS = ['http', 'result']
+
+
+def envelope(items, page_no, num_of_rows, total_count, result_code='00', result_msg='NORMAL SERVICE.'):
+    if len(items) == 1:
+        items = items[0]
+    return {
+        'response': {
+            'header': {'resultCode': result_code, 'resultMsg': result_msg},
+            'body': {
+                'items': {'item': items} if items else '',
+                'numOfRows': num_of_rows,
+                'pageNo': page_no,
+                'totalCount': total_count
+            }
+        }
+    }
+
+
+class MockServer(ThreadingHTTPServer):
+    # 동시 접속이 많아도 연결이 밀리지 않도록 listen 대기열을 늘림 (기본값 5)
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def make_handler(hospitals, latency=0.0, jitter=0.0, error_rate=0.0, max_rows=None, error_kinds=ERROR_KINDS,
+                 seed=0):
+    """모의 API 요청 처리 클래스 (latency/jitter는 초, max_rows는 numOfRows 상한)"""
+    filtered = {}  # 검색 조건 -> 걸러진 목록 (부하 테스트에서 모의 서버가 CPU를 덜 쓰도록)
+    rng = random.Random(seed)  # 같은 seed면 같은 순서로 오류 발생
+    rng_lock = threading.Lock()
+    counts = {'requests': 0, 'errors': 0}
+
+    def select(params):
+        key = tuple(params.get(name) or '' for name in CONTAINS_PARAMS + EQUAL_PARAMS)
+        if key not in filtered:
+            rows = hospitals
+            for name in CONTAINS_PARAMS:
+                if params.get(name):
+                    rows = [h for h in rows if params[name] in h[name]]
+            for name in EQUAL_PARAMS:
+                if params.get(name):
+                    rows = [h for h in rows if h[name] == params[name]]
+            filtered[key] = rows
+        return filtered[key]
+
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive
+        disable_nagle_algorithm = True  # 헤더와 본문을 따로 보낼 때 생기는 지연(Nagle + delayed ACK) 방지
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+            with rng_lock:
+                delay = latency + rng.uniform(0, jitter) if jitter else latency
+                error = rng.choice(error_kinds) if error_rate and rng.random() < error_rate else None
+                counts['requests'] += 1
+                counts['errors'] += error is not None
+            if delay:
+                time.sleep(delay)
+
+            page_no = int(params.get('pageNo') or 1)
+            num_of_rows = int(params.get('numOfRows') or 10)
+            if max_rows:
+                num_of_rows = min(num_of_rows, max_rows)
+
+            if error == 'http':
+                self.send_body({'message': 'Service Unavailable'}, 503)
+            elif error == 'result':
+                self.send_body(envelope([], page_no, num_of_rows, 0, '01', 'APPLICATION_ERROR'))
+            else:
+                rows = select(params)
+                items = rows[(page_no - 1) * num_of_rows:page_no * num_of_rows]
+                self.send_body(envelope(items, page_no, num_of_rows, len(rows)))
+
+        def send_body(self, data, status=200):
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json;charset=UTF-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    MockHandler.counts = counts
+    return MockHandler
+
+
+def start(port=0, rows=12000, latency=0.0, jitter=0.0, error_rate=0.0, max_rows=None):
+    """백그라운드 스레드에서 모의 서버 시작 (port=0이면 빈 포트): (server, base_url)
+
+    요청/오류 수는 server.RequestHandlerClass.counts로 확인할 수 있다.
+    """
+    server = MockServer(('127.0.0.1', port),
+                        make_handler(make_hospitals(rows), latency, jitter, error_rate, max_rows))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--rows', type=int, default=12000)
+    parser.add_argument('--latency', type=float, default=0, help='응답 지연 (ms)')
+    parser.add_argument('--jitter', type=float, default=0, help='추가 무작위 지연 최대값 (ms)')
+    parser.add_argument('--error-rate', type=float, default=0, help='오류 응답 비율 (0~1)')
+    parser.add_argument('--error-kinds', default=','.join(ERROR_KINDS), help='오류 종류 (http: 503, result: resultCode 01)')
+    parser.add_argument('--max-rows', type=int, help='numOfRows 상한 (원본 API의 페이지 크기 제한)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockServer(('127.0.0.1', args.port), make_handler(
+        make_hospitals(args.rows), args.latency / 1000, args.jitter / 1000, args.error_rate, args.max_rows,
+        args.error_kinds.split(','), args.seed
+    ))
+    print(f"Mock upstream: http://127.0.0.1:{args.port}/ ({args.rows} hospitals)", flush=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# 웹 UI 검색 응답 CPU 벤치마크: 원본 응답을 파싱/재직렬화하는 기존 방식과 본문을 그대로 끼워 넣는 방식 비교
+#   python bench/passthrough_bench.py --requests 500 --rows 100
+# 원본 API 응답은 캐시에 미리 넣어 두고(모의 API는 첫 요청에만 사용) 요청당 CPU 시간만 측정한다.
+#   app    app.py /api/hospitals (Flask test client)
+#   index  api/index.py /api/hospitals (소켓 쌍으로 handler 직접 실행)
+#   gpts   api/index.py /api/gpts/hospitals (응답을 변환하는 경로: JSON 라이브러리만 비교)
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import mock_upstream  # noqa: E402
+
+TARGETS = ['app', 'index', 'gpts']
+
+
+def index_get(handler, path):
+    """api/index.py handler로 GET 요청 하나 처리: (상태 코드, 본문)"""
+    server_end, client_end = socket.socketpair()
+    with server_end, client_end:
+        # 응답 전체가 버퍼에 들어가도록 (handler가 쓰는 동안 읽지 않음)
+        server_end.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+        client_end.sendall(f'GET {path} HTTP/1.0\r\nHost: bench\r\n\r\n'.encode('ascii'))
+        handler(server_end, ('127.0.0.1', 0), None)
+        server_end.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = client_end.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    head, _, body = b''.join(chunks).partition(b'\r\n\r\n')
+    return int(head.split()[1]), body
+
+
+def measure(request, count):
+    """count번 요청한 CPU/경과 시간 (첫 요청은 제외)"""
+    status, body = request()
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    for _ in range(count):
+        request()
+    return {
+        'status': status,
+        'bytes': len(body),
+        'cpu_us_per_request': round((time.process_time() - cpu_started) / count * 1e6, 1),
+        'wall_us_per_request': round((time.perf_counter() - started) / count * 1e6, 1)
+    }, body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--targets', default=','.join(TARGETS))
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--rows', type=int, default=100, help='numOfRows')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    args = parser.parse_args()
+
+    server, base_url = mock_upstream.start(rows=max(args.rows * 10, 1000))
+    os.environ.update(BASE_URL=base_url, API_KEY='bench', DATA_DIR=tempfile.mkdtemp(prefix='passthrough_bench_'),
+                      CACHE_TTL='86400', UPSTREAM_RATE='0')
+    # 앱들의 요청 로그는 버리고 결과만 출력
+    out = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+
+    import app
+    import fastjson
+    import passthrough
+    from api import index
+
+    handler = type('QuietHandler', (index.handler,), {'log_message': lambda self, format, *args: None})
+    client = app.app.test_client()
+    query = f'/api/hospitals?numOfRows={args.rows}&pageNo=1'
+    requests = {
+        'app': lambda: (lambda r: (r.status_code, r.get_data()))(client.get(query)),
+        'index': lambda: index_get(handler, query),
+        'gpts': lambda: index_get(handler, f'/api/gpts/hospitals?numOfRows={args.rows}&pageNo=1')
+    }
+
+    backends = ['json'] + (['orjson'] if fastjson.orjson is not None else [])
+    results = []
+    try:
+        for target in args.targets.split(','):
+            outputs = {}
+            for mode in (['parse', 'passthrough'] if target != 'gpts' else ['parse']):
+                for backend in backends:
+                    passthrough.WEB_PASSTHROUGH = mode == 'passthrough'
+                    fastjson.BACKEND = backend
+                    result, body = measure(requests[target], args.requests)
+                    outputs[(mode, backend)] = json.loads(body)
+                    result = dict(target=target, mode=mode, backend=backend, rows=args.rows, **result)
+                    results.append(result)
+                    print(json.dumps(result), file=out, flush=True)
+            # 모든 방식의 응답 내용이 같은지 확인
+            first = next(iter(outputs.values()))
+            if any(output != first for output in outputs.values()):
+                print(json.dumps({'target': target, 'error': 'responses differ between modes'}), file=out)
+    finally:
+        sys.stdout = out
+        server.shutdown()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+# 인기 검색 미리 갱신 벤치마크: 같은 트래픽을 미리 갱신 없이 / 있이 재생해 캐시 적중률, 지연, 원본 API 호출 수 비교
+#   python bench/prefetch_bench.py --duration 60 --rate 20 --ttl 10 --budget 60
+# 트래픽은 웹 UI 시도 선택 목록(18가지) x 검진종류타입(없음, 1~4)의 90가지 검색을 Zipf 분포로 고른다.
+# hot_hit_rate는 요청 비율 상위 --top-k개 검색만의 적중률이다.
+# 모드마다 새 프로세스에서 실행하며, prefetch 모드는 시작할 때 상위 검색을 미리 받는다 (저장된 인기 검색 없음 -> 시드).
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ['off', 'prefetch']
+
+
+def shapes():
+    import prefetch
+
+    result = []
+    for params in prefetch.SEED_PARAMS:
+        for hch_type in ['', '1', '2', '3', '4']:
+            result.append(dict(params, **({'hchType': hch_type} if hch_type else {})))
+    return result
+
+
+def child(args):
+    """자식 프로세스: 한 모드로 트래픽을 재생하고 결과 JSON 한 줄 출력"""
+    sys.path.insert(0, ROOT)
+    from bench import mock_upstream
+
+    server, base_url = mock_upstream.start(rows=args.rows, latency=args.latency / 1000)
+    out = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+
+    import cache
+    import prefetch
+
+    counts = server.RequestHandlerClass.counts
+    prefetcher = None
+    if args.mode == 'prefetch':
+        prefetcher = prefetch.start(base_url, 'bench', budget=args.budget, top_k=args.top_k,
+                                    interval=args.interval, lead=args.lead)
+        deadline = time.monotonic() + 30
+        while prefetcher.warmed + prefetcher.failed + prefetcher.skipped_budget < min(args.top_k, 18) \
+                and time.monotonic() < deadline:
+            time.sleep(0.05)
+    boot_calls = counts['requests']
+
+    rng = random.Random(0)
+    traffic = shapes()
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(len(traffic))]
+    hot = {cache.normalize_params(params) for params in traffic[:args.top_k]}  # 요청 비율 상위 top_k개 검색
+    hot_lookups = hot_hits = 0
+    latencies = []
+    before = cache.stats()
+    started = time.monotonic()
+    next_at = started
+    while time.monotonic() - started < args.duration:
+        params = dict(rng.choices(traffic, weights)[0], serviceKey='bench')
+        key = cache.normalize_params(params)
+        if key in hot:
+            ttl_left = cache.response_cache.ttl_left((base_url,) + key)
+            hot_lookups += 1
+            hot_hits += ttl_left is not None and ttl_left > 0
+        t0 = time.perf_counter()
+        cache.cached_get(base_url, params=params)
+        latencies.append(time.perf_counter() - t0)
+        next_at += 1 / args.rate
+        time.sleep(max(0, next_at - time.monotonic()))
+    after = cache.stats()
+
+    hits = after['hits'] - before['hits']
+    lookups = hits + after['misses'] - before['misses']
+    latencies.sort()
+    stats = prefetcher.stats() if prefetcher is not None else {}
+    sys.stdout = out
+    print(json.dumps({
+        'bench': 'prefetch', 'mode': args.mode, 'requests': len(latencies),
+        'hit_rate': round(hits / lookups, 4) if lookups else 0,
+        'hot_hit_rate': round(hot_hits / hot_lookups, 4) if hot_lookups else 0,
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+        'upstream_calls': counts['requests'],
+        'boot_calls': boot_calls,
+        'prefetch_calls': stats.get('upstream_calls', 0),
+        'refreshed': stats.get('refreshed', 0),
+        'skipped_budget': stats.get('skipped_budget', 0)
+    }))
+    if prefetcher is not None:
+        prefetcher.stop()
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--duration', type=float, default=60, help='트래픽 재생 시간(초)')
+    parser.add_argument('--rate', type=float, default=20, help='초당 요청 수')
+    parser.add_argument('--zipf', type=float, default=1.1, help='검색 인기 분포 지수')
+    parser.add_argument('--ttl', type=float, default=10, help='응답 캐시 TTL(초)')
+    parser.add_argument('--budget', type=int, default=60, help='미리 갱신 분당 호출 예산')
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=1, help='미리 갱신 확인 주기(초)')
+    parser.add_argument('--lead', type=float, default=2, help='만료까지 이 시간(초)보다 적게 남으면 갱신')
+    parser.add_argument('--rows', type=int, default=12000, help='가상 검진기관 수')
+    parser.add_argument('--latency', type=float, default=100, help='모의 API 응답 지연 (ms)')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    parser.add_argument('--mode', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        child(args)
+        return
+
+    results = []
+    for mode in args.modes.split(','):
+        env = dict(os.environ, CACHE_TTL=str(args.ttl), UPSTREAM_RATE='0',
+                   DATA_DIR=tempfile.mkdtemp(prefix='prefetch_bench_'))
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--mode', mode] + sys.argv[1:],
+                              env=env, cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{mode} failed: {proc.stderr[-2000:]}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
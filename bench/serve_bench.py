@@ -0,0 +1,197 @@
+# 운영 서버(gunicorn -c gunicorn.conf.py) 벤치마크: 워커 수별 처리량, 워커 메모리, 공유 캐시, 무중단 교체
+#   python bench/serve_bench.py --workers 1,2,4 --clients 32 --duration 10 --output serve_bench.json
+# 측정 항목
+#   scaling  워커 수별 로컬 검색 처리량/지연 (fuzzy: 메모리 검색 엔진, snapshot: 열 단위 스냅샷)
+#            data=shared는 마스터에서 올린 데이터를 fork로 공유, private는 워커마다 따로 올림 (SERVE_PRELOAD=0)
+#            rss_mb는 워커 RSS 합계, pss_mb는 공유 페이지를 나눠 센 실제 사용량 합계, uss_mb는 워커 고유 페이지 합계
+#   cache    스냅샷 없이 원본 API를 거치는 검색(페이지 1~--pages 반복): 워커 사이 공유 캐시(CACHE_SHARED_PATH)
+#            유무별 원본 호출 수 (공유하지 않으면 같은 페이지를 워커마다 따로 받음)
+#   reload   부하 중 새 스냅샷을 쓰고 워커 교체가 끝날 때까지의 실패 요청 수와 교체 시간
+# 부하 생성기(bench/load_test.py)도 같은 머신에서 돌므로 CPU 코어 수보다 많은 워커는 서로 CPU를 나눠 쓴다.
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import mock_upstream  # noqa: E402
+from bench.load_test import ROOT, free_port, run_load, wait_for_port  # noqa: E402
+
+# 경로별 요청 URL ({page}는 요청마다 바뀌는 페이지 번호)
+PATHS = {
+    'fuzzy': '/api/hospitals/search?searchMode=fuzzy&q=%EA%B0%95%EB%82%A8&numOfRows=10&pageNo={page}',
+    'snapshot': '/api/hospitals/search?hmcNm=%EB%B3%91%EC%9B%90&numOfRows=10&pageNo={page}',
+    'upstream': '/api/hospitals/search?numOfRows=10&pageNo={page}'
+}
+
+
+def write_snapshot(data_dir, rows, seed=0):
+    """data_dir에 가상 검진기관 스냅샷 생성 (별도 프로세스, 서버와 같은 환경 변수)"""
+    subprocess.run([sys.executable, '-c', 'import store; from bench.synthetic import make_hospitals; '
+                    f'store.write_snapshot(make_hospitals({rows}, seed={seed}))'],
+                   cwd=ROOT, env=dict(os.environ, DATA_DIR=data_dir, COLUMNAR_BUNDLE=''), check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+def workers_of(pid):
+    """gunicorn 마스터의 워커 pid 목록"""
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def memory(pids):
+    """워커들의 RSS/PSS/USS 합계(MB) (/proc/<pid>/smaps_rollup)"""
+    totals = {'rss_mb': 0, 'pss_mb': 0, 'uss_mb': 0}
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/smaps_rollup') as f:
+                fields = {line.split(':')[0]: int(line.split()[1]) for line in f if line.rstrip().endswith('kB')}
+        except OSError:
+            continue
+        totals['rss_mb'] += fields.get('Rss', 0) / 1024
+        totals['pss_mb'] += fields.get('Pss', 0) / 1024
+        totals['uss_mb'] += (fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)) / 1024
+    return {key: round(value, 1) for key, value in totals.items()}
+
+
+class Server:
+    """gunicorn -c gunicorn.conf.py main:app 실행"""
+
+    def __init__(self, workers, env):
+        self.port = free_port()
+        self.proc = subprocess.Popen(
+            ['gunicorn', '-c', 'gunicorn.conf.py', 'main:app'], cwd=ROOT,
+            env=dict(env, PORT=str(self.port), WEB_CONCURRENCY=str(workers)),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        self.url = f'http://127.0.0.1:{self.port}'
+        wait_for_port(self.port, timeout=120)
+        deadline = time.monotonic() + 60
+        while len(workers_of(self.proc.pid)) < workers and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+    def stop(self):
+        self.proc.terminate()
+        self.proc.wait()
+
+
+def load(server, path, clients, duration, pages=1000):
+    return asyncio.run(run_load(server.url, PATHS[path], clients, duration, pages))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', default=','.join(str(n) for n in sorted({1, 2, os.cpu_count() or 1})),
+                        help='워커 수 (쉼표로 여러 개, 기본 1,2,CPU 코어 수)')
+    parser.add_argument('--data', default='shared,private', help='shared(fork 공유) / private(워커마다 따로)')
+    parser.add_argument('--paths', default='fuzzy,snapshot')
+    parser.add_argument('--clients', type=int, default=32, help='동시 접속 수')
+    parser.add_argument('--duration', type=float, default=10, help='측정 시간 (초)')
+    parser.add_argument('--rows', type=int, default=12000, help='가상 검진기관 수')
+    parser.add_argument('--latency', type=float, default=100, help='모의 API 응답 지연 (ms)')
+    parser.add_argument('--pages', type=int, default=100, help='cache 측정에서 반복하는 페이지 수')
+    parser.add_argument('--skip', default='', help='건너뛸 측정 (scaling,cache,reload)')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    args = parser.parse_args()
+
+    worker_counts = [int(n) for n in args.workers.split(',')]
+    skip = set(args.skip.split(','))
+    mock, base_url = mock_upstream.start(rows=args.rows, latency=args.latency / 1000)
+    counts = mock.RequestHandlerClass.counts
+    base_env = dict(os.environ, BASE_URL=base_url, API_KEY='bench', COLUMNAR_BUNDLE='', UPSTREAM_RATE='0',
+                    SERVE_RELOAD_INTERVAL='0', PYTHONPATH=ROOT)
+    snapshot_dir = tempfile.mkdtemp(prefix='serve_bench_')
+    write_snapshot(snapshot_dir, args.rows)
+    results = []
+
+    def emit(result):
+        results.append(result)
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+
+    try:
+        if 'scaling' not in skip:
+            for data in args.data.split(','):
+                for workers in worker_counts:
+                    env = dict(base_env, DATA_DIR=snapshot_dir, SERVE_PRELOAD='1' if data == 'shared' else '0',
+                               CACHE_SHARED_PATH=os.path.join(snapshot_dir, f'cache_{data}_{workers}.db'))
+                    server = Server(workers, env)
+                    try:
+                        for path in args.paths.split(','):
+                            load(server, path, args.clients, 3)  # 워커마다 데이터/인덱스 준비
+                            result = load(server, path, args.clients, args.duration)
+                            emit(dict(bench='scaling', data=data, workers=workers, path=path, **result,
+                                      **memory(workers_of(server.proc.pid))))
+                    finally:
+                        server.stop()
+
+        if 'cache' not in skip:
+            # 스냅샷이 없으면 검색은 원본 API를 거친다
+            workers = max(worker_counts)
+            for shared in [False, True]:
+                data_dir = tempfile.mkdtemp(prefix='serve_bench_cache_')
+                env = dict(base_env, DATA_DIR=data_dir, UPSTREAM_POOL_SIZE=str(args.clients),
+                           CACHE_SHARED_PATH=os.path.join(data_dir, 'cache.db') if shared else '')
+                server = Server(workers, env)
+                before = counts['requests']
+                try:
+                    result = load(server, 'upstream', args.clients, args.duration, args.pages)
+                finally:
+                    server.stop()
+                emit(dict(bench='cache', workers=workers, shared_cache=shared, **result,
+                          upstream_calls=counts['requests'] - before))
+
+        if 'reload' not in skip:
+            # 부하를 주는 동안 새 스냅샷을 쓰고 마스터가 워커를 교체할 때까지 측정 (스냅샷 생성 시간을 포함해 최소 20초)
+            workers = max(worker_counts)
+            data_dir = tempfile.mkdtemp(prefix='serve_bench_reload_')
+            write_snapshot(data_dir, args.rows)
+            env = dict(base_env, DATA_DIR=data_dir, SERVE_RELOAD_INTERVAL='1',
+                       CACHE_SHARED_PATH=os.path.join(data_dir, 'cache.db'))
+            server = Server(workers, env)
+            try:
+                before = set(workers_of(server.proc.pid))
+                swapped = {}
+
+                async def reload_during_load():
+                    task = asyncio.create_task(run_load(server.url, PATHS['fuzzy'], args.clients,
+                                                        max(args.duration, 20)))
+                    await asyncio.sleep(1)
+                    started = time.monotonic()
+                    await asyncio.to_thread(write_snapshot, data_dir, args.rows - 1000, 1)
+                    written = time.monotonic()
+                    while not task.done():
+                        current = set(workers_of(server.proc.pid))
+                        if 'at' not in swapped and len(current) == workers and not current & before:
+                            swapped['at'] = time.monotonic()
+                        await asyncio.sleep(0.05)
+                    swapped.update(write_s=round(written - started, 2),
+                                   swap_s=round(swapped['at'] - written, 2) if 'at' in swapped else None)
+                    return await task
+
+                result = asyncio.run(reload_during_load())
+                with urllib.request.urlopen(server.url + '/api/hospitals/stats') as response:
+                    rows_after = json.load(response)['total_count']  # 교체된 워커가 새 스냅샷을 쓰는지 확인
+            finally:
+                server.stop()
+            emit(dict(bench='reload', workers=workers, **result, snapshot_write_s=swapped['write_s'],
+                      workers_swapped_s=swapped['swap_s'], rows_before=args.rows, rows_after=rows_after))
+    finally:
+        mock.shutdown()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'cpu_count': os.cpu_count(), 'clients': args.clients, 'duration': args.duration,
+                       'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
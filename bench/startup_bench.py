@@ -0,0 +1,155 @@
+# 콜드 스타트 벤치마크: 앱 모듈 import 시간, 첫 응답 시간, RSS, 불러온 무거운 모듈
+#   python bench/startup_bench.py --repeat 5 --output startup_bench.json
+#   python bench/startup_bench.py --max-import-ms 150   # import 시간이 넘으면 종료 코드 1 (회귀 확인)
+# 측정마다 새 프로세스에서 앱 모듈을 import하고 첫 요청 하나를 처리한다 (서버리스 함수가 새로 뜰 때와 같은 상태).
+#   upstream  스냅샷 없음: 첫 요청이 모의 API까지 감
+#   snapshot  열 단위 스냅샷(bench용 DATA_DIR)이 있음: 원본 API 없이 응답
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 앱별 모듈과 첫 요청 경로 (api/index.py는 GPTs 검색)
+TARGETS = {
+    'index': ('api.index', '/api/gpts/hospitals?siDoCd=11&hmcNm=%EB%B3%91%EC%9B%90'),
+    'app': ('app', '/api/hospitals?siDoCd=11&numOfRows=10'),
+    'main': ('main', '/api/hospitals/search?siDoCd=11&numOfRows=10')
+}
+MODES = ['upstream', 'snapshot']
+
+# 콜드 스타트에서 불러오면 안 되는(또는 불러오는지 지켜볼) 모듈
+HEAVY_MODULES = ['numpy', 'pandas', 'openpyxl', 'requests', 'asyncio', 'aiohttp']
+
+
+def rss_mb():
+    import resource
+
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+
+
+def child(target):
+    """자식 프로세스: 앱 모듈 import와 첫 요청 하나를 측정해 JSON 한 줄 출력"""
+    import importlib
+
+    module_name, path = TARGETS[target]
+    sys.path.insert(0, ROOT)
+    # 앱들의 로그는 버리고 결과만 출력
+    out = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    imported = time.perf_counter()
+    loaded_after_import = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    if target == 'index':
+        from bench.passthrough_bench import index_get
+
+        status, body = index_get(module.handler, path)
+    else:
+        response = module.app.test_client().get(path)
+        status, body = response.status_code, response.get_data()
+    responded = time.perf_counter()
+
+    sys.stdout = out
+    print(json.dumps({
+        'import_ms': round((imported - started) * 1000, 2),
+        'first_response_ms': round((responded - imported) * 1000, 2),
+        'rss_mb': round(rss_mb() - rss_before, 2),
+        'status': status,
+        'bytes': len(body),
+        'heavy_after_import': loaded_after_import,
+        'heavy_after_response': [name for name in HEAVY_MODULES if name in sys.modules]
+    }))
+
+
+def run(target, env):
+    """자식 프로세스 하나 실행: 결과 dict (process_ms는 인터프리터 시작부터 응답까지)"""
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', target],
+                          env=env, cwd=ROOT, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"{target} startup failed: {proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['process_ms'] = round(elapsed * 1000, 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--targets', default=','.join(TARGETS))
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--repeat', type=int, default=5, help='측정 횟수 (중앙값 보고)')
+    parser.add_argument('--rows', type=int, default=12000, help='가상 검진기관 수')
+    parser.add_argument('--latency', type=float, default=20, help='모의 API 응답 지연 (ms)')
+    parser.add_argument('--max-import-ms', type=float, help='import 시간 상한 (넘으면 종료 코드 1)')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    sys.path.insert(0, ROOT)
+    from bench.load_test import free_port, wait_for_port
+
+    mock_port = free_port()
+    mock = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, 'bench', 'mock_upstream.py'), '--port', str(mock_port),
+        '--rows', str(args.rows), '--latency', str(args.latency)
+    ], stdout=subprocess.DEVNULL)
+
+    data_dirs = {mode: tempfile.mkdtemp(prefix=f'startup_bench_{mode}_') for mode in MODES}
+    base_env = dict(os.environ, BASE_URL=f'http://127.0.0.1:{mock_port}/', API_KEY='bench',
+                    COLUMNAR_BUNDLE='')
+    results = []
+    failed = False
+    try:
+        wait_for_port(mock_port)
+        if 'snapshot' in args.modes.split(','):
+            subprocess.run([sys.executable, '-c', (
+                'import columnar\n'
+                'from bench.synthetic import make_hospitals\n'
+                f'columnar.write(make_hospitals({args.rows}))\n'
+            )], env=dict(base_env, DATA_DIR=data_dirs['snapshot']), cwd=ROOT, check=True)
+
+        for mode in args.modes.split(','):
+            env = dict(base_env, DATA_DIR=data_dirs[mode])
+            for target in args.targets.split(','):
+                runs = [run(target, env) for _ in range(args.repeat)]
+                result = {'bench': 'startup', 'app': target, 'mode': mode, 'path': TARGETS[target][1],
+                          'status': runs[-1]['status'], 'heavy_after_import': runs[-1]['heavy_after_import'],
+                          'heavy_after_response': runs[-1]['heavy_after_response']}
+                for key in ('import_ms', 'first_response_ms', 'process_ms', 'rss_mb'):
+                    result[key] = round(statistics.median(r[key] for r in runs), 2)
+                if args.max_import_ms is not None and result['import_ms'] > args.max_import_ms:
+                    result['over_limit'] = True
+                    failed = True
+                results.append(result)
+                print(json.dumps(result, ensure_ascii=False), flush=True)
+    finally:
+        mock.terminate()
+        mock.wait()
+        for data_dir in data_dirs.values():
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
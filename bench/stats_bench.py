@@ -0,0 +1,130 @@
+# 집계 통계 벤치마크: 전체 목록 수집 후 직접 집계 / 메모리 레코드 집계 / 미리 계산한 집계(rollup.query)
+#   python bench/stats_bench.py --rows 12000 --repeat 50 --output stats_bench.json
+# 측정 항목
+#   full_pull  get_all_hospitals(모의 API 전체 페이지) + 레코드 집계 (기존 방식)
+#   records    메모리에 올린 전체 레코드를 매번 다시 집계
+#   rollup     스냅샷의 집계 행만 다시 묶음 (첫 조회는 집계 인덱스 생성 포함)
+#   delta      증분 동기화로 레코드가 바뀐 뒤 집계 테이블이 전체 재계산 결과와 같은지, 반영 시간
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import mock_upstream  # noqa: E402
+from bench.synthetic import make_hospitals  # noqa: E402
+
+# (이름, 쿼리 파라미터)
+QUERIES = [
+    ('by_sido', {'groupBy': 'siDoCd'}),
+    ('sido_colon_by_rating', {'groupBy': 'siDoCd,hmcRdatCd', 'examTypes': 'colon'}),
+    ('seoul_by_gungu_exam', {'groupBy': 'siGunGuCd,examType', 'siDoCd': '11'}),
+    ('all_dimensions', {'groupBy': 'siDoCd,siGunGuCd,ykindnm,examType,hmcRdatCd'})
+]
+
+
+def group_records(hospitals, params):
+    """레코드를 직접 집계 (rollup.query와 같은 결과)"""
+    import exam_index
+    import rollup
+
+    group_by, filters, all_of, any_of = rollup.parse(params)
+    groups = Counter()
+    total = 0
+    for hospital in hospitals:
+        if any((hospital.get(key) or '') != value for key, value in filters.items()):
+            continue
+        mask = exam_index.exam_mask(hospital)
+        if (all_of and mask & all_of != all_of) or (any_of and not mask & any_of):
+            continue
+        total += 1
+        codes = [code for bit, (code, _, _, _) in enumerate(exam_index.EXAM_TYPES) if mask & (1 << bit)] \
+            if rollup.EXAM_DIMENSION in group_by else [None]
+        for code in codes:
+            groups[tuple(code if name == rollup.EXAM_DIMENSION else hospital.get(name) or ''
+                          for name in group_by)] += 1
+    return total, [dict(zip(group_by, key), count=count) for key, count in sorted(groups.items())]
+
+
+def timed(func, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - started)
+    return result, round(statistics.median(times) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=12000, help='가상 검진기관 수')
+    parser.add_argument('--repeat', type=int, default=50, help='반복 횟수 (중앙값 보고)')
+    parser.add_argument('--latency', type=float, default=20, help='모의 API 응답 지연 (ms)')
+    parser.add_argument('--changes', type=int, default=300, help='증분 동기화에서 바꿀 레코드 수')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    args = parser.parse_args()
+
+    hospitals = make_hospitals(args.rows)
+    server, base_url = mock_upstream.start(rows=args.rows, latency=args.latency / 1000)
+    os.environ.update(BASE_URL=base_url, API_KEY='bench', DATA_DIR=tempfile.mkdtemp(prefix='stats_bench_'),
+                      COLUMNAR_BUNDLE='', UPSTREAM_RATE='0', CACHE_MAX_BYTES='0')
+    out = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+
+    import delta_sync
+    import rollup
+    import store
+    from api import index
+
+    results = []
+
+    def emit(result):
+        results.append(result)
+        print(json.dumps(result, ensure_ascii=False), file=out, flush=True)
+
+    try:
+        store.write_snapshot(hospitals)
+        started = time.perf_counter()
+        rollup.get_index()
+        emit({'bench': 'rollup_load', 'cells': len(rollup.get_index()[1].counts),
+              'ms': round((time.perf_counter() - started) * 1000, 2)})
+
+        for name, params in QUERIES:
+            expected, full_ms = timed(lambda: group_records(index.get_all_hospitals(), params), 1)
+            _, records_ms = timed(lambda: group_records(hospitals, params), max(args.repeat // 10, 1))
+            result, rollup_ms = timed(lambda: rollup.query(params), args.repeat)
+            emit({'bench': 'query', 'query': name, 'groups': len(result['groups']),
+                  'matches': (result['total_count'], result['groups']) == expected,
+                  'full_pull_ms': full_ms, 'records_ms': records_ms, 'rollup_ms': rollup_ms})
+
+        # 증분 동기화: 일부 레코드의 지역/검진종류를 바꾸고 마지막 50건을 삭제
+        changed = [dict(hospital) for hospital in hospitals[:-50]]
+        for hospital in random.Random(1).sample(changed, min(args.changes, len(changed))):
+            hospital.update(siDoCd='99', ccExmdChrgTypeCd='2')
+        mock = mock_upstream.MockServer(('127.0.0.1', 0), mock_upstream.make_handler(changed))
+        threading.Thread(target=mock.serve_forever, daemon=True).start()
+        report = delta_sync.sync(f'http://127.0.0.1:{mock.server_address[1]}/', 'bench')
+        mock.shutdown()
+        result = rollup.query({'groupBy': 'siDoCd,siGunGuCd,ykindnm,examType,hmcRdatCd'})
+        emit({'bench': 'delta', 'updated': report['updated'], 'deleted': report['deleted'],
+              'sync_seconds': report['elapsed'],
+              'matches_rebuild': (result['total_count'], result['groups']) == group_records(
+                  changed, {'groupBy': 'siDoCd,siGunGuCd,ykindnm,examType,hmcRdatCd'})})
+    finally:
+        sys.stdout = out
+        server.shutdown()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,335 @@
+# 벤치마크 모음: 모의 API 서버를 띄우고 세 앱(main.py, app.py, api/index.py)의 주요 경로를 측정해 JSON으로 저장
+#   python bench/suite.py --rows 12000 --latency 20 --output bench_results.json
+#   python bench/suite.py --baseline bench_results.json   # 이전 결과와 비교 (회귀 확인)
+# 측정 항목
+#   search      검색 지연 (원본 API 경유 / 로컬 스냅샷), 앱별
+#   gpts        GPTs 검색 지연 (api/index.py)
+#   format      원본 API 한 페이지(100건)를 앱별 응답 본문으로 만드는 처리량
+#   full_fetch  전체 목록 수집 시간 (fetcher)
+#   export      내보내기 파일 생성 시간/메모리 (bench/export_bench.py)와 엑셀 다운로드 (첫 요청/이후 요청)
+#   startup     새 프로세스의 앱 모듈 import 시간, 첫 응답 시간, RSS (bench/startup_bench.py)
+# 앱은 이 프로세스 안에서 스레드 서버로 띄우고, 모의 API 서버는 별도 프로세스로 실행한다.
+# 응답 캐시는 끄고(CACHE_MAX_BYTES=0) 호출 수 제한도 없앤다(UPSTREAM_RATE=0).
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.load_test import ROOT, free_port, percentile, wait_for_port  # noqa: E402
+
+BENCHES = ['search', 'gpts', 'format', 'full_fetch', 'export', 'startup']
+
+# 앱별 경로 (없는 경로는 측정하지 않음)
+APPS = {
+    'main': {'search': '/api/hospitals/search'},
+    'app': {'search': '/api/hospitals', 'excel': '/api/hospitals/excel'},
+    'index': {'search': '/api/hospitals', 'excel': '/api/hospitals/excel', 'gpts': '/api/gpts/hospitals'}
+}
+
+# 검색 조건 (차례로 돌아가며 사용)
+QUERIES = [
+    {'hmcNm': '병원'},
+    {'siDoCd': '11'},
+    {'siDoCd': '41', 'hmcRdatCd': '1'},
+    {'locAddr': '중앙로'},
+    {}
+]
+
+# 이전 결과와 비교할 값: 이름 끝이 이 중 하나면 작을수록 좋음 / 클수록 좋음
+LOWER_IS_BETTER = ('_ms', 'seconds', '_mb')
+HIGHER_IS_BETTER = ('_per_s',)
+
+
+def serve(name, module):
+    """앱을 스레드 서버로 실행: base_url"""
+    if name == 'index':
+        handler = type('QuietHandler', (module.handler,), {'log_message': lambda self, format, *args: None})
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    else:
+        from werkzeug.serving import make_server
+
+        server = make_server('127.0.0.1', 0, module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def queries(count, num_of_rows=10):
+    for i in range(count):
+        yield dict(QUERIES[i % len(QUERIES)], numOfRows=str(num_of_rows), pageNo=str(i // len(QUERIES) % 5 + 1))
+
+
+def measure_latency(session, url, count, num_of_rows=10, warmup=3):
+    """같은 경로로 검색 조건을 바꿔 가며 count번 순서대로 요청"""
+    for params in queries(warmup, num_of_rows):
+        session.get(url, params=params)
+
+    latencies = []
+    errors = 0
+    for params in queries(count, num_of_rows):
+        started = time.perf_counter()
+        response = session.get(url, params=params)
+        elapsed = time.perf_counter() - started
+        if response.status_code == 200:
+            latencies.append(elapsed)
+        else:
+            errors += 1
+    return {
+        'requests': count,
+        'errors': errors,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2)
+    }
+
+
+def measure_throughput(func, seconds):
+    """seconds초 동안 func를 반복 실행: 초당 실행 횟수"""
+    func()
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        func()
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def formatters(modules, data, api_params):
+    """앱별로 원본 API 응답 한 페이지를 실제 응답 본문(bytes)으로 만드는 함수"""
+    main, app, index = modules['main'], modules['app'], modules['index']
+    search_params = main.parse_search_params(api_params)
+
+    def format_main():
+        with main.app.app_context():
+            body, _ = main.search_result(search_params, data)
+            return main.jsonify(body).get_data()
+
+    def format_app():
+        with app.app.app_context():
+            return app.jsonify({'status': 'success', 'request_params': api_params, 'data': data}).get_data()
+
+    def format_index():
+        return json.dumps(index.gpts_result(data, api_params), ensure_ascii=False).encode('utf-8')
+
+    return {'main': format_main, 'app': format_app, 'index': format_index}
+
+
+def run_export_bench(rows):
+    """bench/export_bench.py를 별도 프로세스로 실행 (최대 RSS가 이 프로세스와 섞이지 않도록)"""
+    proc = subprocess.run(
+        [sys.executable, os.path.join(ROOT, 'bench', 'export_bench.py'), '--rows', str(rows),
+         '--modes', 'xlsx,csv,ndjson'],
+        capture_output=True, text=True, cwd=ROOT
+    )
+    return [json.loads(line) for line in proc.stdout.splitlines() if line.startswith('{')]
+
+
+def run_startup_bench(app_names, rows, latency):
+    """bench/startup_bench.py를 별도 프로세스로 실행 (측정마다 새 프로세스가 필요함)"""
+    proc = subprocess.run(
+        [sys.executable, os.path.join(ROOT, 'bench', 'startup_bench.py'), '--targets', ','.join(app_names),
+         '--rows', str(rows), '--latency', str(latency)],
+        capture_output=True, text=True, cwd=ROOT
+    )
+    return [json.loads(line) for line in proc.stdout.splitlines() if line.startswith('{')]
+
+
+def result_key(result):
+    return result['bench'], result.get('app'), result.get('mode')
+
+
+def compare(results, baseline):
+    """이전 결과와 같은 항목의 수치 비교 (change_pct가 양수면 나빠짐)"""
+    previous = {result_key(result): result for result in baseline['results']}
+    rows = []
+    for result in results:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        for field, value in result.items():
+            if not isinstance(value, (int, float)) or not isinstance(old.get(field), (int, float)) or not old[field]:
+                continue
+            if field.endswith(LOWER_IS_BETTER):
+                sign = 1
+            elif field.endswith(HIGHER_IS_BETTER):
+                sign = -1
+            else:
+                continue
+            rows.append({
+                'bench': result['bench'], 'app': result.get('app'), 'mode': result.get('mode'), 'field': field,
+                'baseline': old[field], 'current': value,
+                'change_pct': round(sign * (value - old[field]) / old[field] * 100, 1)
+            })
+    return rows
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=ROOT).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--benches', default=','.join(BENCHES))
+    parser.add_argument('--apps', default=','.join(APPS))
+    parser.add_argument('--rows', type=int, default=12000, help='가상 검진기관 수')
+    parser.add_argument('--latency', type=float, default=20, help='모의 API 응답 지연 (ms)')
+    parser.add_argument('--jitter', type=float, default=0, help='모의 API 추가 무작위 지연 최대값 (ms)')
+    parser.add_argument('--error-rate', type=float, default=0, help='모의 API 오류 응답 비율 (0~1)')
+    parser.add_argument('--max-rows', type=int, help='모의 API numOfRows 상한')
+    parser.add_argument('--requests', type=int, default=100, help='검색 지연 측정 요청 수')
+    parser.add_argument('--seconds', type=float, default=2, help='처리량 측정 시간 (초)')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    parser.add_argument('--baseline', help='비교할 이전 결과 JSON')
+    args = parser.parse_args()
+    benches = args.benches.split(',')
+    app_names = args.apps.split(',')
+
+    mock_port = free_port()
+    mock_command = [
+        sys.executable, os.path.join(ROOT, 'bench', 'mock_upstream.py'), '--port', str(mock_port),
+        '--rows', str(args.rows), '--latency', str(args.latency), '--jitter', str(args.jitter),
+        '--error-rate', str(args.error_rate)
+    ]
+    if args.max_rows:
+        mock_command += ['--max-rows', str(args.max_rows)]
+    mock = subprocess.Popen(mock_command, stdout=subprocess.DEVNULL)
+
+    data_dir = tempfile.mkdtemp(prefix='bench_suite_')
+    # 앱 모듈은 import할 때 환경 변수를 읽으므로 먼저 설정
+    os.environ.update(
+        BASE_URL=f'http://127.0.0.1:{mock_port}/',
+        API_KEY='bench',
+        DATA_DIR=data_dir,  # 처음에는 스냅샷 없음: 검색은 원본 API 경유
+        CACHE_MAX_BYTES='0',
+        UPSTREAM_RATE='0'
+    )
+    # 앱들의 요청 로그는 버리고 결과만 출력
+    out = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    import logging
+
+    logging.disable(logging.INFO)
+
+    results = []
+
+    def emit(result):
+        results.append(result)
+        print(json.dumps(result, ensure_ascii=False), file=out, flush=True)
+
+    try:
+        wait_for_port(mock_port)
+
+        import requests
+
+        import app
+        import artifacts
+        import cache
+        import fetcher
+        import main as main_app
+        import store
+        from api import index
+
+        modules = {'main': main_app, 'app': app, 'index': index}
+        urls = {name: serve(name, modules[name]) for name in app_names}
+        session = requests.Session()
+
+        if 'search' in benches:
+            for name in app_names:
+                emit(dict(bench='search', app=name, mode='upstream',
+                          **measure_latency(session, urls[name] + APPS[name]['search'], args.requests)))
+
+        if 'gpts' in benches and 'index' in app_names:
+            emit(dict(bench='gpts', app='index', mode='upstream',
+                      **measure_latency(session, urls['index'] + APPS['index']['gpts'], args.requests, 5)))
+
+        if 'format' in benches:
+            api_params = index.web_api_params({'numOfRows': '100'})
+            data = cache.cached_get(os.environ['BASE_URL'], params=api_params).json()
+            page_rows = len(fetcher.extract_items(data))  # numOfRows 상한이 있으면 100건보다 적음
+            for name, func in formatters(modules, data, api_params).items():
+                if name in app_names:
+                    pages_per_s = measure_throughput(func, args.seconds)
+                    emit({'bench': 'format', 'app': name, 'mode': f'page{page_rows}',
+                          'pages_per_s': round(pages_per_s, 1), 'hospitals_per_s': round(pages_per_s * page_rows)})
+
+        if 'full_fetch' in benches:
+            started = time.perf_counter()
+            hospitals, report = fetcher.fetch_all_hospitals(os.environ['BASE_URL'], 'bench', allow_partial=True)
+            emit({'bench': 'full_fetch', 'app': None, 'mode': f"workers{report['workers']}",
+                  'seconds': round(time.perf_counter() - started, 3), 'fetched': report['fetched'],
+                  'total_count': report['total_count'], 'pages': report['pages'], 'page_size': report['page_size'],
+                  'failed_pages': len(report['failed_pages']), 'retries': report['retries'],
+                  'page_p95_ms': round(report['page_time']['p95'] * 1000, 1)})
+
+        if 'export' in benches:
+            for result in run_export_bench(args.rows):
+                emit(dict(bench='export', app=None, mode=result.pop('mode'), **result))
+            for name in app_names:
+                path = APPS[name].get('excel')
+                if path is None:
+                    continue
+                # 첫 요청은 전체 목록 수집과 파일 생성을 포함
+                shutil.rmtree(artifacts.EXPORT_DIR, ignore_errors=True)
+                for mode in ['cold', 'warm']:
+                    started = time.perf_counter()
+                    response = session.get(urls[name] + path, params={'format': 'xlsx'})
+                    emit({'bench': 'export', 'app': name, 'mode': f'download_{mode}',
+                          'status': response.status_code, 'bytes': len(response.content),
+                          'seconds': round(time.perf_counter() - started, 3)})
+
+        if 'startup' in benches:
+            for result in run_startup_bench(app_names, args.rows, args.latency):
+                emit(result)
+
+        if 'search' in benches:
+            # 스냅샷을 만든 뒤 같은 검색을 로컬 조회로 다시 측정
+            store.sync(index.get_all_hospitals)
+            for name in app_names:
+                emit(dict(bench='search', app=name, mode='snapshot',
+                          **measure_latency(session, urls[name] + APPS[name]['search'], args.requests)))
+    finally:
+        mock.terminate()
+        mock.wait()
+        if 'search_log' in sys.modules:
+            sys.modules['search_log'].search_log.close()
+        shutil.rmtree(data_dir, ignore_errors=True)
+        sys.stdout = out
+
+    report = {
+        'meta': {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': vars(args)
+        },
+        'results': results
+    }
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            report['comparison'] = compare(results, json.load(f))
+        for row in report['comparison']:
+            print(json.dumps(row, ensure_ascii=False))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+# 벤치마크용 가상 검진기관 데이터 생성
+import random
+
+SIDO = {
+    '11': '서울특별시', '26': '부산광역시', '27': '대구광역시', '28': '인천광역시',
+    '29': '광주광역시', '30': '대전광역시', '31': '울산광역시', '36': '세종특별자치시',
+    '41': '경기도', '42': '강원도', '43': '충청북도', '44': '충청남도',
+    '45': '전라북도', '46': '전라남도', '47': '경상북도', '48': '경상남도', '50': '제주특별자치도'
+}
+KINDS = ['의원', '병원', '종합병원', '상급종합병원', '보건소', '치과의원']
+NAME_WORDS = ['서울', '하나', '연세', '삼성', '건강', '우리', '중앙', '새봄', '밝은', '튼튼', '사랑', '제일']
+STREETS = ['중앙로', '대학로', '시청로', '역전로', '번영로', '평화로', '행복로']
+
+
+def make_hospital(i, rng):
+    sido = rng.choice(list(SIDO))
+    gungu = f'{sido}{rng.randint(1, 30):03d}'
+    return {
+        'hmcNo': f'{31000000 + i}',
+        'hmcNm': f'{rng.choice(NAME_WORDS)}{rng.choice(NAME_WORDS)}{rng.choice(KINDS)} {i}',
+        'hmcTelNo': f'0{rng.randint(2, 64)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}',
+        'locAddr': f'{SIDO[sido]} {rng.choice(STREETS)} {rng.randint(1, 300)}',
+        'locPostNo': f'{rng.randint(1000, 63999):05d}',
+        'exmdrFaxNo': f'0{rng.randint(2, 64)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}',
+        'exmdrTelNo': f'0{rng.randint(2, 64)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}',
+        'ykindnm': rng.choice(KINDS),
+        'siDoCd': sido,
+        'siGunGuCd': gungu,
+        'hmcRdatCd': rng.choice(['1', '2', '3', '4', '']),
+        'grenChrgTypeCd': rng.choice(['1', '2']),
+        'ichkChrgTypeCd': rng.choice(['1', '2']),
+        'bcExmdChrgTypeCd': rng.choice(['0', '2']),
+        'ccExmdChrgTypeCd': rng.choice(['0', '2']),
+        'cvxcaExmdChrgTypeCd': rng.choice(['0', '2']),
+        'lvcaExmdChrgTypeCd': rng.choice(['0', '2']),
+        'stmcaExmdChrgTypeCd': rng.choice(['0', '2']),
+        'mchkChrgTypeCd': rng.choice(['0', '2'])
+    }
+
+
+def make_hospitals(count, seed=0):
+    """count개의 가상 검진기관 레코드 (seed가 같으면 항상 같은 데이터)"""
+    rng = random.Random(seed)
+    return [make_hospital(i, rng) for i in range(count)]
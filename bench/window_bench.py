@@ -0,0 +1,137 @@
+# 큰 결과 구간 벤치마크: 클라이언트가 pageNo를 차례로 넘기는 방식과 서버 구간 조회(offset/limit, NDJSON 스트리밍) 비교
+#   python bench/window_bench.py --limits 500,1000,5000 --latency 100
+# 측정 항목
+#   client_serial  /api/hospitals?pageNo=N&numOfRows=100을 차례로 호출해 limit건을 모으는 시간
+#   window         /api/hospitals?offset=0&limit=N 첫 줄까지 시간(ttfb)과 전체 시간
+#   memory         구간 조회 본문을 끝까지 생성할 때 파이썬 메모리 최대 증가량 (limit과 관계없이 일정해야 함)
+# 응답 캐시는 끄고(CACHE_MAX_BYTES=0) 모든 페이지가 모의 API까지 가도록 한다.
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import mock_upstream  # noqa: E402
+
+PAGE_ROWS = 100
+
+
+def serve(name, module):
+    """앱을 스레드 서버로 실행: (server, base_url)"""
+    if name == 'index':
+        # 기본값(HTTP/1.0)이면 구간 조회 본문은 연결을 닫을 때까지 그대로 스트리밍됨
+        handler = type('QuietHandler', (module.handler,), {'log_message': lambda self, format, *args: None})
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    else:
+        from werkzeug.serving import make_server
+
+        server = make_server('127.0.0.1', 0, module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def client_serial(session, url, limit):
+    started = time.perf_counter()
+    rows = 0
+    page_no = 1
+    while rows < limit:
+        data = session.get(url, params={'pageNo': page_no, 'numOfRows': PAGE_ROWS}).json()
+        items = data['data']['response']['body']['items']
+        items = items.get('item', []) if isinstance(items, dict) else []
+        if not items:
+            break
+        rows += len(items) if isinstance(items, list) else 1
+        page_no += 1
+    return {'rows': min(rows, limit), 'seconds': round(time.perf_counter() - started, 3)}
+
+
+def window(session, url, limit):
+    started = time.perf_counter()
+    ttfb = None
+    rows = 0
+    with session.get(url, params={'offset': 0, 'limit': limit}, stream=True) as response:
+        for line in response.iter_lines():
+            if ttfb is None:
+                ttfb = time.perf_counter() - started
+            if line:
+                rows += 1
+        chunked = response.headers.get('Transfer-Encoding') == 'chunked'
+    return {'rows': rows, 'ttfb_ms': round((ttfb or 0) * 1000, 1),
+            'seconds': round(time.perf_counter() - started, 3), 'chunked': chunked}
+
+
+def window_memory(limit):
+    """구간 본문 생성 중 파이썬 메모리 최대 증가량 (MB)"""
+    import window as window_module
+
+    tracemalloc.start()
+    result = window_module.open_window({'offset': '0', 'limit': str(limit)}, os.environ['BASE_URL'], 'bench')
+    for _ in result.iter_ndjson():
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(peak / 1024 / 1024, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apps', default='index,app')
+    parser.add_argument('--limits', default='500,1000,5000')
+    parser.add_argument('--rows', type=int, default=12000, help='가상 검진기관 수')
+    parser.add_argument('--latency', type=float, default=100, help='모의 API 응답 지연 (ms)')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    args = parser.parse_args()
+
+    server, base_url = mock_upstream.start(rows=args.rows, latency=args.latency / 1000, max_rows=PAGE_ROWS)
+    os.environ.update(BASE_URL=base_url, API_KEY='bench', DATA_DIR=tempfile.mkdtemp(prefix='window_bench_'),
+                      CACHE_MAX_BYTES='0', UPSTREAM_RATE='0')
+    # 앱들의 요청 로그는 버리고 결과만 출력
+    out = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    import logging
+
+    logging.disable(logging.INFO)
+
+    import requests
+
+    import app
+    from api import index
+
+    modules = {'app': app, 'index': index}
+    limits = [int(limit) for limit in args.limits.split(',')]
+    results = []
+
+    def emit(result):
+        results.append(result)
+        print(json.dumps(result), file=out, flush=True)
+
+    try:
+        session = requests.Session()
+        for name in args.apps.split(','):
+            app_server, url = serve(name, modules[name])
+            for limit in limits:
+                emit(dict(bench='client_serial', app=name, limit=limit,
+                          **client_serial(session, url + '/api/hospitals', limit)))
+                emit(dict(bench='window', app=name, limit=limit, **window(session, url + '/api/hospitals', limit)))
+            app_server.shutdown()
+        for limit in limits:
+            emit({'bench': 'memory', 'limit': limit, 'peak_mb': window_memory(limit)})
+    finally:
+        sys.stdout = out
+        server.shutdown()
+        if 'search_log' in sys.modules:
+            sys.modules['search_log'].search_log.close()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,436 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+import upstream
+
+# 응답 캐시 설정
+CACHE_TTL = float(os.environ.get('CACHE_TTL', '300'))  # 초
+CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# 프로세스 간 공유 캐시 (여러 워커가 함께 쓰는 SQLite 파일, 비어 있으면 사용 안 함)
+CACHE_SHARED_PATH = os.environ.get('CACHE_SHARED_PATH', '')
+CACHE_SHARED_MAX_BYTES = int(os.environ.get('CACHE_SHARED_MAX_BYTES', str(256 * 1024 * 1024)))
+
+# 캐시 키에서 제외하는 파라미터
+IGNORED_PARAMS = ['serviceKey']
+
+RESULT_OK = re.compile(rb'"resultCode"\s*:\s*"00"')
+
+
+def normalize_params(params):
+    """캐시 키 생성: serviceKey와 빈 값을 제외하고 정렬한 파라미터"""
+    return tuple(sorted(
+        (str(key), str(value)) for key, value in (params or {}).items()
+        if key not in IGNORED_PARAMS and value not in (None, '')
+    ))
+
+
+class _Flight:
+    """진행 중인 원본 요청 (동일 키의 동시 요청이 공유)"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ResponseCache:
+    """TTL + LRU 응답 캐시, 동일 키 동시 미스는 한 번의 요청으로 합침"""
+
+    def __init__(self, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._flights = {}
+        self._async_flights = {}  # asyncio 이벤트 루프 안에서만 사용
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.stale_served = 0
+
+    def _lookup(self, key, allow_stale=False):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic() and not allow_stale:
+            # 만료된 항목은 장애 시 대체 응답으로 쓰도록 LRU에서 밀려날 때까지 남겨 둠
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _store(self, key, value, size, ttl=None):
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), size, value)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def ttl_left(self, key):
+        """만료까지 남은 시간(초) (없으면 None, 이미 만료됐으면 0 이하)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] - time.monotonic() if entry is not None else None
+
+    def put(self, key, value, size):
+        """값을 바로 저장 (미리 갱신용, 적중/미적중 수에 포함하지 않음)"""
+        with self._lock:
+            self._store(key, value, size)
+
+    def get(self, key):
+        """캐시된 값 (없거나 만료되면 None)"""
+        with self._lock:
+            entry = self._lookup(key)
+            return entry[2] if entry else None
+
+    def get_stale(self, key):
+        """만료 여부와 관계없이 남아 있는 값 (없으면 None)"""
+        with self._lock:
+            entry = self._lookup(key, allow_stale=True)
+            if entry is None:
+                return None
+            self.stale_served += 1
+            return entry[2]
+
+    def get_or_fetch(self, key, fetch, size_of=len, cacheable=None, ttl_of=None):
+        """캐시에서 찾고, 없으면 fetch()를 한 번만 호출해 결과를 공유
+
+        ttl_of(결과)가 None이 아닌 값을 돌려주면 그 시간(초)만 저장한다 (공유 캐시에서 읽은 응답의 남은 시간).
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[2]
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                flight = self._flights[key] = _Flight()
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fetch()
+            if cacheable is None or cacheable(flight.result):
+                with self._lock:
+                    self._store(key, flight.result, size_of(flight.result), ttl_of and ttl_of(flight.result))
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    async def get_or_fetch_async(self, key, fetch, size_of=len, cacheable=None, ttl_of=None):
+        """get_or_fetch의 asyncio 버전 (fetch는 코루틴 함수, 합치기는 같은 이벤트 루프 안에서)"""
+        import asyncio  # 스레드 서버만 쓰는 경우 불러오지 않음
+
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[2]
+            flight = self._async_flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+
+        if flight is None:
+            # 원본 조회는 별도 태스크로 실행하고 모든 요청이 shield로 기다림
+            # (먼저 온 요청이 취소되어도 조회는 계속되어 합쳐진 요청들이 결과를 받음)
+            flight = self._async_flights[key] = asyncio.get_running_loop().create_task(
+                self._fetch_async(key, fetch, size_of, cacheable, ttl_of))
+            flight.add_done_callback(lambda task: self._end_async_flight(key, task))
+        return await asyncio.shield(flight)
+
+    async def _fetch_async(self, key, fetch, size_of, cacheable, ttl_of):
+        result = await fetch()
+        if cacheable is None or cacheable(result):
+            with self._lock:
+                self._store(key, result, size_of(result), ttl_of and ttl_of(result))
+        return result
+
+    def _end_async_flight(self, key, task):
+        if self._async_flights.get(key) is task:
+            del self._async_flights[key]
+        if not task.cancelled():
+            task.exception()  # 기다리는 요청이 없어도 경고가 나지 않도록 확인 처리
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """캐시 카운터"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'stale_served': self.stale_served,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl
+            }
+
+
+response_cache = ResponseCache()
+
+
+class SharedCache:
+    """여러 프로세스가 함께 쓰는 원본 응답 캐시 (SQLite WAL 파일, 만료 시각은 벽시계 기준)
+
+    프로세스 안의 ResponseCache에서 못 찾은 원본 응답을 다른 워커가 받아 둔 것에서 찾는다.
+    오래된 항목 정리와 용량 제한은 저장 TRIM_EVERY번마다 한 번씩 한다.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS responses (
+        key TEXT PRIMARY KEY,
+        expires_at REAL NOT NULL,
+        status INTEGER NOT NULL,
+        encoding TEXT,
+        content BLOB NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires_at);
+    """
+    TRIM_EVERY = 100
+
+    def __init__(self, path, ttl=CACHE_TTL, max_bytes=CACHE_SHARED_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()  # 스레드별 연결 (fork 뒤에는 새로 연결)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+
+    def _conn(self):
+        if getattr(self._local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=2, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')  # 캐시이므로 내용이 사라져도 됨
+            conn.executescript(self.SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return self._local.conn
+
+    @staticmethod
+    def _key(key):
+        return json.dumps(key, ensure_ascii=False)
+
+    def get(self, key):
+        """만료되지 않은 응답 (없으면 None, 응답의 ttl은 남은 유효 시간)"""
+        now = time.time()
+        try:
+            row = self._conn().execute(
+                'SELECT status, encoding, content, expires_at FROM responses WHERE key = ? AND expires_at > ?',
+                (self._key(key), now)
+            ).fetchone()
+        except sqlite3.Error:
+            with self._lock:
+                self.errors += 1
+            return None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return upstream.UpstreamResponse(row[0], row[2], row[1], ttl=row[3] - now)
+
+    def put(self, key, response, ttl=None):
+        try:
+            conn = self._conn()
+            conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                (self._key(key), time.time() + (self.ttl if ttl is None else ttl), response.status_code,
+                 getattr(response, 'encoding', None), bytes(response.content))
+            )
+            with self._lock:
+                self.stores += 1
+                trim = self.stores % self.TRIM_EVERY == 0
+            if trim:
+                self.trim(conn)
+        except sqlite3.Error:
+            with self._lock:
+                self.errors += 1
+
+    def trim(self, conn=None):
+        """만료된 항목을 지우고, 용량을 넘으면 만료가 가까운 것부터 지움"""
+        conn = conn or self._conn()
+        conn.execute('DELETE FROM responses WHERE expires_at <= ?', (time.time(),))
+        rows, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(content)), 0) FROM responses').fetchone()
+        if total > self.max_bytes and rows:
+            excess = rows - int(rows * self.max_bytes / total * 0.9)  # 한 번에 10% 여유를 둠
+            conn.execute(
+                'DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY expires_at LIMIT ?)',
+                (excess,)
+            )
+
+    def stats(self):
+        with self._lock:
+            result = {'path': self.path, 'hits': self.hits, 'misses': self.misses,
+                      'stores': self.stores, 'errors': self.errors}
+        try:
+            result['entries'], result['bytes'] = self._conn().execute(
+                'SELECT COUNT(*), COALESCE(SUM(LENGTH(content)), 0) FROM responses WHERE expires_at > ?',
+                (time.time(),)
+            ).fetchone()
+        except sqlite3.Error:
+            pass
+        return result
+
+
+shared_cache = SharedCache(CACHE_SHARED_PATH) if CACHE_SHARED_PATH and CACHE_SHARED_MAX_BYTES > 0 else None
+
+
+# 요청마다 호출할 함수 목록 (observer(key, url, params), 인기 검색 추적용)
+_observers = []
+
+
+def add_observer(observer):
+    _observers.append(observer)
+
+
+def _notify(key, url, params):
+    for observer in _observers:
+        observer(key, url, params)
+
+
+def is_cacheable(response):
+    """정상 응답(HTTP 200, resultCode '00')만 캐시"""
+    return response.status_code == 200 and RESULT_OK.search(response.content) is not None
+
+
+def put(key, response):
+    """원본 응답을 프로세스 캐시와 공유 캐시에 바로 저장 (미리 갱신용)"""
+    response_cache.put(key, response, len(response.content))
+    if shared_cache is not None:
+        shared_cache.put(key, response)
+
+
+def _fetch(key, url, params, kwargs):
+    """프로세스 캐시 미스: 공유 캐시에서 찾고, 없으면 원본 호출 후 공유 캐시에 저장"""
+    if shared_cache is not None:
+        response = shared_cache.get(key)
+        if response is not None:
+            return response
+    response = upstream.get(url, params=params, **kwargs)
+    if shared_cache is not None and is_cacheable(response):
+        shared_cache.put(key, response)
+    return response
+
+
+async def _async_fetch(key, url, params, kwargs):
+    """_fetch의 asyncio 버전 (공유 캐시의 SQLite 조회/저장은 이벤트 루프를 막지 않도록 스레드에서 실행)"""
+    import asyncio  # 스레드 서버만 쓰는 경우 불러오지 않음
+
+    if shared_cache is not None:
+        response = await asyncio.to_thread(shared_cache.get, key)
+        if response is not None:
+            return response
+    response = await upstream.async_get(url, params=params, **kwargs)
+    if shared_cache is not None and is_cacheable(response):
+        await asyncio.to_thread(shared_cache.put, key, response)
+    return response
+
+
+def _ttl_left(response):
+    """공유 캐시에서 읽은 응답이면 남은 유효 시간 (프로세스 캐시에 그 시간만 저장)"""
+    return getattr(response, 'ttl', None)
+
+
+@metrics.timed('upstream')
+def cached_get(url, params=None, **kwargs):
+    """requests.get 대체: 같은 파라미터의 응답을 캐시하고 동시 요청을 합침
+
+    원본 호출은 upstream 클라이언트(연결 풀, 호출 수 제한, 재시도, 차단기)를 거친다.
+    원본 API가 실패하면 만료된 캐시 응답이라도 있으면 그것을 돌려준다.
+    """
+    key = (url,) + normalize_params(params)
+    _notify(key, url, params)
+    try:
+        response = response_cache.get_or_fetch(
+            key,
+            lambda: _fetch(key, url, params, kwargs),
+            size_of=lambda response: len(response.content),
+            cacheable=is_cacheable,
+            ttl_of=_ttl_left
+        )
+    except Exception:
+        stale = response_cache.get_stale(key)
+        if stale is None:
+            raise
+        return stale
+    if upstream.is_transient(response):
+        stale = response_cache.get_stale(key)
+        if stale is not None:
+            return stale
+    return response
+
+
+@metrics.timed('upstream')
+async def async_cached_get(url, params=None, **kwargs):
+    """cached_get의 asyncio 버전 (원본 호출은 upstream 비동기 클라이언트 사용)"""
+    key = (url,) + normalize_params(params)
+    _notify(key, url, params)
+    try:
+        response = await response_cache.get_or_fetch_async(
+            key,
+            lambda: _async_fetch(key, url, params, kwargs),
+            size_of=lambda response: len(response.content),
+            cacheable=is_cacheable,
+            ttl_of=_ttl_left
+        )
+    except Exception:
+        stale = response_cache.get_stale(key)
+        if stale is None:
+            raise
+        return stale
+    if upstream.is_transient(response):
+        stale = response_cache.get_stale(key)
+        if stale is not None:
+            return stale
+    return response
+
+
+def stats():
+    result = response_cache.stats()
+    if shared_cache is not None:
+        result['shared'] = shared_cache.stats()
+    return result
+
+
+metrics.register_collector('cache', stats)
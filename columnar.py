@@ -0,0 +1,397 @@
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+
+import store
+
+# 열 단위 바이너리 스냅샷 설정
+# 배포에 포함한 파일(COLUMNAR_BUNDLE)이나 /tmp에 기록한 파일(COLUMNAR_SNAPSHOT)을 mmap으로 열어
+# 전체 목록을 역직렬화하지 않고 바로 검색한다 (서버리스 콜드 스타트에서 원본 API 호출 없이 응답).
+COLUMNAR_SNAPSHOT = os.environ.get('COLUMNAR_SNAPSHOT', os.path.join(store.DATA_DIR, 'hospitals.col'))
+COLUMNAR_BUNDLE = os.environ.get(
+    'COLUMNAR_BUNDLE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'hospitals.col')
+)
+COLUMNAR_MAX_AGE = int(os.environ.get('COLUMNAR_MAX_AGE', str(store.SNAPSHOT_MAX_AGE)))  # 초
+
+MAGIC = b'HCOL0001'
+
+# 값 종류가 적어 코드 번호(1~2바이트)로 저장하는 필드 (*ChrgTypeCd 필드도 포함)
+CODE_FIELDS = ['siDoCd', 'siGunGuCd', 'hmcRdatCd', 'ykindnm']
+
+# 검진종류타입(hchType) 검색용 내부 열 (레코드에는 포함하지 않음)
+HCH_COLUMN = '_hchTypes'
+
+_MISSING = object()  # 레코드에 없는 필드
+
+
+def _is_code_field(name):
+    return name in CODE_FIELDS or name.endswith('ChrgTypeCd') or name == HCH_COLUMN
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def write(hospitals, path=None, synced_at=None, data_version=None):
+    """전체 검진기관 목록으로 열 단위 스냅샷 파일 생성 (임시 파일에 쓴 뒤 교체)
+
+    - 코드 필드: 값 목록은 헤더에, 행마다 값 번호(0은 필드 없음)만 저장
+    - 그 외 문자열 필드: 행별 시작 위치(uint32) + UTF-8 문자열 블록 (+ 필드 없는 행 비트맵)
+    - 문자열이 아닌 값이 섞인 필드는 값마다 JSON 문자열로 저장
+    - 검진종류 비트마스크: 행마다 1바이트 (GPTs 응답에서 다시 계산하지 않음)
+    """
+    path = path or COLUMNAR_SNAPSHOT
+    now = time.time()
+    names = list(dict.fromkeys(name for hospital in hospitals for name in hospital))
+    rows = len(hospitals)
+
+    sections = []
+    size = 0
+
+    def add(data):
+        nonlocal size
+        start = size
+        sections.append(data)
+        sections.append(b'\0' * (_align(len(data)) - len(data)))
+        size += _align(len(data))
+        return start
+
+    columns = []
+    for name in names + [HCH_COLUMN]:
+        if name == HCH_COLUMN:
+            values = [','.join(store.hch_types_of(hospital)) for hospital in hospitals]
+        else:
+            values = [hospital.get(name, _MISSING) for hospital in hospitals]
+        is_str = all(isinstance(value, str) for value in values if value is not _MISSING)
+
+        if is_str and _is_code_field(name):
+            dictionary = sorted({value for value in values if value is not _MISSING})
+            if len(dictionary) < 65535:
+                index = {value: i + 1 for i, value in enumerate(dictionary)}
+                codes = array('B' if len(dictionary) < 255 else 'H', [index.get(value, 0) for value in values])
+                columns.append({'name': name, 'kind': 'code', 'values': dictionary, 'type': codes.typecode,
+                                'codes': add(codes.tobytes())})
+                continue
+
+        encoded = [
+            b'' if value is _MISSING else (value if is_str else json.dumps(value, ensure_ascii=False)).encode('utf-8')
+            for value in values
+        ]
+        offsets = array('I', [0])
+        total = 0
+        for data in encoded:
+            total += len(data)
+            offsets.append(total)
+        column = {'name': name, 'kind': 'str' if is_str else 'json',
+                  'offsets': add(offsets.tobytes()), 'blob': add(b''.join(encoded)), 'missing': None}
+        if any(value is _MISSING for value in values):
+            bitmap = bytearray((rows + 7) // 8)
+            for i, value in enumerate(values):
+                if value is _MISSING:
+                    bitmap[i >> 3] |= 1 << (i & 7)
+            column['missing'] = add(bytes(bitmap))
+        columns.append(column)
+
+    import exam_index  # exam_index가 store를 불러오므로 함수 안에서 불러옴
+    import rollup  # rollup이 이 모듈을 import하므로 함수 안에서 불러옴
+
+    exam_masks = add(array('B', [exam_index.exam_mask(hospital) for hospital in hospitals]).tobytes())
+    header = json.dumps({
+        'rows': rows,
+        'byteorder': sys.byteorder,
+        'synced_at': synced_at or now,
+        'data_version': data_version or synced_at or now,
+        'columns': columns,
+        'exam_masks': exam_masks,
+        'rollups': rollup.cells(hospitals)  # 집계 통계용 (/api/hospitals/stats)
+    }, ensure_ascii=False).encode('utf-8')
+    prefix = MAGIC + struct.pack('<I', len(header)) + header
+    prefix += b'\0' * (_align(len(prefix)) - len(prefix))
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(prefix)
+        for data in sections:
+            f.write(data)
+    os.replace(tmp_path, path)
+    return rows
+
+
+class _CodeColumn:
+    def __init__(self, mm, base, rows, column):
+        self.values = column['values']
+        width = array(column['type']).itemsize
+        self.codes = memoryview(mm)[base + column['codes']:base + column['codes'] + rows * width].cast(column['type'])
+
+    def get(self, i):
+        code = self.codes[i]
+        return self.values[code - 1] if code else _MISSING
+
+    def predicate(self, match):
+        """i번째 행 값이 match(value)를 만족하는지 확인하는 함수"""
+        wanted = {i + 1 for i, value in enumerate(self.values) if match(value)}
+        codes = self.codes
+        return lambda i: codes[i] in wanted
+
+    def rows_where(self, match):
+        """값이 match(value)를 만족하는 행 번호 목록"""
+        wanted = {i + 1 for i, value in enumerate(self.values) if match(value)}
+        if not wanted:
+            return []
+        return [i for i, code in enumerate(self.codes) if code in wanted]
+
+    def rows_containing(self, needle):
+        return self.rows_where(lambda value: needle in value)
+
+    def contains_predicate(self, needle):
+        return self.predicate(lambda value: needle in value)
+
+
+class _StringColumn:
+    def __init__(self, mm, base, rows, column):
+        self.mm = mm
+        self.is_json = column['kind'] == 'json'
+        start = base + column['offsets']
+        self.offsets = memoryview(mm)[start:start + (rows + 1) * 4].cast('I')
+        self.blob = base + column['blob']
+        self.missing = None
+        if column['missing'] is not None:
+            start = base + column['missing']
+            self.missing = memoryview(mm)[start:start + (rows + 7) // 8]
+
+    def get(self, i):
+        if self.missing is not None and self.missing[i >> 3] & (1 << (i & 7)):
+            return _MISSING
+        value = self.mm[self.blob + self.offsets[i]:self.blob + self.offsets[i + 1]].decode('utf-8')
+        return json.loads(value) if self.is_json else value
+
+    def _text(self, i):
+        value = self.get(i)
+        return value if value is _MISSING or isinstance(value, str) else str(value)
+
+    def predicate(self, match):
+        def test(i):
+            value = self._text(i)
+            return value is not _MISSING and match(value)
+        return test
+
+    def rows_where(self, match):
+        test = self.predicate(match)
+        return [i for i in range(len(self.offsets) - 1) if test(i)]
+
+    def _ignore_case(self, needle):
+        # SQLite LIKE처럼 영문은 대소문자를 구분하지 않음 (영문이 있으면 문자열로 변환해 비교)
+        return self.is_json or any(c.isascii() and c.isalpha() for c in needle)
+
+    def contains_predicate(self, needle):
+        if self._ignore_case(needle):
+            lowered = needle.lower()
+            return self.predicate(lambda value: lowered in value.lower())
+        pattern = needle.encode('utf-8')
+        mm, blob, offsets = self.mm, self.blob, self.offsets
+        return lambda i: mm.find(pattern, blob + offsets[i], blob + offsets[i + 1]) != -1
+
+    def rows_containing(self, needle):
+        """needle을 포함하는 행 번호 목록 (문자열 블록에서 바로 찾고 행으로 변환)"""
+        if self._ignore_case(needle):
+            lowered = needle.lower()
+            return self.rows_where(lambda value: lowered in value.lower())
+
+        pattern = needle.encode('utf-8')
+        end = self.blob + self.offsets[len(self.offsets) - 1]
+        result = []
+        pos = self.mm.find(pattern, self.blob, end)
+        while pos != -1:
+            row = bisect.bisect_right(self.offsets, pos - self.blob) - 1
+            row_end = self.blob + self.offsets[row + 1]
+            if pos + len(pattern) <= row_end:
+                result.append(row)
+                pos = self.mm.find(pattern, row_end, end)
+            else:
+                pos = self.mm.find(pattern, pos + 1, end)
+        return result
+
+
+class ColumnarSnapshot:
+    """mmap으로 연 열 단위 스냅샷 (필요한 행만 레코드로 변환)"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a columnar snapshot: {path}")
+        header_size = struct.unpack_from('<I', self.mm, len(MAGIC))[0]
+        header_start = len(MAGIC) + 4
+        header = json.loads(self.mm[header_start:header_start + header_size])
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError(f"Columnar snapshot byte order mismatch: {path}")
+
+        base = _align(header_start + header_size)
+        self.path = path
+        self.rows = header['rows']
+        self.synced_at = header['synced_at']
+        self.data_version = header['data_version']
+        self.rollups = header.get('rollups')  # 이전 형식 파일이면 None
+        self.exam_masks = None  # 행별 검진종류 비트마스크 (이전 형식 파일이면 None)
+        if header.get('exam_masks') is not None:
+            start = base + header['exam_masks']
+            self.exam_masks = memoryview(self.mm)[start:start + self.rows]
+        self.columns = {}
+        for column in header['columns']:
+            kind = _CodeColumn if column['kind'] == 'code' else _StringColumn
+            self.columns[column['name']] = kind(self.mm, base, self.rows, column)
+        self._record_columns = [(name, column) for name, column in self.columns.items() if name != HCH_COLUMN]
+
+    def __len__(self):
+        return self.rows
+
+    def is_fresh(self):
+        return time.time() - self.synced_at <= COLUMNAR_MAX_AGE
+
+    def record(self, i):
+        """i번째 검진기관 레코드 (원래 필드 순서)"""
+        hospital = {}
+        for name, column in self._record_columns:
+            value = column.get(i)
+            if value is not _MISSING:
+                hospital[name] = value
+        return hospital
+
+    def records(self):
+        return [self.record(i) for i in range(self.rows)]
+
+    def records_with_masks(self):
+        """전체 레코드와 저장된 검진종류 비트마스크: (목록, masks) (이전 형식 파일이면 masks는 None)"""
+        return self.records(), bytes(self.exam_masks) if self.exam_masks is not None else None
+
+    def filter(self, params):
+        """store.query와 같은 조건으로 거른 행 번호 목록 (행 순서)
+
+        첫 조건(완전 일치 우선)으로 후보 행을 찾고 나머지 조건은 후보 행만 확인한다.
+        """
+        conditions = []  # (열, 완전 일치 값 또는 None, 부분 일치 값 또는 None)
+        for key in ['siDoCd', 'siGunGuCd', 'hmcRdatCd']:
+            if params.get(key):
+                conditions.append((key, str(params[key]), None))
+        if params.get('hchType'):
+            conditions.append((HCH_COLUMN, str(params['hchType']), None))
+        for key in store.LIKE_PARAMS:
+            if params.get(key):
+                conditions.append((key, None, params[key]))
+        if not conditions:
+            return range(self.rows)
+        if any(name not in self.columns for name, _, _ in conditions):
+            return []
+
+        def match(name, value):
+            if name == HCH_COLUMN:
+                return lambda v: value in v.split(',')
+            return lambda v: v == value
+
+        name, value, needle = conditions[0]
+        column = self.columns[name]
+        rows = column.rows_containing(needle) if needle is not None else column.rows_where(match(name, value))
+        for name, value, needle in conditions[1:]:
+            column = self.columns[name]
+            test = column.contains_predicate(needle) if needle is not None else column.predicate(match(name, value))
+            rows = [i for i in rows if test(i)]
+        return rows
+
+
+_lock = threading.Lock()
+_state = {'key': None, 'snapshot': None}
+
+
+def _path():
+    """사용할 스냅샷 파일 (/tmp에 기록한 파일이 배포 파일보다 우선)"""
+    for path in (COLUMNAR_SNAPSHOT, COLUMNAR_BUNDLE):
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+def get():
+    """현재 스냅샷 (없으면 None, 파일이 교체되면 다시 엶)"""
+    path = _path()
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (path, stat.st_ino, stat.st_mtime_ns)
+    with _lock:
+        if _state['key'] != key:
+            try:
+                _state.update(key=key, snapshot=ColumnarSnapshot(path))
+            except (OSError, ValueError) as e:
+                print(f"Columnar snapshot load failed: {str(e)}")
+                _state.update(key=key, snapshot=None)
+        return _state['snapshot']
+
+
+def data_version():
+    snapshot = get()
+    return snapshot.data_version if snapshot is not None else None
+
+
+def load_all():
+    """전체 검진기관 목록 (스냅샷이 없으면 None)"""
+    snapshot = get()
+    return snapshot.records() if snapshot is not None else None
+
+
+def query(params):
+    """열 단위 스냅샷에서 검색 (store.query와 같은 응답, 스냅샷이 없거나 만료되면 None)"""
+    snapshot = get()
+    if snapshot is None or not snapshot.is_fresh():
+        return None
+    page_no, num_of_rows = store.page_params(params)
+    rows = snapshot.filter(params)
+    start = (page_no - 1) * num_of_rows
+    page = rows[start:start + num_of_rows]
+    items = [snapshot.record(i) for i in page]
+    exam_masks = [snapshot.exam_masks[i] for i in page] if snapshot.exam_masks is not None else None
+    return store.envelope(items, page_no, num_of_rows, len(rows), exam_masks)
+
+
+def write_snapshot(hospitals, synced_at=None, data_version=None):
+    """SQLite 스냅샷을 새로 쓴 뒤 호출: COLUMNAR_SNAPSHOT 갱신 (비어 있으면 사용 안 함)
+
+    열 단위 스냅샷은 SQLite 스냅샷에서 다시 만들 수 있으므로 실패해도 동기화는 계속한다.
+    """
+    if not COLUMNAR_SNAPSHOT or hospitals is None:
+        return None
+    try:
+        return write(hospitals, COLUMNAR_SNAPSHOT, synced_at, data_version)
+    except OSError as e:
+        print(f"Columnar snapshot write failed: {str(e)}")
+        return None
+
+
+def write_from_store(path=None):
+    """SQLite 스냅샷 내용으로 열 단위 스냅샷 생성 (SQLite 스냅샷이 없으면 None)"""
+    hospitals = store.load_all()
+    if hospitals is None:
+        return None
+    return write(hospitals, path, store.synced_at(), store.data_version())
+
+
+if __name__ == '__main__':
+    # 배포용 파일 생성: python columnar.py [출력 경로]
+    # SQLite 스냅샷이 있으면 그 내용으로, 없으면 원본 API에서 전체 목록을 받아 생성
+    output = sys.argv[1] if len(sys.argv) > 1 else COLUMNAR_BUNDLE
+    count = write_from_store(output)
+    if count is None:
+        from fetcher import fetch_all_hospitals
+
+        hospitals, report = fetch_all_hospitals(os.environ.get('BASE_URL'), os.environ.get('API_KEY'))
+        count = write(hospitals, output)
+    print(f"Columnar snapshot written: {count} hospitals -> {output}")
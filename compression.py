@@ -0,0 +1,202 @@
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import metrics
+
+# 응답 압축 설정
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))  # 이보다 작은 본문은 압축하지 않음
+COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', '6'))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', '5'))
+# 압축한 본문 캐시 크기 (같은 본문을 다시 보낼 때 압축하지 않음, 0이면 사용 안 함)
+COMPRESS_CACHE_BYTES = int(os.environ.get('COMPRESS_CACHE_BYTES', str(16 * 1024 * 1024)))
+
+try:
+    import brotli  # 선택 의존성: 설치되어 있으면 br도 지원
+except ImportError:
+    brotli = None
+
+# 서버가 보낼 수 있는 인코딩 (같은 q 값이면 앞쪽 우선)
+ENCODINGS = (['br'] if brotli is not None else []) + ['gzip']
+
+# 압축할 응답 형식 (xlsx 등 이미 압축된 형식은 제외)
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+# 내보내기 파일에 미리 만들어 두는 압축본의 확장자
+FILE_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def negotiate(accept_encoding):
+    """Accept-Encoding 헤더에서 보낼 인코딩 선택 (압축하지 않으면 None)"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compressible(content_type, size):
+    """압축할 가치가 있는 응답인지 (형식과 크기)"""
+    return size >= COMPRESS_MIN_BYTES and bool(content_type) and \
+        content_type.lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body, encoding):
+    """본문 압축 (gzip은 mtime을 0으로 고정해 같은 본문이면 항상 같은 결과)"""
+    with metrics.span('compress'):
+        if encoding == 'br':
+            return brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+        return gzip.compress(body, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+class CompressedCache:
+    """압축한 본문 LRU 캐시 (키: 인코딩과 원본 본문 해시)
+
+    캐시된 원본 응답이나 로컬 데이터로 만든 같은 본문이 반복되면 해시만 계산하고 압축본을 그대로 쓴다.
+    """
+
+    def __init__(self, max_bytes=COMPRESS_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (encoding, digest) -> 압축본
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def encode(self, body, encoding):
+        """압축본 (캐시에 있으면 캐시된 값)"""
+        if self.max_bytes <= 0:
+            compressed = compress(body, encoding)
+            self._count(False, body, compressed)
+            return compressed
+
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is not None:
+                self._entries.move_to_end(key)
+        if compressed is not None:
+            self._count(True, body, compressed)
+            return compressed
+
+        compressed = compress(body, encoding)
+        self._count(False, body, compressed)
+        if len(compressed) <= self.max_bytes:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = compressed
+                    self._bytes += len(compressed)
+                while self._bytes > self.max_bytes:
+                    _, oldest = self._entries.popitem(last=False)
+                    self._bytes -= len(oldest)
+        return compressed
+
+    def _count(self, hit, body, compressed):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.bytes_in += len(body)
+            self.bytes_out += len(compressed)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """압축 카운터"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+
+
+compressed_cache = CompressedCache()
+
+
+def encode_body(body, content_type, accept_encoding, status=200):
+    """응답 본문을 Accept-Encoding에 맞게 압축: (본문, 추가할 헤더 dict)
+
+    형식이나 크기가 맞지 않으면 본문을 그대로 돌려준다. 정상 응답(200)만 압축본을 캐시한다.
+    """
+    if not compressible(content_type, len(body)):
+        return body, {}
+    headers = {'Vary': 'Accept-Encoding'}
+    encoding = negotiate(accept_encoding)
+    if encoding is None:
+        return body, headers
+    headers['Content-Encoding'] = encoding
+    if status == 200:
+        return compressed_cache.encode(body, encoding), headers
+    return compress(body, encoding), headers
+
+
+def compress_file(src_path, dst_path, encoding, chunk_bytes=64 * 1024):
+    """파일을 청크 단위로 읽어 압축본 파일 생성 (내보내기 파일용)"""
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=COMPRESS_BROTLI_QUALITY)
+            for chunk in iter(lambda: src.read(chunk_bytes), b''):
+                dst.write(compressor.process(chunk))
+            dst.write(compressor.finish())
+        else:
+            with gzip.GzipFile(fileobj=dst, mode='wb', compresslevel=COMPRESS_GZIP_LEVEL, mtime=0) as out:
+                for chunk in iter(lambda: src.read(chunk_bytes), b''):
+                    out.write(chunk)
+
+
+def init_flask(app):
+    """Flask 앱의 응답을 Accept-Encoding에 맞게 압축
+
+    metrics.init_flask 다음에 호출해야 응답 크기 지표에 압축한 크기가 반영된다.
+    스트리밍 응답(구간 조회, 내보내기 파일)은 건드리지 않는다.
+    """
+    from flask import request as flask_request
+
+    @app.after_request
+    def _compress_response(response):
+        if response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers \
+                or response.status_code < 200 or response.status_code in (204, 304):
+            return response
+        body, headers = encode_body(response.get_data(), response.content_type,
+                                    flask_request.headers.get('Accept-Encoding'), response.status_code)
+        if 'Vary' in headers:
+            response.vary.add('Accept-Encoding')
+        if 'Content-Encoding' in headers:
+            response.set_data(body)
+            response.headers['Content-Encoding'] = headers['Content-Encoding']
+        return response
+
+
+def stats():
+    return compressed_cache.stats()
+
+
+metrics.register_collector('compression', stats)
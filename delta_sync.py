@@ -0,0 +1,220 @@
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+import columnar
+import rollup
+import store
+from fetcher import FETCH_PAGE_SIZE, FETCH_WORKERS, fetch_page, page_size
+
+# 증분 동기화 설정
+SYNC_RESUME_MAX_AGE = int(os.environ.get('SYNC_RESUME_MAX_AGE', str(6 * 3600)))  # 이어받을 수 있는 중단된 동기화의 최대 나이(초)
+
+
+def _open(path):
+    conn = store.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    store.ensure_sync_schema(conn)
+    rollup.ensure_schema(conn)
+    return conn
+
+
+def _start_run(conn, num_of_rows, total_count):
+    """중단된 동기화가 있으면 이어받고, 없으면 새로 시작: (run, resumed)
+
+    페이지 크기나 전체 건수가 달라졌으면 페이지 위치가 맞지 않으므로 새로 시작한다.
+    """
+    row = conn.execute("SELECT * FROM sync_runs WHERE status != 'done' ORDER BY id DESC LIMIT 1").fetchone()
+    with conn:
+        if row is not None and row['status'] != 'abandoned' and row['num_of_rows'] == num_of_rows \
+                and row['total_count'] == total_count and time.time() - row['started_at'] <= SYNC_RESUME_MAX_AGE:
+            conn.execute("UPDATE sync_runs SET status = 'running' WHERE id = ?", (row['id'],))
+            return row, True
+
+        conn.execute("UPDATE sync_runs SET status = 'abandoned' WHERE status != 'done'")
+        conn.execute('DELETE FROM sync_seen')
+        run_id = conn.execute(
+            "INSERT INTO sync_runs (started_at, status, num_of_rows, total_count, next_page) "
+            "VALUES (?, 'running', ?, ?, 1)",
+            (time.time(), num_of_rows, total_count)
+        ).lastrowid
+    return conn.execute('SELECT * FROM sync_runs WHERE id = ?', (run_id,)).fetchone(), False
+
+
+def _replace_hospital(conn, seq, hospital):
+    # 바뀌기 전 레코드 기준으로 집계 통계를 증분 반영
+    row = conn.execute('SELECT data FROM hospitals WHERE seq = ?', (seq,)).fetchone()
+    rollup.apply(conn, json.loads(row['data']) if row is not None else None, hospital)
+    conn.execute('DELETE FROM hospitals WHERE seq = ?', (seq,))
+    conn.execute('DELETE FROM hch_types WHERE seq = ?', (seq,))
+    if hospital is not None:
+        conn.execute(store.HOSPITAL_INSERT, store.hospital_row(seq, hospital))
+        conn.executemany('INSERT INTO hch_types VALUES (?, ?)',
+                         [(seq, hch_type) for hch_type in store.hch_types_of(hospital)])
+
+
+def _apply_page(conn, run_id, page_no, items):
+    """한 페이지의 레코드를 해시로 비교해 바뀐 것만 반영 (한 트랜잭션)"""
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    ts = time.time()
+    with conn:
+        next_seq = conn.execute('SELECT COALESCE(MAX(seq), -1) + 1 FROM hospitals').fetchone()[0]
+        for hospital in items:
+            key = hospital.get('hmcNo')
+            if key is None:
+                # 기관번호가 없으면 비교할 수 없으므로 전체 재생성 때만 반영
+                continue
+            conn.execute('INSERT OR IGNORE INTO sync_seen VALUES (?, ?)', (run_id, key))
+            digest = store.record_hash(hospital)
+            row = conn.execute('SELECT seq, hash FROM record_hashes WHERE hmcNo = ?', (key,)).fetchone()
+            if row is not None and row['hash'] == digest:
+                counts['unchanged'] += 1
+                continue
+
+            if row is not None:
+                seq, op = row['seq'], 'update'
+            else:
+                seq, op = next_seq, 'insert'
+                next_seq += 1
+            _replace_hospital(conn, seq, hospital)
+            conn.execute('INSERT OR REPLACE INTO record_hashes VALUES (?, ?, ?)', (key, seq, digest))
+            conn.execute('INSERT INTO changes (ts, hmcNo, op, data) VALUES (?, ?, ?, ?)',
+                         (ts, key, op, json.dumps(hospital, ensure_ascii=False)))
+            counts['inserted' if op == 'insert' else 'updated'] += 1
+
+        conn.execute(
+            'UPDATE sync_runs SET next_page = ?, pages_fetched = pages_fetched + 1, '
+            'records_seen = records_seen + ?, inserted = inserted + ?, updated = updated + ?, '
+            'unchanged = unchanged + ? WHERE id = ?',
+            (page_no + 1, len(items), counts['inserted'], counts['updated'], counts['unchanged'], run_id)
+        )
+    return counts
+
+
+def _apply_deletions(conn, run_id):
+    """이번 동기화에서 한 번도 보지 못한 기관 삭제"""
+    ts = time.time()
+    with conn:
+        rows = conn.execute(
+            'SELECT hmcNo, seq FROM record_hashes '
+            'WHERE hmcNo NOT IN (SELECT hmcNo FROM sync_seen WHERE run_id = ?)', (run_id,)
+        ).fetchall()
+        for row in rows:
+            _replace_hospital(conn, row['seq'], None)
+            conn.execute('DELETE FROM record_hashes WHERE hmcNo = ?', (row['hmcNo'],))
+            conn.execute("INSERT INTO changes (ts, hmcNo, op, data) VALUES (?, ?, 'delete', NULL)",
+                         (ts, row['hmcNo']))
+        conn.execute('UPDATE sync_runs SET deleted = deleted + ? WHERE id = ?', (len(rows), run_id))
+    return len(rows)
+
+
+def _finish_run(conn, run_id):
+    now = time.time()
+    run = conn.execute('SELECT * FROM sync_runs WHERE id = ?', (run_id,)).fetchone()
+    changed = run['inserted'] + run['updated'] + run['deleted']
+    with conn:
+        total_count = conn.execute('SELECT COUNT(*) FROM hospitals').fetchone()[0]
+        meta = [('synced_at', str(now)), ('total_count', str(total_count))]
+        if changed:
+            meta.append(('data_version', str(now)))
+        conn.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', meta)
+        conn.execute("UPDATE sync_runs SET status = 'done', finished_at = ? WHERE id = ?", (now, run_id))
+        conn.execute('DELETE FROM sync_seen WHERE run_id = ?', (run_id,))
+        conn.execute('DELETE FROM changes WHERE ts < ?', (now - store.CHANGE_RETENTION,))
+    return conn.execute('SELECT * FROM sync_runs WHERE id = ?', (run_id,)).fetchone()
+
+
+def sync(base_url, service_key, num_of_rows=FETCH_PAGE_SIZE, max_workers=FETCH_WORKERS, path=None):
+    """원본 API 전체 페이지를 받아 바뀐 레코드만 스냅샷에 반영하는 증분 동기화
+
+    페이지마다 반영 결과와 다음 페이지 번호를 기록하므로 중간에 실패하면 다음 실행 때
+    실패한 페이지부터 이어받는다. 스냅샷이 없으면 전체 재생성(store.sync)을 먼저 해야 한다.
+    반환값: 동기화 리포트 (전체 재생성 대비 호출/기록 건수 포함)
+    """
+    path = path or store.SNAPSHOT_DB
+    if store.synced_at(path) is None:
+        raise Exception("No snapshot to sync incrementally; run a full sync first (python store.py)")
+
+    started = time.perf_counter()
+    first_items, total_count = fetch_page(base_url, service_key, 1, num_of_rows)
+    if first_items is None:
+        raise Exception("Failed to fetch the first page")
+    num_of_rows = page_size(first_items, total_count, num_of_rows)
+    page_count = max(math.ceil(total_count / num_of_rows), 1)
+    pages_fetched = 1
+
+    with closing(_open(path)) as conn:
+        run, resumed = _start_run(conn, num_of_rows, total_count)
+        run_id = run['id']
+        resumed_from_page = run['next_page'] if resumed else None
+        start_page = run['next_page']
+        if start_page == 1:
+            _apply_page(conn, run_id, 1, first_items)
+            start_page = 2
+
+        # 페이지는 동시에 받되 반영은 순서대로 (실패 지점부터 이어받을 수 있도록)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pages = iter(range(start_page, page_count + 1))
+            pending = deque()
+
+            def fill():
+                while len(pending) < max_workers:
+                    page_no = next(pages, None)
+                    if page_no is None:
+                        return
+                    pending.append((page_no, executor.submit(fetch_page, base_url, service_key, page_no, num_of_rows)))
+
+            fill()
+            while pending:
+                page_no, future = pending.popleft()
+                items, _ = future.result()
+                pages_fetched += 1
+                if items is None:
+                    for _, other in pending:
+                        other.cancel()
+                    with conn:
+                        conn.execute("UPDATE sync_runs SET status = 'failed' WHERE id = ?", (run_id,))
+                    raise Exception(f"Sync failed at page {page_no}/{page_count}; run again to resume")
+                _apply_page(conn, run_id, page_no, items)
+                fill()
+
+        # 동기화 중 원본 목록이 바뀌어 페이지가 밀리면 못 본 레코드가 생길 수 있으므로
+        # 전체 건수만큼 본 경우에만 삭제를 반영
+        run = conn.execute('SELECT * FROM sync_runs WHERE id = ?', (run_id,)).fetchone()
+        deletions_skipped = run['records_seen'] < total_count
+        if not deletions_skipped:
+            _apply_deletions(conn, run_id)
+        run = _finish_run(conn, run_id)
+    if path == store.SNAPSHOT_DB:
+        columnar.write_snapshot(store.load_all(path), store.synced_at(path), store.data_version(path))
+
+    rows_written = run['inserted'] + run['updated'] + run['deleted']
+    return {
+        'mode': 'incremental',
+        'run_id': run_id,
+        'resumed': resumed,
+        'resumed_from_page': resumed_from_page,
+        'total_count': total_count,
+        'pages': page_count,
+        'pages_fetched': pages_fetched,
+        'records_seen': run['records_seen'],
+        'inserted': run['inserted'],
+        'updated': run['updated'],
+        'deleted': run['deleted'],
+        'unchanged': run['unchanged'],
+        'deletions_skipped': deletions_skipped,
+        'rows_written': rows_written,
+        # 전체 재생성은 모든 페이지를 받고 모든 행을 다시 쓴다
+        'full_rebuild': {'pages_fetched': page_count, 'rows_written': total_count},
+        'elapsed': round(time.perf_counter() - started, 3)
+    }
+
+
+if __name__ == '__main__':
+    # 증분 동기화 작업: python delta_sync.py
+    report = sync(os.environ.get('BASE_URL'), os.environ.get('API_KEY'))
+    print(json.dumps(report, ensure_ascii=False))
@@ -0,0 +1,161 @@
+from functools import lru_cache
+
+import registry
+import store
+
+# 검진종류: (코드, 담당구분 필드, 가능 값, 표시명)
+# 비트 순서는 이 목록의 순서를 따른다.
+EXAM_TYPES = [
+    ('general', 'grenChrgTypeCd', '1', '일반검진'),
+    ('infant', 'ichkChrgTypeCd', '1', '영유아검진'),
+    ('breast', 'bcExmdChrgTypeCd', '0', '유방암검진'),
+    ('colon', 'ccExmdChrgTypeCd', '0', '대장암검진'),
+    ('cervical', 'cvxcaExmdChrgTypeCd', '0', '자궁경부암검진'),
+    ('liver', 'lvcaExmdChrgTypeCd', '0', '간암검진'),
+    ('stomach', 'stmcaExmdChrgTypeCd', '0', '위암검진'),
+    ('oral', 'mchkChrgTypeCd', '0', '구강검진')
+]
+
+EXAM_BITS = {}
+for _bit, (_code, _field, _value, _label) in enumerate(EXAM_TYPES):
+    # 코드, 표시명, '검진'을 뺀 표시명 모두 허용 (예: stomach, 위암검진, 위암)
+    for _name in (_code, _label, _label[:-2]):
+        EXAM_BITS[_name] = 1 << _bit
+
+# 엑셀 검진여부 값 ('1'/'0' 가능, '2' 불가능, 그 외 빈 칸)
+EXAM_STATUS = {'1': '가능', '0': '가능', '2': '불가능'}
+# 검진여부를 검진종류마다 2비트(0 빈 칸, 1 가능, 2 불가능)로 묶은 값 (내보내기용, 가능 비트마스크와 별개)
+_STATUS_CODES = {'1': 1, '0': 1, '2': 2}
+_STATUS_VALUES = [None, '가능', '불가능']
+
+# 비트마스크 -> GPTs 검진종류 문자열 (256가지를 미리 계산)
+EXAM_LABELS = [
+    ', '.join(label for bit, (_, _, _, label) in enumerate(EXAM_TYPES) if mask & (1 << bit)) or '-'
+    for mask in range(1 << len(EXAM_TYPES))
+]
+
+FILTER_PARAMS = ['siDoCd', 'siGunGuCd', 'hmcRdatCd']
+
+
+def exam_mask(hospital):
+    """병원이 담당하는 검진종류 비트마스크"""
+    mask = 0
+    for bit, (_, field, value, _) in enumerate(EXAM_TYPES):
+        if hospital.get(field) == value:
+            mask |= 1 << bit
+    return mask
+
+
+def exam_status(hospital):
+    """검진종류별 엑셀 검진여부를 2비트씩 묶은 값 ('2'(불가능)와 값 없음을 구분)"""
+    status = 0
+    for bit, (_, field, _, _) in enumerate(EXAM_TYPES):
+        status |= _STATUS_CODES.get(hospital.get(field), 0) << (2 * bit)
+    return status
+
+
+@lru_cache(maxsize=None)
+def exam_status_values(status):
+    """exam_status 값을 EXAM_TYPES 순서의 검진여부 값('가능'/'불가능'/None)으로 변환"""
+    return tuple(_STATUS_VALUES[(status >> (2 * bit)) & 3] for bit in range(len(EXAM_TYPES)))
+
+
+def exam_labels(mask):
+    """비트마스크를 '일반검진, 위암검진' 형식의 문자열로 변환"""
+    return EXAM_LABELS[mask]
+
+
+def parse_exam_types(value):
+    """examTypes 파라미터('stomach,colon' 또는 '위암,대장암')를 비트마스크로 변환"""
+    mask = 0
+    for name in (value or '').split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in EXAM_BITS:
+            raise ValueError(f"Unknown exam type: {name}")
+        mask |= EXAM_BITS[name]
+    return mask
+
+
+class ExamIndex:
+    """검진종류 비트마스크와 지역/평가등급 코드를 NumPy 배열로 보관하는 필터 인덱스"""
+
+    def __init__(self, hospitals, masks=None):
+        """masks: 스냅샷에 저장된 항목별 비트마스크 (없으면 여기서 계산)"""
+        import numpy as np  # 인덱스를 처음 만들 때 불러옴 (콜드 스타트 단축)
+
+        self.hospitals = hospitals
+        if masks is not None and len(masks) == len(hospitals):
+            self.masks = np.frombuffer(masks, dtype=np.uint8) if isinstance(masks, bytes) \
+                else np.array(masks, dtype=np.uint8)
+        else:
+            self.masks = np.fromiter((exam_mask(h) for h in hospitals), dtype=np.uint8, count=len(hospitals))
+        self.vocab = {}
+        self.codes = {}
+        for key in FILTER_PARAMS:
+            vocab = {}
+            self.codes[key] = np.fromiter(
+                (vocab.setdefault(h.get(key) or '', len(vocab)) for h in hospitals),
+                dtype=np.int32, count=len(hospitals)
+            )
+            self.vocab[key] = vocab
+
+    def select(self, all_of=0, any_of=0, filters=None):
+        """조건에 맞는 병원 번호 배열 (원래 순서 유지)
+
+        all_of: 모두 가능한 검진종류, any_of: 하나 이상 가능한 검진종류
+        """
+        import numpy as np
+
+        selected = np.ones(len(self.hospitals), dtype=bool)
+        if all_of:
+            selected &= (self.masks & all_of) == all_of
+        if any_of:
+            selected &= (self.masks & any_of) != 0
+        for key in FILTER_PARAMS:
+            value = (filters or {}).get(key)
+            if value:
+                code = self.vocab[key].get(value)
+                if code is None:
+                    return np.empty(0, dtype=np.intp)
+                selected &= self.codes[key] == code
+        return np.flatnonzero(selected)
+
+
+def get_index(snapshot=None):
+    """현재(또는 snapshot) 데이터 버전의 검진종류 인덱스 (전체 목록이 준비되지 않았으면 None)"""
+    return registry.derived('exam_index', ExamIndex, with_exam_masks=True, snapshot=snapshot)
+
+
+def has_exam_filter(params):
+    return bool(params.get('examTypes'))
+
+
+def match_mask(params):
+    """examTypes/examMatch 파라미터를 (all_of, any_of)로 변환"""
+    mask = parse_exam_types(params.get('examTypes'))
+    if params.get('examMatch') == 'any':
+        return 0, mask
+    return mask, 0
+
+
+def query(params, default_rows=10):
+    """examTypes 검색 (공공데이터 API와 같은 형식의 응답, 전체 목록이 준비되지 않았으면 registry.NotReady)"""
+    all_of, any_of = match_mask(params)
+    index = get_index()
+    if index is None:
+        # 원본 API는 examTypes 조건을 지원하지 않으므로 조건 없는 결과를 돌려주지 않도록 거절
+        raise registry.NotReady("Hospital list is still loading; retry shortly")
+    selected = index.select(all_of, any_of, params)
+    # 나머지 조건은 걸러진 후보에 대해서만 확인
+    for key in ['hmcNm', 'locAddr']:
+        if params.get(key):
+            selected = [i for i in selected if params[key] in (index.hospitals[i].get(key) or '')]
+    if params.get('hchType'):
+        selected = [i for i in selected if params['hchType'] in store.hch_types_of(index.hospitals[i])]
+    page_no, num_of_rows = store.page_params(params, default_rows)
+    start = (page_no - 1) * num_of_rows
+    page = selected[start:start + num_of_rows]
+    items = [index.hospitals[i] for i in page]
+    return store.envelope(items, page_no, num_of_rows, len(selected), [int(index.masks[i]) for i in page])
@@ -0,0 +1,134 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+from urllib.parse import quote
+
+import exam_index
+
+# 내보내기 컬럼 (원본 필드명, 한글 컬럼명)
+EXPORT_COLUMNS = [
+    ('hmcNm', '검진기관명'),
+    ('hmcNo', '검진기관번호'),
+    ('hmcTelNo', '전화번호'),
+    ('locAddr', '주소'),
+    ('locPostNo', '우편번호'),
+    ('ykindnm', '기관종별'),
+    ('grenChrgTypeCd', '일반검진여부'),
+    ('ichkChrgTypeCd', '영유아검진여부'),
+    ('bcExmdChrgTypeCd', '유방암검진여부'),
+    ('ccExmdChrgTypeCd', '대장암검진여부'),
+    ('cvxcaExmdChrgTypeCd', '자궁경부암검진여부'),
+    ('lvcaExmdChrgTypeCd', '간암검진여부'),
+    ('stmcaExmdChrgTypeCd', '위암검진여부'),
+    ('mchkChrgTypeCd', '구강검진여부')
+]
+
+# 검진여부 필드 -> exam_index.exam_status_values의 위치
+EXAM_SLOTS = {field: slot for slot, (_, field, _, _) in enumerate(exam_index.EXAM_TYPES)}
+
+SHEET_NAME = '검진기관목록'
+
+# 형식별 (MIME 타입, 확장자)
+FORMATS = {
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson; charset=utf-8', 'ndjson')
+}
+
+CHUNK_ROWS = 500  # CSV/NDJSON은 이 행 수만큼 모아서 내보냄
+CHUNK_BYTES = 64 * 1024
+SPOOL_MAX_BYTES = int(os.environ.get('EXPORT_SPOOL_MAX_BYTES', str(1024 * 1024)))  # 초과 시 디스크 사용
+
+HEADERS = [header for _, header in EXPORT_COLUMNS]
+
+
+def export_row(hospital, exam_status=None):
+    """병원 레코드 하나를 내보내기 행으로 변환
+
+    exam_status(exam_index.exam_status 값)를 주면 검진여부 열은 미리 계산한 표에서 가져온다.
+    """
+    if exam_status is None:
+        exam_status = exam_index.exam_status(hospital)
+    exams = exam_index.exam_status_values(exam_status)
+    return [exams[EXAM_SLOTS[field]] if field in EXAM_SLOTS else hospital.get(field) for field, _ in EXPORT_COLUMNS]
+
+
+def export_rows(hospitals, exam_statuses=None):
+    """내보내기 행 목록 (exam_statuses는 hospitals와 같은 순서의 exam_status 값)"""
+    if exam_statuses is None:
+        return (export_row(hospital) for hospital in hospitals)
+    return (export_row(hospital, status) for hospital, status in zip(hospitals, exam_statuses))
+
+
+def write_xlsx(hospitals, fileobj, exam_statuses=None):
+    """openpyxl write-only 모드로 엑셀 파일을 행 단위로 기록"""
+    from openpyxl import Workbook  # CSV/NDJSON만 쓰는 경우 불러오지 않음
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(SHEET_NAME)
+    sheet.append(HEADERS)
+    for row in export_rows(hospitals, exam_statuses):
+        sheet.append(row)
+    workbook.save(fileobj)
+
+
+def iter_xlsx(hospitals, exam_statuses=None):
+    """엑셀 파일을 청크 단위로 생성 (작은 파일은 메모리, 큰 파일은 임시 파일 사용)"""
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as f:
+        write_xlsx(hospitals, f, exam_statuses)
+        f.seek(0)
+        while True:
+            chunk = f.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+
+def iter_csv(hospitals, exam_statuses=None):
+    """CSV를 청크 단위로 생성 (엑셀에서 한글이 깨지지 않도록 BOM 포함)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(HEADERS)
+    for i, row in enumerate(export_rows(hospitals, exam_statuses), 1):
+        writer.writerow(row)
+        if i % CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_ndjson(hospitals, exam_statuses=None):
+    """NDJSON(한 줄에 병원 하나)을 청크 단위로 생성"""
+    lines = []
+    for row in export_rows(hospitals, exam_statuses):
+        lines.append(json.dumps(dict(zip(HEADERS, row)), ensure_ascii=False))
+        if len(lines) >= CHUNK_ROWS:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def iter_export(hospitals, fmt='xlsx', exam_statuses=None):
+    """지정한 형식으로 내보내기 본문을 청크 단위로 생성"""
+    if fmt == 'csv':
+        return iter_csv(hospitals, exam_statuses)
+    if fmt == 'ndjson':
+        return iter_ndjson(hospitals, exam_statuses)
+    return iter_xlsx(hospitals, exam_statuses)
+
+
+def export_filename(fmt='xlsx'):
+    return f"검진기관목록_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{FORMATS[fmt][1]}"
+
+
+def content_disposition(filename):
+    """한글 파일명을 위한 Content-Disposition 헤더 값 (RFC 5987)"""
+    fallback = filename.encode('ascii', 'ignore').decode('ascii') or 'download'
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
@@ -0,0 +1,34 @@
+import json
+import os
+
+# JSON 처리 설정: auto면 orjson이 설치되어 있을 때 사용
+JSON_BACKEND = os.environ.get('JSON_BACKEND', 'auto')  # auto | orjson | json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if JSON_BACKEND == 'orjson' and orjson is None:
+    raise ImportError("JSON_BACKEND=orjson requires the orjson package")
+
+BACKEND = 'orjson' if orjson is not None and JSON_BACKEND != 'json' else 'json'
+
+
+def dumps(obj):
+    """JSON 직렬화 (bytes, 한글은 이스케이프하지 않음)"""
+    if BACKEND == 'orjson':
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def loads(data):
+    """JSON 파싱 (bytes 또는 str)"""
+    if BACKEND == 'orjson':
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_response(response):
+    """원본 API 응답 본문 파싱 (response.json() 대체)"""
+    return loads(response.content)
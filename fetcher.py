@@ -0,0 +1,167 @@
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cache
+import fastjson
+import metrics
+import upstream
+
+# 전체 목록 수집 설정
+FETCH_WORKERS = int(os.environ.get('FETCH_WORKERS', '4'))  # 동시에 요청하는 페이지 수
+FETCH_PAGE_SIZE = int(os.environ.get('FETCH_PAGE_SIZE', '100'))
+FETCH_TIMEOUT = float(os.environ.get('FETCH_TIMEOUT', '10'))  # 페이지 한 번 시도의 제한 시간(초)
+
+
+class IncompleteFetchError(Exception):
+    """전체 목록 수집에서 일부 페이지를 끝내 받지 못함 (report에 수집 결과)"""
+
+    def __init__(self, report):
+        super().__init__(
+            f"Incomplete fetch: {report['fetched']}/{report['total_count']} hospitals, "
+            f"failed pages {report['failed_pages'][:10]}"
+        )
+        self.report = report
+
+
+def is_complete(report):
+    """모든 페이지를 받았고 totalCount만큼 모였는지 (hmcNo 중복으로 뺀 건수 포함)"""
+    return not report['failed_pages'] and report['fetched'] + report['duplicates'] >= report['total_count'] > 0
+
+
+def extract_items(data):
+    """API 응답에서 item 목록 추출 (단일 항목이면 dict로 오는 경우 처리)"""
+    items = data['response']['body']['items']
+    items = items.get('item', []) if isinstance(items, dict) else []
+    if not isinstance(items, list):
+        items = [items] if items else []
+    return items
+
+
+@metrics.timed('fetch_page')
+def fetch_page(base_url, service_key, page_no, num_of_rows, filters=None):
+    """한 페이지 조회 (재시도는 upstream 클라이언트가 담당, filters는 검색 조건 dict)
+
+    반환값: (items, total_count). 실패하면 items는 None.
+    """
+    api_params = {
+        'serviceKey': service_key,
+        'numOfRows': str(num_of_rows),
+        'pageNo': str(page_no),
+        '_type': 'json',
+        **(filters or {})
+    }
+
+    try:
+        response = cache.cached_get(base_url, params=api_params, timeout=FETCH_TIMEOUT)
+        if response.status_code == 200:
+            with metrics.span('parse'):
+                data = fastjson.load_response(response)
+            if data['response']['header']['resultCode'] == '00':
+                total_count = int(data['response']['body'].get('totalCount', 0))
+                return extract_items(data), total_count
+    except Exception as e:
+        print(f"Error on page {page_no}: {str(e)}")
+    return None, None
+
+
+def page_size(first_items, total_count, num_of_rows):
+    """실제 페이지 크기 (원본 API가 numOfRows를 제한하면 요청보다 적게 오므로 받은 건수를 사용)"""
+    if first_items and len(first_items) < num_of_rows and total_count > len(first_items):
+        return len(first_items)
+    return num_of_rows
+
+
+def _percentile(values, ratio):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+@metrics.timed('fetch_all')
+def fetch_all_hospitals(base_url, service_key, num_of_rows=FETCH_PAGE_SIZE, max_workers=FETCH_WORKERS,
+                        allow_partial=False):
+    """모든 검진기관 데이터를 병렬로 조회
+
+    첫 페이지에서 totalCount를 읽은 뒤 나머지 페이지를 스레드 풀로 동시에 가져온다.
+    결과는 페이지 순서대로 합치고 hmcNo 기준으로 중복을 제거한다.
+    반환값: (hospitals, report)
+    재시도 후에도 실패한 페이지가 있거나 totalCount보다 적게 모이면 IncompleteFetchError를 낸다.
+    스냅샷/내보내기 파일이 일부만 받은 목록으로 바뀌지 않도록 하기 위함이며,
+    수집 리포트만 필요하면(튜닝, 벤치마크) allow_partial=True로 부분 결과를 받는다.
+    """
+    started = time.perf_counter()
+    retries_before = upstream.stats()['retries']
+    page_times = {}
+
+    def timed_fetch(page_no):
+        t0 = time.perf_counter()
+        result = fetch_page(base_url, service_key, page_no, num_of_rows)
+        page_times[page_no] = time.perf_counter() - t0
+        return result
+
+    pages = {}
+    first_items, total_count = timed_fetch(1)
+    if first_items is None:
+        total_count = 0
+    else:
+        pages[1] = first_items
+        num_of_rows = page_size(first_items, total_count, num_of_rows)
+
+    page_count = math.ceil(total_count / num_of_rows) if total_count else 1
+    if page_count > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            rest = range(2, page_count + 1)
+            for page_no, (items, _) in zip(rest, executor.map(timed_fetch, rest)):
+                if items is not None:
+                    pages[page_no] = items
+
+    hospitals = []
+    seen = set()
+    duplicates = 0
+    for page_no in sorted(pages):
+        for hospital in pages[page_no]:
+            key = hospital.get('hmcNo')
+            if key is not None:
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+            hospitals.append(hospital)
+
+    timings = list(page_times.values())
+    report = {
+        'total_count': total_count,
+        'fetched': len(hospitals),
+        'duplicates': duplicates,
+        'pages': page_count,
+        'failed_pages': sorted(set(range(1, page_count + 1)) - set(pages)),
+        # 같은 시간에 다른 요청이 재시도한 횟수도 포함될 수 있음
+        'retries': upstream.stats()['retries'] - retries_before,
+        'workers': max_workers,
+        'page_size': num_of_rows,
+        'elapsed': round(time.perf_counter() - started, 3),
+        'page_time': {
+            'min': round(min(timings), 3) if timings else 0,
+            'avg': round(sum(timings) / len(timings), 3) if timings else 0,
+            'p95': round(_percentile(timings, 0.95), 3),
+            'max': round(max(timings), 3) if timings else 0
+        }
+    }
+    report['complete'] = is_complete(report)
+    if not report['complete'] and not allow_partial:
+        raise IncompleteFetchError(report)
+    return hospitals, report
+
+
+if __name__ == '__main__':
+    # 동시성 튜닝용 타이밍 리포트: python fetcher.py [workers ...]
+    import json
+    import sys
+
+    for workers in [int(arg) for arg in sys.argv[1:]] or [FETCH_WORKERS]:
+        _, report = fetch_all_hospitals(os.environ.get('BASE_URL'), os.environ.get('API_KEY'), max_workers=workers,
+                                        allow_partial=True)
+        print(json.dumps(report, ensure_ascii=False))
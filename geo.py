@@ -0,0 +1,333 @@
+import csv
+import math
+import os
+from functools import lru_cache
+
+import exam_index
+import registry
+
+# 우편번호 중심 좌표 파일 (CSV: postcode,lat,lng)
+POSTCODE_FILE = os.environ.get(
+    'POSTCODE_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'postcode_centroids.csv')
+)
+GRID_CELL_DEG = 0.05  # 격자 한 칸 크기 (위도 기준 약 5.5km)
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG = math.pi * EARTH_RADIUS_KM / 180
+MAX_RADIUS_KM = 500
+BRUTE_FORCE_MAX = 2000  # 필터 후 후보가 이보다 적으면 격자 대신 전수 계산
+
+GEO_PARAMS = ['lat', 'lng', 'postNo', 'radius', 'k']
+
+
+class GeoNotConfigured(Exception):
+    """우편번호 중심 좌표 파일이 없어 위치 검색을 쓸 수 없음"""
+
+
+def is_configured(path=POSTCODE_FILE):
+    return os.path.exists(path)
+
+
+def normalize_postcode(value):
+    return ''.join(ch for ch in str(value or '') if ch.isdigit())
+
+
+@lru_cache(maxsize=1)
+def load_centroids(path=POSTCODE_FILE):
+    """우편번호 -> (위도, 경도)
+
+    정확한 우편번호가 없을 때 쓰도록 앞 3자리(시군구 단위) 평균 좌표도 함께 만든다.
+    """
+    if not os.path.exists(path):
+        raise GeoNotConfigured(
+            f"Proximity search is not configured: postcode centroid file not found ({path}). "
+            "Create it with `python geo.py build <source.csv>`."
+        )
+
+    centroids = {}
+    prefix_sums = {}
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            postcode = normalize_postcode(row['postcode'])
+            lat, lng = float(row['lat']), float(row['lng'])
+            centroids[postcode] = (lat, lng)
+            total = prefix_sums.setdefault(postcode[:3], [0.0, 0.0, 0])
+            total[0] += lat
+            total[1] += lng
+            total[2] += 1
+    prefixes = {prefix: (lat / count, lng / count) for prefix, (lat, lng, count) in prefix_sums.items()}
+    return centroids, prefixes
+
+
+def locate_postcode(postcode):
+    """우편번호의 중심 좌표 (없으면 앞 3자리 평균, 그래도 없으면 None)"""
+    centroids, prefixes = load_centroids()
+    postcode = normalize_postcode(postcode)
+    if postcode in centroids:
+        return centroids[postcode]
+    return prefixes.get(postcode[:3])
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """한 점에서 여러 점까지의 거리(km)"""
+    import numpy as np
+
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def utmk_to_wgs84(x, y):
+    """UTM-K(EPSG:5179) 좌표를 (위도, 경도)로 변환 (GRS80 횡메르카토르 역변환)
+
+    도로명주소 위치정보 등 국내 공공 데이터가 UTM-K 좌표로 제공되므로 좌표 파일 생성에 사용한다.
+    """
+    a, f = 6378137.0, 1 / 298.257222101
+    k0, lat0, lng0, false_e, false_n = 0.9996, math.radians(38), math.radians(127.5), 1000000.0, 2000000.0
+    e2 = f * (2 - f)
+    ep2 = e2 / (1 - e2)
+
+    def meridian(lat):
+        return a * ((1 - e2 / 4 - 3 * e2 ** 2 / 64 - 5 * e2 ** 3 / 256) * lat
+                    - (3 * e2 / 8 + 3 * e2 ** 2 / 32 + 45 * e2 ** 3 / 1024) * math.sin(2 * lat)
+                    + (15 * e2 ** 2 / 256 + 45 * e2 ** 3 / 1024) * math.sin(4 * lat)
+                    - (35 * e2 ** 3 / 3072) * math.sin(6 * lat))
+
+    mu = (meridian(lat0) + (y - false_n) / k0) / (a * (1 - e2 / 4 - 3 * e2 ** 2 / 64 - 5 * e2 ** 3 / 256))
+    e1 = (1 - math.sqrt(1 - e2)) / (1 + math.sqrt(1 - e2))
+    lat1 = (mu + (3 * e1 / 2 - 27 * e1 ** 3 / 32) * math.sin(2 * mu)
+            + (21 * e1 ** 2 / 16 - 55 * e1 ** 4 / 32) * math.sin(4 * mu)
+            + (151 * e1 ** 3 / 96) * math.sin(6 * mu) + (1097 * e1 ** 4 / 512) * math.sin(8 * mu))
+    c1 = ep2 * math.cos(lat1) ** 2
+    t1 = math.tan(lat1) ** 2
+    n1 = a / math.sqrt(1 - e2 * math.sin(lat1) ** 2)
+    r1 = a * (1 - e2) / (1 - e2 * math.sin(lat1) ** 2) ** 1.5
+    d = (x - false_e) / (n1 * k0)
+    lat = lat1 - (n1 * math.tan(lat1) / r1) * (
+        d ** 2 / 2 - (5 + 3 * t1 + 10 * c1 - 4 * c1 ** 2 - 9 * ep2) * d ** 4 / 24
+        + (61 + 90 * t1 + 298 * c1 + 45 * t1 ** 2 - 252 * ep2 - 3 * c1 ** 2) * d ** 6 / 720)
+    lng = lng0 + (d - (1 + 2 * t1 + c1) * d ** 3 / 6
+                  + (5 - 2 * c1 + 28 * t1 - 3 * c1 ** 2 + 8 * ep2 + 24 * t1 ** 2) * d ** 5 / 120) / math.cos(lat1)
+    return math.degrees(lat), math.degrees(lng)
+
+
+def build_centroids(rows, postcode, lat=None, lng=None, x=None, y=None):
+    """주소 단위 좌표 행들을 우편번호별 평균 좌표로 묶음: [(우편번호, 위도, 경도), ...]
+
+    rows는 dict(헤더 있는 CSV) 또는 list(헤더 없는 CSV, 열 번호) 목록이며,
+    위도/경도 열(lat, lng) 또는 UTM-K 좌표 열(x, y) 중 하나를 지정한다.
+    """
+    sums = {}
+    for row in rows:
+        code = normalize_postcode(row[postcode])
+        try:
+            if x is not None:
+                point = utmk_to_wgs84(float(row[x]), float(row[y]))
+            else:
+                point = float(row[lat]), float(row[lng])
+        except (ValueError, TypeError, IndexError, KeyError):
+            continue  # 좌표가 비어 있는 행
+        if len(code) != 5:
+            continue
+        total = sums.setdefault(code, [0.0, 0.0, 0])
+        total[0] += point[0]
+        total[1] += point[1]
+        total[2] += 1
+    return [(code, round(lat / count, 6), round(lng / count, 6)) for code, (lat, lng, count) in sorted(sums.items())]
+
+
+def _cell(lat, lng):
+    return int(math.floor(lat / GRID_CELL_DEG)), int(math.floor(lng / GRID_CELL_DEG))
+
+
+class GeoIndex:
+    """locPostNo를 우편번호 중심 좌표로 바꿔 만든 격자 공간 인덱스"""
+
+    def __init__(self, hospitals):
+        import numpy as np  # 인덱스를 처음 만들 때 불러옴 (콜드 스타트 단축)
+
+        self.hospitals = hospitals
+        self.lats = np.full(len(hospitals), np.nan)
+        self.lngs = np.full(len(hospitals), np.nan)
+        cells = {}
+        for i, hospital in enumerate(hospitals):
+            point = locate_postcode(hospital.get('locPostNo'))
+            if point is None:
+                continue
+            self.lats[i], self.lngs[i] = point
+            cells.setdefault(_cell(*point), []).append(i)
+        self.cells = {key: np.array(ids, dtype=np.intp) for key, ids in cells.items()}
+        self.located = sum(len(ids) for ids in cells.values())
+
+    def _ring(self, center, ring):
+        """중심 칸에서 체비셰프 거리가 ring인 칸들의 병원 번호"""
+        import numpy as np
+
+        row, col = center
+        if ring == 0:
+            keys = [center]
+        else:
+            keys = [(row - ring, c) for c in range(col - ring, col + ring + 1)]
+            keys += [(row + ring, c) for c in range(col - ring, col + ring + 1)]
+            keys += [(r, col - ring) for r in range(row - ring + 1, row + ring)]
+            keys += [(r, col + ring) for r in range(row - ring + 1, row + ring)]
+        ids = [self.cells[key] for key in keys if key in self.cells]
+        return np.concatenate(ids) if ids else np.empty(0, dtype=np.intp)
+
+    def nearest(self, lat, lng, k, allowed=None, radius_km=None):
+        """가까운 순으로 최대 k개: [(병원 번호, 거리 km), ...]
+
+        격자를 중심에서 한 칸씩 넓혀 가며, 다음 고리까지의 최소 거리가
+        k번째 거리보다 멀어지면 멈춘다. radius_km를 주면 그 안쪽만 찾는다.
+        """
+        import numpy as np
+
+        if allowed is not None and allowed.sum() <= BRUTE_FORCE_MAX:
+            # 후보가 적으면 격자를 넓혀 가는 것보다 전부 계산하는 편이 빠름
+            ids = np.flatnonzero(allowed & ~np.isnan(self.lats))
+            dists = haversine_km(lat, lng, self.lats[ids], self.lngs[ids])
+            if radius_km is not None:
+                inside = dists <= radius_km
+                ids, dists = ids[inside], dists[inside]
+            order = np.argsort(dists, kind='stable')[:k or None]
+            return [(int(ids[i]), float(dists[i])) for i in order]
+
+        center = _cell(lat, lng)
+        ring_km = GRID_CELL_DEG * KM_PER_DEG * max(math.cos(math.radians(lat)), 0.1)
+        max_ring = int(min(radius_km or MAX_RADIUS_KM, MAX_RADIUS_KM) / ring_km) + 1
+        found_ids = []
+        found_dists = []
+        count = 0
+        for ring in range(max_ring + 1):
+            ids = self._ring(center, ring)
+            if allowed is not None and len(ids):
+                ids = ids[allowed[ids]]
+            if len(ids):
+                dists = haversine_km(lat, lng, self.lats[ids], self.lngs[ids])
+                if radius_km is not None:
+                    inside = dists <= radius_km
+                    ids, dists = ids[inside], dists[inside]
+                found_ids.append(ids)
+                found_dists.append(dists)
+                count += len(ids)
+            if k and count >= k:
+                kth = np.partition(np.concatenate(found_dists), k - 1)[k - 1]
+                if kth <= ring * ring_km:
+                    break
+
+        if not count:
+            return []
+        ids = np.concatenate(found_ids)
+        dists = np.concatenate(found_dists)
+        order = np.argsort(dists, kind='stable')
+        if k:
+            order = order[:k]
+        return [(int(ids[i]), float(dists[i])) for i in order]
+
+
+def get_index():
+    """현재 데이터 버전의 공간 인덱스"""
+    return registry.derived('geo_index', GeoIndex)
+
+
+def is_geo_query(params):
+    return bool((params.get('lat') and params.get('lng')) or params.get('postNo'))
+
+
+def _finite(params, key):
+    """파라미터를 유한한 실수로 변환 (inf/nan이면 ValueError)"""
+    value = float(params[key])
+    if not math.isfinite(value):
+        raise ValueError(f"{key} must be a finite number")
+    return value
+
+
+def query_point(params):
+    """lat/lng 또는 postNo 파라미터를 좌표로 변환 (범위를 벗어난 좌표는 ValueError)"""
+    if params.get('lat') and params.get('lng'):
+        lat, lng = _finite(params, 'lat'), _finite(params, 'lng')
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise ValueError("lat must be within [-90, 90] and lng within [-180, 180]")
+        return lat, lng
+    point = locate_postcode(params['postNo'])
+    if point is None:
+        raise ValueError(f"Unknown postcode: {params['postNo']}")
+    return point
+
+
+def nearest_hospitals(params, default_k=5):
+    """가까운 검진기관 검색: [(병원, 거리 km, 검진종류 비트마스크), ...]
+
+    k(기본 5개)와 radius(km)로 범위를 정하고, examTypes/siDoCd/siGunGuCd/hmcRdatCd로 거를 수 있다.
+    """
+    load_centroids()  # 좌표 파일이 없으면 병원 목록을 불러오기 전에 GeoNotConfigured
+    lat, lng = query_point(params)
+    k = int(params.get('k') or params.get('numOfRows') or default_k)
+    if k < 0:
+        raise ValueError("k must be >= 0")
+    radius_km = _finite(params, 'radius') if params.get('radius') else None
+    if radius_km is not None and radius_km <= 0:
+        raise ValueError("radius must be > 0")
+
+    index = get_index()
+    exams = exam_index.get_index()
+    if index is None or exams is None:
+        raise registry.NotReady("Hospital list is still loading; retry shortly")
+    allowed = None
+    if exam_index.has_exam_filter(params) or any(params.get(key) for key in exam_index.FILTER_PARAMS):
+        import numpy as np
+
+        all_of, any_of = exam_index.match_mask(params)
+        allowed = np.zeros(len(index.hospitals), dtype=bool)
+        allowed[exams.select(all_of, any_of, params)] = True
+
+    return [
+        (index.hospitals[i], dist, int(exams.masks[i]))
+        for i, dist in index.nearest(lat, lng, k, allowed, radius_km)
+    ]
+
+
+if __name__ == '__main__':
+    # 우편번호 중심 좌표 파일 생성: python geo.py build <원본 CSV> [옵션]
+    # 예) 위도/경도 열이 있는 CSV:        python geo.py build addresses.csv --postcode 우편번호 --lat 위도 --lng 경도
+    #     UTM-K 좌표, 헤더 없는 | 구분 파일: python geo.py build a.txt b.txt --delimiter '|' --encoding cp949 \
+    #                                         --no-header --postcode <열 번호> --x <열 번호> --y <열 번호>
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('source', nargs='+', help='주소별 좌표 CSV (여러 개면 합쳐서 계산)')
+    parser.add_argument('--output', default=POSTCODE_FILE)
+    parser.add_argument('--encoding', default='utf-8-sig')
+    parser.add_argument('--delimiter', default=',')
+    parser.add_argument('--no-header', action='store_true', help='헤더가 없으면 열은 0부터 시작하는 번호로 지정')
+    parser.add_argument('--postcode', default='postcode', help='우편번호 열')
+    parser.add_argument('--lat', default='lat', help='위도 열')
+    parser.add_argument('--lng', default='lng', help='경도 열')
+    parser.add_argument('--x', help='UTM-K X 좌표 열 (위도/경도 대신)')
+    parser.add_argument('--y', help='UTM-K Y 좌표 열')
+    args = parser.parse_args()
+
+    def column(name):
+        return int(name) if args.no_header and name is not None else name
+
+    def read_rows():
+        for source in args.source:
+            with open(source, 'r', encoding=args.encoding, errors='replace', newline='') as f:
+                reader = csv.reader(f, delimiter=args.delimiter) if args.no_header \
+                    else csv.DictReader(f, delimiter=args.delimiter)
+                yield from reader
+
+    centroids = build_centroids(read_rows(), column(args.postcode), column(args.lat), column(args.lng),
+                                column(args.x), column(args.y))
+    if not centroids:
+        sys.exit("No rows with a 5-digit postcode and coordinates")
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    tmp_path = f'{args.output}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['postcode', 'lat', 'lng'])
+        writer.writerows(centroids)
+    os.replace(tmp_path, args.output)
+    print(f"Postcode centroids written: {len(centroids)} postcodes -> {args.output}")
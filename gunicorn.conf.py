@@ -0,0 +1,118 @@
+# 운영 서버 설정 (prefork): gunicorn -c gunicorn.conf.py main:app
+# - 마스터가 앱과 스냅샷 데이터(메모리 목록, 검색/검진종류/공간/집계 인덱스)를 한 번 올린 뒤 워커를 fork한다.
+#   워커는 같은 메모리를 copy-on-write로, 열 단위 스냅샷은 같은 mmap 페이지를 공유한다.
+# - 원본 응답 캐시는 워커마다 두고, 워커 사이에는 CACHE_SHARED_PATH의 SQLite 파일로 공유한다.
+# - 마스터가 SERVE_RELOAD_INTERVAL마다 스냅샷 데이터 버전을 확인해, 바뀌면 새 데이터를 올리고
+#   자기 자신에게 SIGHUP을 보낸다 (새 워커를 먼저 띄우고 기존 워커는 처리 중인 요청을 마친 뒤 종료).
+# - 스냅샷이 없거나 만료되면 REGISTRY_LOCK을 얻은 프로세스(보통 마스터) 하나만 원본 API에서 전체 목록을 받아
+#   스냅샷 파일로 기록하고, 이 스냅샷으로 워커를 교체한다.
+# 설정 파일은 SIGHUP마다 다시 실행되므로 이 파일의 전역 상태는 다시 만들어진다.
+import gc
+import os
+import signal
+import threading
+import time
+
+# 서버 설정
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', str(os.cpu_count() or 1)))  # 기본: CPU 코어 수
+worker_class = 'gthread'
+threads = int(os.environ.get('SERVE_THREADS', '8'))  # 워커당 스레드 수 (원본 API 응답 대기용)
+# 마스터에서 앱과 데이터를 불러온 뒤 fork (0이면 워커마다 따로 불러옴, 메모리 비교용)
+preload_app = os.environ.get('SERVE_PRELOAD', '1') != '0'
+timeout = int(os.environ.get('SERVE_TIMEOUT', '60'))
+graceful_timeout = int(os.environ.get('SERVE_GRACEFUL_TIMEOUT', '30'))  # 교체되는 워커가 요청을 마칠 시간
+keepalive = 5
+accesslog = os.environ.get('SERVE_ACCESS_LOG') or None
+
+SERVE_RELOAD_INTERVAL = float(os.environ.get('SERVE_RELOAD_INTERVAL', '10'))  # 새 스냅샷 확인 주기(초), 0이면 끔
+
+# 워커 사이 공유 설정 (앱 모듈을 불러오기 전에 환경 변수로 지정)
+_shm = '/dev/shm' if os.path.isdir('/dev/shm') else os.environ.get('DATA_DIR', '/tmp/data')
+os.environ.setdefault('CACHE_SHARED_PATH', os.path.join(_shm, f"hospital_cache_{os.environ.get('PORT', '8000')}.db"))
+os.environ.setdefault('PREFETCH_LOCK', os.path.join(_shm, f"hospital_prefetch_{os.environ.get('PORT', '8000')}.lock"))
+# 스냅샷이 없거나 만료되면 원본 API에서 전체 목록을 받는 프로세스는 하나뿐 (받은 목록은 스냅샷 파일로 공유)
+os.environ.setdefault('REGISTRY_LOCK', os.path.join(_shm, f"hospital_registry_{os.environ.get('PORT', '8000')}.lock"))
+
+import prefetch  # noqa: E402
+
+if preload_app:
+    prefetch.defer()  # 미리 갱신 스레드는 마스터가 아니라 워커에서 시작
+
+
+def load_shared_data(log):
+    """스냅샷 데이터와 파생 인덱스를 마스터에 올리고 gc.freeze() (스냅샷이 없거나 만료되면 None)
+
+    fork 뒤 워커의 GC가 공유 객체를 건드려 페이지가 복사되지 않도록 올린 객체는 GC 대상에서 뺀다.
+    """
+    import columnar
+    import exam_index
+    import geo
+    import registry
+    import rollup
+    import search_engine
+
+    gc.unfreeze()
+    version = registry.snapshot_version()
+    if version is None:
+        # 마스터가 원본 API에서 읽어 스냅샷을 기록하면 watch_snapshot이 워커를 교체
+        log.info("No fresh snapshot: loading data from the API in the background")
+        registry.refresh_shared()
+        return None
+    columnar.get()
+    hospitals = registry.get_hospitals()
+    search_engine.get_engine()
+    exam_index.get_index()
+    rollup.get_index()
+    if geo.is_configured():
+        try:
+            geo.get_index()
+        except Exception as e:
+            log.warning(f"Geo index not preloaded: {str(e)}")
+    else:
+        log.info(f"Proximity search not configured: {geo.POSTCODE_FILE} missing")
+    gc.collect()
+    gc.freeze()
+    log.info(f"Shared data loaded: version {version}, {len(hospitals)} hospitals")
+    return version
+
+
+def watch_snapshot(server, loaded):
+    """스냅샷 데이터 버전이 바뀌면 마스터에 SIGHUP (워커 교체)"""
+    import registry
+
+    while True:
+        time.sleep(SERVE_RELOAD_INTERVAL)
+        try:
+            version = registry.snapshot_version()
+            if version is None:
+                registry.refresh_shared()  # 스냅샷이 만료되면 마스터 한 곳에서만 다시 받음
+        except Exception as e:
+            server.log.warning(f"Snapshot check failed: {str(e)}")
+            continue
+        if version is not None and version != loaded:
+            server.log.info(f"Snapshot changed ({loaded} -> {version}): reloading workers")
+            loaded = version
+            os.kill(server.pid, signal.SIGHUP)
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    loaded = load_shared_data(server.log)
+    if SERVE_RELOAD_INTERVAL > 0:
+        threading.Thread(target=watch_snapshot, args=(server, loaded), name='snapshot-watch', daemon=True).start()
+
+
+def on_reload(server):
+    # 새 워커를 fork하기 전에 마스터의 데이터를 새 스냅샷으로 교체
+    if preload_app:
+        load_shared_data(server.log)
+
+
+def post_fork(server, worker):
+    import registry
+
+    if preload_app:
+        registry.pin()  # 새 스냅샷은 워커 교체로 반영 (워커마다 다시 읽지 않음)
+    prefetch.start_worker()
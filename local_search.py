@@ -0,0 +1,36 @@
+import columnar
+import exam_index
+import metrics
+import search_engine
+import store
+
+# 로컬 검색에만 쓰이고 원본 API로는 보내지 않는 파라미터
+LOCAL_PARAMS = ['searchMode', 'q', 'examTypes', 'examMatch']
+
+
+def query(params):
+    """원본 API를 호출하지 않고 로컬 데이터로 검색 (응답은 원본 API와 같은 형식, 로컬 데이터가 없으면 None)"""
+    return query_with_masks(params)[0]
+
+
+@metrics.timed('local_search')
+def query_with_masks(params):
+    """로컬 검색 결과와 항목별 검진종류 비트마스크: (응답, masks) (params에는 pageNo/numOfRows가 채워져 있어야 함)
+
+    비트마스크는 응답 본문에서 떼어 따로 돌려주므로 응답은 원본 API와 같은 형식을 유지한다.
+
+    - searchMode=fuzzy: 메모리 검색 엔진
+    - examTypes: 검진종류 비트마스크 인덱스
+    - 그 외: 열 단위 스냅샷 -> SQLite 스냅샷 (모두 없거나 만료되면 None을 반환하며 호출측은 원본 API 사용)
+    """
+    if search_engine.is_fuzzy(params):
+        result = search_engine.query(params)
+    elif exam_index.has_exam_filter(params):
+        result = exam_index.query(params)
+    else:
+        result = columnar.query(params)
+        if result is None:
+            result = store.query(params)
+    if result is None:
+        return None, None
+    return result, result['response']['body'].pop('examMasks', None)
@@ -1,10 +1,19 @@
 from flask import Flask, render_template, request, jsonify, send_from_directory
 from flask_cors import CORS
-import requests
 import os
-import json
 import logging
-from datetime import datetime
+
+import cache
+import compression
+import fastjson
+import local_search
+import metrics
+import prefetch
+import registry
+import rollup
+import search_log
+import store
+import upstream
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
@@ -14,13 +23,13 @@ logger = logging.getLogger(__name__)
 API_KEY = os.environ.get('API_KEY')
 BASE_URL = os.environ.get('BASE_URL')
 
+if prefetch.PREFETCH:
+    prefetch.start(BASE_URL, API_KEY)  # 인기 검색을 만료 전에 미리 갱신 (시작 시 상위 검색 미리 받음)
+
 app = Flask(__name__)
 CORS(app)  # CORS 설정 추가
-
-# 데이터 저장 디렉토리 설정 (Vercel은 임시 저장소 사용)
-DATA_DIR = '/tmp/data'
-if not os.path.exists(DATA_DIR):
-    os.makedirs(DATA_DIR)
+metrics.init_flask(app)  # 요청별 Server-Timing 헤더, /metrics
+compression.init_flask(app)  # Accept-Encoding에 맞춰 응답 압축 (gzip, br)
 
 # 앱 설정 확인
 logger.debug(f"Static folder: {app.static_folder}")
@@ -39,73 +48,90 @@ def home():
         logger.error(f"Error rendering template: {e}")
         return str(e), 500
 
+def parse_search_params(args):
+    """URL 파라미터에서 검색 조건을 가져옴 (args는 request.args 등 dict 형태)"""
+    def int_param(key, default):
+        try:
+            return int(args.get(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    search_params = {
+        'pageNo': int_param('pageNo', 1),
+        'numOfRows': int_param('numOfRows', 10)
+    }
+    for key in ['hmcNm', 'siDoCd', 'siGunGuCd', 'locAddr', 'hmcRdatCd', 'hchType',
+                'searchMode', 'q', 'examTypes', 'examMatch']:
+        search_params[key] = args.get(key, '')
+    return search_params
+
+def build_api_params(search_params):
+    """API 호출을 위한 파라미터 설정"""
+    params = {
+        'serviceKey': API_KEY,
+        'numOfRows': str(search_params['numOfRows']),
+        'pageNo': str(search_params['pageNo']),
+        '_type': 'json'
+    }
+    
+    # 선택적 파라미터 추가
+    for key, value in search_params.items():
+        if value and key not in ['pageNo', 'numOfRows'] + local_search.LOCAL_PARAMS:
+            params[key] = value
+    return params
+
+@metrics.timed('format')
+def search_result(search_params, result):
+    """API 응답을 검색 결과로 변환: (응답 본문, 상태 코드)"""
+    if result['response']['header']['resultCode'] == '00':
+        # 검색 결과 저장 (백그라운드에서 모아서 기록)
+        search_log.record(search_params, result)
+
+        return {
+            'status': 'success',
+            'search_params': search_params,
+            'data': result
+        }, 200
+    else:
+        return {
+            'status': 'error',
+            'message': result['response']['header']['resultMsg'],
+            'search_params': search_params
+        }, 500
+
+def api_error(search_params, status_code):
+    return {
+        'status': 'error',
+        'message': f"API Error: {status_code}",
+        'search_params': search_params
+    }, 500
+
 @app.route('/api/hospitals/search', methods=['GET'])
 def search_hospitals():
     """검진기관 검색 API (GPTs 용)"""
     try:
-        # URL 파라미터에서 검색 조건을 가져옴
-        search_params = {
-            'pageNo': request.args.get('pageNo', 1, type=int),
-            'numOfRows': request.args.get('numOfRows', 10, type=int),
-            'hmcNm': request.args.get('hmcNm', ''),
-            'siDoCd': request.args.get('siDoCd', ''),
-            'siGunGuCd': request.args.get('siGunGuCd', ''),
-            'locAddr': request.args.get('locAddr', ''),
-            'hmcRdatCd': request.args.get('hmcRdatCd', ''),
-            'hchType': request.args.get('hchType', '')
-        }
-        
-        # API 호출을 위한 파라미터 설정
-        params = {
-            'serviceKey': API_KEY,
-            'numOfRows': str(search_params['numOfRows']),
-            'pageNo': str(search_params['pageNo']),
-            '_type': 'json'
-        }
-        
-        # 선택적 파라미터 추가
-        for key, value in search_params.items():
-            if value and key not in ['pageNo', 'numOfRows']:
-                params[key] = value
-
-        # API 호출
-        response = requests.get(BASE_URL, params=params)
-        logger.info(f"API Response Status: {response.status_code}")
-        
-        if response.status_code == 200:
-            result = response.json()
-            if result['response']['header']['resultCode'] == '00':
-                # 검색 결과 저장
-                save_data = {
-                    'timestamp': datetime.now().isoformat(),
-                    'search_params': search_params,
-                    'data': result
-                }
-                
-                # Vercel의 임시 저장소에 저장
-                filename = f'hospital_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-                filepath = os.path.join(DATA_DIR, filename)
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(save_data, f, ensure_ascii=False, indent=2)
-                
-                return jsonify({
-                    'status': 'success',
-                    'search_params': search_params,
-                    'data': result
-                })
-            else:
-                return jsonify({
-                    'status': 'error',
-                    'message': result['response']['header']['resultMsg'],
-                    'search_params': search_params
-                }), 500
-        else:
-            return jsonify({
-                'status': 'error',
-                'message': f"API Error: {response.status_code}",
-                'search_params': search_params
-            }), 500
+        search_params = parse_search_params(request.args)
+        params = build_api_params(search_params)
+
+        # 로컬 데이터(검색 엔진, 검진종류 인덱스, 스냅샷)로 먼저 조회하고, 불가능한 경우에만 API 호출
+        result = local_search.query(search_params)
+        if result is None:
+            response = cache.cached_get(BASE_URL, params=params)
+            logger.info(f"API Response Status: {response.status_code}")
+
+            if response.status_code != 200:
+                body, status = api_error(search_params, response.status_code)
+                return jsonify(body), status
+
+            with metrics.span('parse'):
+                result = fastjson.load_response(response)
+
+        body, status = search_result(search_params, result)
+        with metrics.span('serialize'):
+            return app.response_class(fastjson.dumps(body), status=status, mimetype='application/json')
             
+    except registry.NotReady as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503
     except Exception as e:
         logger.error(f"Error in search_hospitals: {str(e)}")
         return jsonify({
@@ -113,6 +139,81 @@ def search_hospitals():
             'message': str(e)
         }), 500
 
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """응답 캐시 히트/미스/합침 카운터와 원본 API 호출 통계"""
+    return jsonify({'status': 'success', 'cache': cache.stats(), 'upstream': upstream.stats(),
+                    'prefetch': prefetch.stats()})
+
+@app.route('/api/hospitals/export', methods=['GET'])
+def export_searches():
+    """저장된 검색 결과 조회 API (최신순)"""
+    try:
+        try:
+            since, until, limit, offset = search_log.export_params(request.args)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        filters = {key: request.args.get(key, '') for key in search_log.PARAM_COLUMNS}
+        total_count, searches = search_log.search_log.query(
+            filters=filters,
+            since=since,
+            until=until,
+            limit=limit,
+            offset=offset,
+            include_data=request.args.get('include_data', '') in ['1', 'true']
+        )
+        return jsonify({
+            'status': 'success',
+            'total_count': total_count,
+            'searches': searches
+        })
+    except Exception as e:
+        logger.error(f"Error in export_searches: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/hospitals/changes', methods=['GET'])
+def hospital_changes():
+    """스냅샷 변경 내역 조회 API (cursor 또는 since 이후, 기록된 순서)"""
+    try:
+        try:
+            since, cursor, limit, offset = store.change_params(request.args)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        cursor, total_count, changes = store.changes(since=since, cursor=cursor, limit=limit, offset=offset)
+        return jsonify({
+            'status': 'success',
+            'cursor': cursor,
+            'total_count': total_count,
+            'has_more': offset + len(changes) < total_count,
+            'changes': changes
+        })
+    except Exception as e:
+        logger.error(f"Error in hospital_changes: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/hospitals/stats', methods=['GET'])
+def hospital_stats():
+    """집계 통계 조회 API (스냅샷의 미리 계산한 집계만 사용, 원본 API를 호출하지 않음)"""
+    try:
+        result = rollup.query(request.args.to_dict())
+        if result is None:
+            return jsonify({'status': 'error', 'message': 'No snapshot available for stats'}), 503
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in hospital_stats: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 @app.route('/api/hospitals', methods=['GET'])
 def get_hospitals():
     """검진기관 정보 조회 API 엔드포인트 (웹 UI용)"""
@@ -0,0 +1,314 @@
+import contextvars
+import functools
+import heapq
+import inspect
+import io
+import itertools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# 성능 측정 설정
+METRICS_SLOWEST = int(os.environ.get('METRICS_SLOWEST', '20'))  # 보관할 가장 느린 요청 수 (0이면 보관 안 함)
+METRICS_PROFILE_RATE = float(os.environ.get('METRICS_PROFILE_RATE', '0'))  # cProfile로 측정할 요청 비율 (0~1)
+METRICS_PROFILE_LINES = int(os.environ.get('METRICS_PROFILE_LINES', '25'))  # 요청별로 남길 프로파일 함수 수
+
+# 지연 히스토그램 구간 (초)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PREFIX = 'hospital'
+
+
+class Histogram:
+    """라벨별 누적 구간 카운트 (Prometheus histogram)"""
+
+    def __init__(self, name, help_text, label_names, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}  # 라벨 값 -> [구간별 카운트..., 합계, 개수]
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                base = _labels(self.label_names, labels)
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="+Inf"}} {series[-1]}')
+                lines.append(f'{self.name}_sum{{{base}}} {series[-2]:.6f}')
+                lines.append(f'{self.name}_count{{{base}}} {series[-1]}')
+        return lines
+
+
+class Counter:
+    """라벨별 누적 카운터 (Prometheus counter)"""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{{{_labels(self.label_names, labels)}}} {value}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+request_duration = Histogram(f'{PREFIX}_request_duration_seconds', '요청 처리 시간', ('route',))
+phase_duration = Histogram(f'{PREFIX}_phase_duration_seconds', '처리 단계별 소요 시간', ('phase',))
+requests_total = Counter(f'{PREFIX}_requests_total', '처리한 요청 수', ('route', 'status'))
+response_bytes = Counter(f'{PREFIX}_response_bytes_total', '응답 본문 바이트 수', ('route',))
+
+# 다른 모듈의 통계 dict를 /metrics에 함께 노출 (이름 -> stats 함수)
+_collectors = {}
+
+
+def register_collector(name, stats, label='key'):
+    """stats()가 돌려주는 숫자 값을 hospital_<name>_<key>로 노출 (dict 값은 label 라벨로 펼침)"""
+    _collectors[name] = (stats, label)
+
+
+class RequestTimer:
+    """요청 하나의 단계별 소요 시간"""
+
+    def __init__(self, route):
+        self.route = route
+        self.started = time.perf_counter()
+        self.spans = []  # (단계, 초)
+        self.profiler = None
+        self.duration = None
+        self.status = 500
+        self.bytes_out = 0
+
+    def totals(self):
+        """단계별 합계 (같은 단계가 여러 번이면 합침, 처음 나온 순서 유지)"""
+        totals = {}
+        for name, seconds in self.spans:
+            totals[name] = totals.get(name, 0) + seconds
+        return totals
+
+
+_current = contextvars.ContextVar('metrics_request', default=None)
+
+# 가장 느린 요청 (duration, 순번, 항목) 최소 힙
+_slowest = []
+_slowest_lock = threading.Lock()
+_sequence = itertools.count()
+
+# cProfile은 한 번에 하나만 켤 수 있으므로 측정 중인 요청이 있으면 건너뜀
+_profile_lock = threading.Lock()
+
+
+def begin(route, profile=True):
+    """요청 측정 시작: (timer, token). 끝나면 end(timer, token, ...) 호출"""
+    timer = RequestTimer(route)
+    if profile and METRICS_PROFILE_RATE and random.random() < METRICS_PROFILE_RATE \
+            and _profile_lock.acquire(blocking=False):
+        import cProfile
+
+        timer.profiler = cProfile.Profile()
+        timer.profiler.enable()
+    return timer, _current.set(timer)
+
+
+def end(timer, token, status, bytes_out=0):
+    """요청 측정 종료: 히스토그램/카운터 반영, 느린 요청 보관"""
+    _current.reset(token)
+    profile = None
+    if timer.profiler is not None:
+        timer.profiler.disable()
+        _profile_lock.release()
+        profile = _profile_text(timer.profiler)
+
+    timer.duration = time.perf_counter() - timer.started
+    request_duration.observe(timer.duration, timer.route)
+    requests_total.inc(1, timer.route, str(status))
+    response_bytes.inc(bytes_out or 0, timer.route)
+    _keep_if_slow(timer, status, profile)
+
+
+@contextmanager
+def request(route, profile=True):
+    """요청 측정 범위 (상태 코드와 응답 크기는 yield된 timer에 status/bytes_out으로 기록)"""
+    timer, token = begin(route, profile)
+    try:
+        yield timer
+    finally:
+        end(timer, token, timer.status, timer.bytes_out)
+
+
+@contextmanager
+def span(name):
+    """단계 소요 시간 측정 (요청 안이면 Server-Timing에도 포함)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        phase_duration.observe(elapsed, name)
+        timer = _current.get()
+        if timer is not None:
+            timer.spans.append((name, elapsed))
+
+
+def timed(name):
+    """함수 전체를 span(name)으로 측정하는 데코레이터 (async 함수도 가능)"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing(timer=None):
+    """Server-Timing 헤더 값 (예: upstream;dur=12.3, format;dur=0.4, total;dur=13.1)"""
+    timer = timer or _current.get()
+    if timer is None:
+        return None
+    parts = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in timer.totals().items()]
+    # 헤더는 본문 전송 전에 만들므로 그 시점까지의 시간을 total로 사용
+    parts.append(f'total;dur={(time.perf_counter() - timer.started) * 1000:.1f}')
+    return ', '.join(parts)
+
+
+def _profile_text(profiler):
+    import pstats
+
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(METRICS_PROFILE_LINES)
+    return out.getvalue()
+
+
+def _keep_if_slow(timer, status, profile):
+    if METRICS_SLOWEST <= 0:
+        return
+    with _slowest_lock:
+        if len(_slowest) >= METRICS_SLOWEST and timer.duration <= _slowest[0][0]:
+            return
+        entry = {
+            'route': timer.route,
+            'status': status,
+            'at': time.time(),
+            'duration_ms': round(timer.duration * 1000, 2),
+            'spans': {name: round(seconds * 1000, 2) for name, seconds in timer.totals().items()},
+            'profile': profile
+        }
+        item = (timer.duration, next(_sequence), entry)
+        if len(_slowest) >= METRICS_SLOWEST:
+            heapq.heapreplace(_slowest, item)
+        else:
+            heapq.heappush(_slowest, item)
+
+
+def slowest():
+    """보관된 가장 느린 요청 목록 (느린 순)"""
+    with _slowest_lock:
+        return [entry for _, _, entry in sorted(_slowest, reverse=True)]
+
+
+def _collected_lines():
+    lines = []
+    for name, (stats, label_name) in sorted(_collectors.items()):
+        try:
+            values = stats()
+        except Exception as e:
+            print(f"Error collecting {name} metrics: {str(e)}")
+            continue
+        for key, value in values.items():
+            metric = f'{PREFIX}_{name}_{key}'
+            if isinstance(value, bool) or not isinstance(value, (int, float, dict)):
+                continue
+            lines.append(f'# TYPE {metric} untyped')
+            if isinstance(value, dict):
+                for label, count in sorted(value.items()):
+                    lines.append(f'{metric}{{{_labels((label_name,), (label,))}}} {count}')
+            else:
+                lines.append(f'{metric} {value}')
+    return lines
+
+
+def render():
+    """Prometheus 텍스트 형식 (text/plain; version=0.0.4)"""
+    lines = []
+    for metric in (requests_total, request_duration, phase_duration, response_bytes):
+        lines.extend(metric.render())
+    lines.extend(_collected_lines())
+    return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def init_flask(app):
+    """Flask 앱에 요청 측정, Server-Timing 헤더, /metrics, /api/metrics/slowest 추가"""
+    from flask import Response, g, jsonify, request as flask_request
+
+    @app.before_request
+    def _begin_request():
+        rule = flask_request.url_rule
+        g._metrics = begin(rule.rule if rule is not None else 'other')
+
+    @app.after_request
+    def _end_request(response):
+        state = g.pop('_metrics', None)
+        if state is not None:
+            timer, token = state
+            response.headers['Server-Timing'] = server_timing(timer)
+            end(timer, token, response.status_code, response.content_length or 0)
+        return response
+
+    @app.teardown_request
+    def _teardown_request(error=None):
+        # 예외로 after_request가 실행되지 않은 경우
+        state = g.pop('_metrics', None)
+        if state is not None:
+            end(state[0], state[1], 500)
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(render(), content_type=CONTENT_TYPE)
+
+    @app.route('/api/metrics/slowest')
+    def slowest_requests():
+        return jsonify({'status': 'success', 'requests': slowest()})
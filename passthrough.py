@@ -0,0 +1,24 @@
+import os
+
+import fastjson
+import upstream
+
+# 웹 UI 검색 응답 설정: 원본 API 응답 본문을 다시 파싱하지 않고 그대로 data에 넣음
+WEB_PASSTHROUGH = os.environ.get('WEB_PASSTHROUGH', '1') != '0'  # 0이면 사용 안 함
+
+
+def web_body(api_params, response):
+    """{'status', 'request_params', 'data'} 응답 본문(bytes)을 원본 응답 본문을 끼워 넣어 생성
+
+    원본 본문은 resultCode만 찾아 JSON 응답인지 확인한다 (전체 파싱/직렬화를 하지 않음).
+    사용하지 않도록 설정했거나 HTTP 200이 아니거나 JSON 응답이 아니면 None을 반환하며,
+    호출측은 기존처럼 파싱한 뒤 응답을 만든다.
+    """
+    if not WEB_PASSTHROUGH or response.status_code != 200:
+        return None
+    content = response.content.strip()
+    if not (content.startswith(b'{') and content.endswith(b'}')) or upstream.result_code(content) is None:
+        return None
+    return b''.join([
+        b'{"status":"success","request_params":', fastjson.dumps(api_params), b',"data":', content, b'}'
+    ])
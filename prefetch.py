@@ -0,0 +1,292 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import cache
+import metrics
+import store
+import upstream
+
+# 인기 검색 미리 갱신 설정
+PREFETCH = os.environ.get('PREFETCH', '0') != '0'  # 1이면 Flask/ASGI 앱에서 스케줄러 시작
+PREFETCH_BUDGET = int(os.environ.get('PREFETCH_BUDGET', '60'))  # 미리 갱신에 쓰는 분당 원본 API 호출 수
+PREFETCH_TOP_K = int(os.environ.get('PREFETCH_TOP_K', '50'))  # 미리 갱신하는 인기 검색 수
+PREFETCH_INTERVAL = float(os.environ.get('PREFETCH_INTERVAL', '5'))  # 확인 주기(초)
+# 만료까지 이 시간(초)보다 적게 남으면 갱신 (기본: 캐시 TTL의 20%)
+PREFETCH_LEAD = float(os.environ.get('PREFETCH_LEAD', str(max(cache.CACHE_TTL * 0.2, 2 * PREFETCH_INTERVAL))))
+PREFETCH_HALF_LIFE = float(os.environ.get('PREFETCH_HALF_LIFE', '600'))  # 요청 수 가중치가 절반이 되는 시간(초)
+PREFETCH_TRACK_MAX = int(os.environ.get('PREFETCH_TRACK_MAX', '1000'))  # 추적하는 검색 조건 수
+PREFETCH_STATE = os.environ.get('PREFETCH_STATE', os.path.join(store.DATA_DIR, 'prefetch.json'))
+# 여러 워커 프로세스 중 잠금을 얻은 한 곳에서만 갱신 (잠금 파일 경로, 비어 있으면 잠금 없이 실행)
+PREFETCH_LOCK = os.environ.get('PREFETCH_LOCK', '')
+
+# 인기 검색 기록이 없을 때 시작 시 미리 받을 검색 (웹 UI 시도 선택 목록, 첫 페이지 10건)
+SEED_SIDO = ['', '11', '26', '27', '28', '29', '30', '31', '36', '41', '42', '43', '44', '45', '46', '47', '48', '50']
+SEED_PARAMS = [
+    {'numOfRows': '10', 'pageNo': '1', '_type': 'json', **({'siDoCd': code} if code else {})}
+    for code in SEED_SIDO
+]
+
+
+class Popularity:
+    """검색 조건별 요청 수 (시간이 지나면 PREFETCH_HALF_LIFE마다 절반으로 줄어드는 가중치)"""
+
+    def __init__(self, half_life=PREFETCH_HALF_LIFE, max_keys=PREFETCH_TRACK_MAX):
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self._scores = {}  # 캐시 키 -> (점수, 마지막 갱신 시각)
+        self._lock = threading.Lock()
+
+    def _decayed(self, score, updated, now):
+        return score * 0.5 ** ((now - updated) / self.half_life)
+
+    def observe(self, key, weight=1.0):
+        now = time.monotonic()
+        with self._lock:
+            score, updated = self._scores.get(key, (0.0, now))
+            self._scores[key] = (self._decayed(score, updated, now) + weight, now)
+            if len(self._scores) > self.max_keys:
+                # 점수가 낮은 10%를 한 번에 정리
+                ranked = sorted(self._scores, key=lambda k: self._decayed(*self._scores[k], now))
+                for old in ranked[:max(len(ranked) // 10, 1)]:
+                    del self._scores[old]
+
+    def top(self, k):
+        """점수가 높은 순서의 [(캐시 키, 점수), ...]"""
+        now = time.monotonic()
+        with self._lock:
+            scored = [(key, self._decayed(score, updated, now)) for key, (score, updated) in self._scores.items()]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:k]
+
+    def __len__(self):
+        return len(self._scores)
+
+
+class Prefetcher:
+    """인기 검색의 캐시 응답을 만료 전에 다시 받아 두는 백그라운드 스케줄러
+
+    - 원본 API를 거치는 요청(cache.cached_get)마다 검색 조건의 인기를 기록한다.
+    - PREFETCH_INTERVAL마다 상위 top_k개 중 만료가 PREFETCH_LEAD 안으로 다가왔거나 이미 만료된 것을
+      인기 순서대로 다시 받아 캐시에 넣는다.
+    - 미리 갱신에 쓰는 원본 API 호출은 최근 1분 동안 budget회를 넘지 않는다.
+      갱신은 재시도 없이 한 번만 시도하므로 예산 한 번이 원본 API 호출 한 번이다 (실패하면 다음 주기에 다시 시도).
+    - 시작할 때 저장해 둔 인기 검색(없으면 SEED_PARAMS) 상위 top_k개를 먼저 받아 둔다.
+    - lock_path가 있으면 잠금을 얻을 때까지 기다렸다가 시작한다 (워커가 여럿이어도 갱신은 한 곳에서만).
+    """
+
+    def __init__(self, base_url, service_key, budget=PREFETCH_BUDGET, top_k=PREFETCH_TOP_K,
+                 interval=PREFETCH_INTERVAL, lead=PREFETCH_LEAD, state_path=PREFETCH_STATE,
+                 lock_path=PREFETCH_LOCK):
+        self.base_url = base_url
+        self.service_key = service_key
+        self.budget = budget
+        self.top_k = top_k
+        self.interval = interval
+        self.lead = lead
+        self.state_path = state_path
+        self.lock_path = lock_path
+        self._lock_file = None
+        self.popularity = Popularity()
+        self._calls = deque()  # 최근 1분 동안의 미리 갱신 호출 시각
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.warmed = 0
+        self.refreshed = 0
+        self.failed = 0
+        self.skipped_budget = 0
+        self.upstream_calls = 0
+
+    def observe(self, key, url, params):
+        """cache 모듈의 요청 관찰 함수 (이 스케줄러가 담당하는 원본 API 주소만 기록)"""
+        if url == self.base_url:
+            self.popularity.observe(key[1:])
+
+    def _count(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def _take_budget(self):
+        """분당 호출 예산에서 한 번을 사용 (남은 예산이 없으면 False)"""
+        now = time.monotonic()
+        with self._lock:
+            while self._calls and now - self._calls[0] >= 60:
+                self._calls.popleft()
+            if len(self._calls) >= self.budget:
+                return False
+            self._calls.append(now)
+            self.upstream_calls += 1
+            return True
+
+    def refresh(self, params_key):
+        """검색 조건 하나의 원본 응답을 받아 캐시에 저장 (성공하면 True)"""
+        params = dict(params_key, serviceKey=self.service_key)
+        try:
+            # 재시도하면 예산보다 많이 호출하므로 한 번만 시도
+            response = upstream.get(self.base_url, params=params, max_attempts=1)
+        except Exception as e:
+            print(f"Prefetch failed: {str(e)}")
+            self._count('failed')
+            return False
+        if not cache.is_cacheable(response):
+            self._count('failed')
+            return False
+        cache.put((self.base_url,) + params_key, response)
+        return True
+
+    def _due(self, params_key):
+        ttl_left = cache.response_cache.ttl_left((self.base_url,) + params_key)
+        return ttl_left is None or ttl_left < self.lead
+
+    def run_once(self):
+        """인기 검색 중 곧 만료되는 것을 예산 안에서 갱신 (갱신한 수 반환)"""
+        refreshed = 0
+        for params_key, _ in self.popularity.top(self.top_k):
+            if not self._due(params_key):
+                continue
+            if not self._take_budget():
+                self._count('skipped_budget')
+                break
+            if self.refresh(params_key):
+                refreshed += 1
+        self._count('refreshed', refreshed)
+        return refreshed
+
+    def warm(self):
+        """저장해 둔 인기 검색(없으면 SEED_PARAMS) 상위 top_k개를 미리 받아 둠"""
+        keys = self.load_state()
+        if not keys:
+            keys = [cache.normalize_params(params) for params in SEED_PARAMS]
+        for params_key in keys[:self.top_k]:
+            # 시작 직후에도 인기 순서가 유지되도록 약한 가중치로 기록
+            self.popularity.observe(params_key, weight=0.1)
+            if not self._due(params_key):
+                continue
+            if not self._take_budget():
+                self._count('skipped_budget')
+                break
+            if self.refresh(params_key):
+                self._count('warmed')
+        return self.warmed
+
+    def load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return [tuple(tuple(pair) for pair in key) for key in json.load(f)['top']]
+        except (OSError, ValueError, KeyError, TypeError):
+            return []
+
+    def save_state(self):
+        """인기 검색 상위 top_k개를 저장 (다음 시작 때 미리 받을 목록)"""
+        top = [key for key, _ in self.popularity.top(self.top_k)]
+        if not top:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+            tmp_path = f'{self.state_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'saved_at': time.time(), 'top': top}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"Prefetch state save failed: {str(e)}")
+
+    def _lead(self):
+        """갱신을 맡을 수 있으면 True (잠금 파일을 쓰면 잠금을 얻은 프로세스만)"""
+        if not self.lock_path or self._lock_file is not None:
+            return True
+        import fcntl  # 잠금 파일을 쓸 때만 필요 (POSIX)
+
+        f = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._lock_file = f  # 프로세스가 끝나면 잠금이 풀려 다른 워커가 이어받음
+        return True
+
+    def _run(self):
+        while not self._lead():
+            if self._stop.wait(self.interval):
+                return
+        try:
+            self.warm()
+        except Exception as e:
+            print(f"Prefetch warm-up failed: {str(e)}")
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+                self.save_state()
+            except Exception as e:
+                print(f"Prefetch round failed: {str(e)}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='prefetch', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        """미리 갱신 카운터와 현재 캐시 적중률 (적중률은 실제 요청만 셈)"""
+        cache_stats = cache.stats()
+        lookups = cache_stats['hits'] + cache_stats['misses']
+        with self._lock:
+            calls_last_minute = sum(1 for t in self._calls if time.monotonic() - t < 60)
+            counters = {name: getattr(self, name)
+                        for name in ['warmed', 'refreshed', 'failed', 'skipped_budget', 'upstream_calls']}
+        return {
+            'tracked': len(self.popularity),
+            **counters,
+            'calls_last_minute': calls_last_minute,
+            'budget_per_minute': self.budget,
+            'leader': not self.lock_path or self._lock_file is not None,
+            'hit_rate': round(cache_stats['hits'] / lookups, 4) if lookups else 0.0
+        }
+
+
+_prefetcher = None
+_start_lock = threading.Lock()
+_deferred = False  # True면 start()는 스케줄러만 만들고 스레드는 start_worker()에서 시작
+
+
+def start(base_url, service_key, **kwargs):
+    """프로세스에 하나뿐인 스케줄러 시작 (이미 시작했으면 그대로 반환)
+
+    응답 캐시를 쓰지 않거나(CACHE_MAX_BYTES=0) 원본 API 주소가 없으면 시작하지 않는다.
+    """
+    global _prefetcher
+    with _start_lock:
+        if _prefetcher is None and base_url and cache.response_cache.max_bytes > 0:
+            _prefetcher = Prefetcher(base_url, service_key, **kwargs)
+            cache.add_observer(_prefetcher.observe)
+            if not _deferred:
+                _prefetcher.start()
+        return _prefetcher
+
+
+def defer():
+    """앱을 불러오기 전에 호출하면 스레드 시작을 start_worker()까지 미룸 (prefork 서버의 마스터용)"""
+    global _deferred
+    _deferred = True
+
+
+def start_worker():
+    """fork한 워커에서 스케줄러 스레드 시작 (마스터의 스레드는 fork 뒤에 남지 않음)"""
+    if _prefetcher is not None:
+        _prefetcher.start()
+
+
+def stats():
+    return _prefetcher.stats() if _prefetcher is not None else {}
+
+
+metrics.register_collector('prefetch', stats)
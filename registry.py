@@ -0,0 +1,225 @@
+import os
+import threading
+import time
+
+import columnar
+import store
+from fetcher import fetch_all_hospitals
+
+# 메모리에 올린 전체 검진기관 목록
+# 만료되지 않은 스냅샷(SQLite, 없으면 열 단위 스냅샷)이 있으면 스냅샷에서 읽고,
+# 없으면 원본 API에서 백그라운드로 읽어 REGISTRY_MAX_AGE 동안 사용한다 (읽는 동안 목록은 None, 호출측은 원본 API 사용).
+REGISTRY_MAX_AGE = int(os.environ.get('REGISTRY_MAX_AGE', str(store.SNAPSHOT_MAX_AGE)))
+REGISTRY_RETRY_INTERVAL = int(os.environ.get('REGISTRY_RETRY_INTERVAL', '60'))  # 원본 API 읽기 실패 후 재시도 간격(초)
+# 잠금 파일을 지정하면 잠금을 얻은 프로세스 하나만 원본 API에서 읽어 스냅샷 파일로 기록하고,
+# 다른 프로세스(prefork 워커)는 그 스냅샷을 읽는다 (워커마다 전체 목록을 원본 API에서 받지 않음)
+REGISTRY_LOCK = os.environ.get('REGISTRY_LOCK', '')
+
+_lock = threading.Lock()
+# exam_masks: 스냅샷에 저장된 항목별 검진종류 비트마스크 (원본 API에서 읽었거나 이전 형식이면 None)
+_state = {'version': None, 'loaded_at': 0, 'expires_at': 0, 'hospitals': None, 'exam_masks': None,
+          'from_snapshot': False, 'retry_at': 0}
+_derived = {}  # 이름 -> (버전, 값)
+# 스냅샷 확인 결과 (스냅샷 파일이 그대로이고 만료 전이면 SQLite를 다시 열지 않고 사용)
+_fresh = {'key': None, 'snapshot': None}
+_loader = None  # 원본 API에서 읽는 백그라운드 스레드
+# True면 스냅샷이 바뀌어도 이미 올린 목록을 계속 사용 (prefork 워커: 새 스냅샷은 워커 교체로 반영)
+_pinned = False
+
+
+class NotReady(Exception):
+    """전체 목록을 아직 읽는 중 (원본 API로 대신할 수 없는 검색에서 사용)"""
+
+
+def _files_key():
+    """스냅샷 파일들의 (경로, inode, 수정 시각, 크기)와 보관 기간 (스냅샷은 새 파일로 교체되므로 바뀌면 다시 확인)"""
+    key = [store.SNAPSHOT_MAX_AGE, columnar.COLUMNAR_MAX_AGE]
+    for path in (store.SNAPSHOT_DB, columnar.COLUMNAR_SNAPSHOT, columnar.COLUMNAR_BUNDLE):
+        try:
+            stat = os.stat(path) if path else None
+        except OSError:
+            stat = None
+        key.append((path, stat.st_ino, stat.st_mtime_ns, stat.st_size) if stat else (path, None))
+    return tuple(key)
+
+
+def _fresh_snapshot():
+    """만료되지 않은 스냅샷: (데이터 버전, 만료 시각, (전체 목록, 검진종류 비트마스크)를 읽는 함수) (없거나 만료되면 None)
+
+    스냅샷 데이터가 마지막으로 바뀐 시각을 데이터 버전으로 사용하며,
+    SQLite 스냅샷이 없거나 만료되면 배포에 포함된 열 단위 스냅샷을 사용한다.
+    스냅샷 파일이 그대로이면 만료 시각까지 이전 확인 결과를 사용한다 (요청마다 SQLite를 열지 않음).
+    """
+    key = _files_key()
+    cached = _fresh['snapshot']
+    if _fresh['key'] == key and (cached is None or time.time() <= cached[1]):
+        return cached
+    snapshot = _check_snapshot()
+    _fresh.update(key=key, snapshot=snapshot)
+    return snapshot
+
+
+def _check_snapshot():
+    if store.is_fresh():
+        synced_at = store.synced_at()
+        if synced_at is not None:
+            return store.data_version(), synced_at + store.SNAPSHOT_MAX_AGE, store.load_all_with_masks
+    snapshot = columnar.get()
+    if snapshot is not None and snapshot.is_fresh():
+        return snapshot.data_version, snapshot.synced_at + columnar.COLUMNAR_MAX_AGE, snapshot.records_with_masks
+    return None
+
+
+def _refresh_lock():
+    """REGISTRY_LOCK 잠금을 얻으면 잠금 파일, 다른 프로세스가 갖고 있으면 False (잠금 파일을 쓰지 않으면 None)
+
+    fork한 워커에 잠금이 넘어가지 않도록 flock이 아닌 lockf(프로세스 단위 잠금)를 사용한다.
+    """
+    if not REGISTRY_LOCK:
+        return None
+    import fcntl  # 잠금 파일을 쓸 때만 필요 (POSIX)
+
+    f = open(REGISTRY_LOCK, 'a')
+    try:
+        fcntl.lockf(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    return f
+
+
+def _load_from_api():
+    """원본 API에서 전체 목록을 읽음 (백그라운드 스레드, 요청은 기다리지 않음)
+
+    REGISTRY_LOCK을 쓰면 읽은 목록을 스냅샷 파일로 기록해 다른 프로세스와 함께 쓴다.
+    """
+    lock = _refresh_lock()
+    if lock is False:
+        # 다른 프로세스가 읽는 중: 그 프로세스가 기록한 스냅샷을 다음 조회 때 읽음
+        with _lock:
+            _state['retry_at'] = time.time() + REGISTRY_RETRY_INTERVAL
+        return
+    try:
+        if lock is not None and _fresh_snapshot() is not None:
+            return  # 잠금을 기다리는 동안 다른 프로세스가 스냅샷을 기록함
+        try:
+            hospitals, report = fetch_all_hospitals(os.environ.get('BASE_URL'), os.environ.get('API_KEY'))
+            if lock is not None:
+                store.write_snapshot(hospitals)
+        except Exception as e:
+            print(f"Registry load from API failed: {str(e)}")
+            with _lock:
+                _state['retry_at'] = time.time() + REGISTRY_RETRY_INTERVAL
+            return
+    finally:
+        if lock:
+            lock.close()
+    print(f"Registry loaded from API: {report['fetched']} hospitals")
+    now = time.time()
+    snapshot = _fresh_snapshot() if lock is not None else None
+    with _lock:
+        if _state['from_snapshot'] and _state['hospitals'] is not None:
+            return  # 읽는 동안 스냅샷이 생겨 이미 교체됨
+        if snapshot is not None:
+            # 방금 기록한 스냅샷의 버전으로 올려 다시 읽지 않음
+            _state.update(version=snapshot[0], loaded_at=now, expires_at=snapshot[1],
+                          hospitals=hospitals, exam_masks=None, from_snapshot=True)
+        else:
+            _state.update(version=f'api-{now}', loaded_at=now, expires_at=now + REGISTRY_MAX_AGE,
+                          hospitals=hospitals, exam_masks=None, from_snapshot=False)
+
+
+def _start_api_load():
+    global _loader
+    if _loader is not None and _loader.is_alive():
+        return
+    if time.time() < _state['retry_at']:
+        return
+    _loader = threading.Thread(target=_load_from_api, name='registry-load', daemon=True)
+    _loader.start()
+
+
+def _is_stale():
+    if _state['hospitals'] is None:
+        return True
+    if time.time() > _state['expires_at']:
+        return True
+    if _pinned and _state['from_snapshot']:
+        return False
+    snapshot = _fresh_snapshot()
+    if snapshot is not None:
+        return snapshot[0] != _state['version']
+    return _state['from_snapshot']
+
+
+def _get():
+    with _lock:
+        if _is_stale():
+            snapshot = _fresh_snapshot()
+            hospitals, exam_masks = snapshot[2]() if snapshot is not None else (None, None)
+            if hospitals is not None:
+                _state.update(version=snapshot[0], loaded_at=time.time(), expires_at=snapshot[1],
+                              hospitals=hospitals, exam_masks=exam_masks, from_snapshot=True)
+            else:
+                # 만료된 목록은 쓰지 않고, 원본 API에서 읽는 동안 호출측은 원본 API를 사용
+                _state.update(version=None, hospitals=None, exam_masks=None, from_snapshot=False)
+                _start_api_load()
+        return _state['version'], _state['hospitals'], _state['exam_masks']
+
+
+def get_hospitals():
+    """전체 검진기관 목록 (스냅샷이 바뀌었거나 만료되면 다시 읽음, 아직 준비되지 않았으면 None)"""
+    return _get()[1]
+
+
+def version():
+    """현재 메모리에 올라온 데이터 버전 (준비되지 않았으면 None)"""
+    return _get()[0]
+
+
+def snapshot_version():
+    """만료되지 않은 스냅샷의 데이터 버전 (없거나 만료되면 None, 메모리 목록은 읽지 않음)"""
+    snapshot = _fresh_snapshot()
+    return snapshot[0] if snapshot is not None else None
+
+
+def refresh_shared():
+    """스냅샷이 없거나 만료됐으면 백그라운드에서 원본 API로 읽어 스냅샷 파일을 기록 (gunicorn 마스터에서 호출)"""
+    if _fresh_snapshot() is None:
+        with _lock:
+            _start_api_load()
+
+
+def pin():
+    """이 프로세스에서는 스냅샷에서 올린 목록을 다시 읽지 않음 (fork한 워커에서 호출)"""
+    global _pinned
+    _pinned = True
+
+
+def snapshot():
+    """현재 데이터: (버전, 전체 목록, 저장된 검진종류 비트마스크) (준비되지 않았으면 목록은 None)
+
+    여러 파생 데이터를 같은 버전으로 맞춰 쓸 때 derived(..., snapshot=)로 넘긴다.
+    """
+    return _get()
+
+
+def derived(name, build, with_exam_masks=False, snapshot=None):
+    """전체 목록으로 만든 파생 데이터(인덱스 등)를 데이터 버전별로 한 번만 생성 (목록이 준비되지 않았으면 None)
+
+    with_exam_masks면 build(목록, 저장된 검진종류 비트마스크 또는 None)로 호출한다.
+    snapshot(snapshot()의 반환값)을 주면 그 버전의 데이터로 만든다.
+    """
+    current, hospitals, exam_masks = snapshot if snapshot is not None else _get()
+    if hospitals is None:
+        return None
+    with _lock:
+        entry = _derived.get(name)
+        if entry is not None and entry[0] == current:
+            return entry[1]
+    value = build(hospitals, exam_masks) if with_exam_masks else build(hospitals)
+    with _lock:
+        # 그 사이 데이터가 교체됐으면 이전 버전으로 만든 값은 이번 호출에만 사용
+        if current == _state['version']:
+            _derived[name] = (current, value)
+    return value
@@ -0,0 +1,227 @@
+import json
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import closing
+
+import columnar
+import exam_index
+import store
+
+# 집계 통계 (/api/hospitals/stats)
+# 스냅샷에 (시도, 시군구, 기관종별, 검진종류 비트마스크, 평가등급)별 기관 수를 미리 저장해 두고,
+# 조회할 때는 이 집계 행(수천 개)만 다시 묶는다. 레코드는 다시 읽지 않는다.
+
+DIMENSIONS = ['siDoCd', 'siGunGuCd', 'ykindnm', 'hmcRdatCd']
+EXAM_DIMENSION = 'examType'  # 검진종류별로 묶기 (한 기관이 가능한 검진종류마다 한 번씩 셈)
+GROUP_BY = DIMENSIONS + [EXAM_DIMENSION]
+CELL_FIELDS = ['siDoCd', 'siGunGuCd', 'ykindnm', 'examMask', 'hmcRdatCd']  # 집계 행 순서 (마지막은 count)
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    siDoCd TEXT NOT NULL,
+    siGunGuCd TEXT NOT NULL,
+    ykindnm TEXT NOT NULL,
+    examMask INTEGER NOT NULL,
+    hmcRdatCd TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (siDoCd, siGunGuCd, ykindnm, examMask, hmcRdatCd)
+) WITHOUT ROWID;
+"""
+
+
+def cell_key(hospital):
+    """병원이 속한 집계 행 키 (필드가 없으면 빈 문자열)"""
+    return (
+        hospital.get('siDoCd') or '',
+        hospital.get('siGunGuCd') or '',
+        hospital.get('ykindnm') or '',
+        exam_index.exam_mask(hospital),
+        hospital.get('hmcRdatCd') or ''
+    )
+
+
+def cells(hospitals):
+    """전체 목록의 집계 행: [(siDoCd, siGunGuCd, ykindnm, examMask, hmcRdatCd, count), ...]"""
+    counts = Counter(cell_key(hospital) for hospital in hospitals)
+    return [key + (count,) for key, count in sorted(counts.items())]
+
+
+def build(conn, hospitals):
+    """스냅샷을 새로 만들 때 집계 테이블 생성 (호출측이 커밋)"""
+    conn.executescript(ROLLUP_SCHEMA)
+    conn.execute('DELETE FROM rollups')
+    conn.executemany('INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?)', cells(hospitals))
+
+
+def ensure_schema(conn):
+    """집계 테이블 생성 (이전 버전 스냅샷이면 레코드에서 한 번 채움)"""
+    conn.executescript(ROLLUP_SCHEMA)
+    if conn.execute('SELECT 1 FROM rollups LIMIT 1').fetchone() is None:
+        hospitals = [json.loads(data) for data, in conn.execute('SELECT data FROM hospitals')]
+        conn.executemany('INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?)', cells(hospitals))
+        conn.commit()
+
+
+def _add(conn, key, delta):
+    conn.execute(
+        'INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?) '
+        'ON CONFLICT (siDoCd, siGunGuCd, ykindnm, examMask, hmcRdatCd) DO UPDATE SET count = count + excluded.count',
+        key + (delta,)
+    )
+    if delta < 0:
+        conn.execute(
+            'DELETE FROM rollups WHERE siDoCd = ? AND siGunGuCd = ? AND ykindnm = ? AND examMask = ? '
+            'AND hmcRdatCd = ? AND count <= 0', key
+        )
+
+
+def apply(conn, old, new):
+    """레코드 하나가 old에서 new로 바뀐 만큼 집계 반영 (추가면 old, 삭제면 new가 None)
+
+    증분 동기화의 레코드 반영과 같은 트랜잭션에서 호출한다.
+    """
+    old_key = cell_key(old) if old is not None else None
+    new_key = cell_key(new) if new is not None else None
+    if old_key == new_key:
+        return
+    if old_key is not None:
+        _add(conn, old_key, -1)
+    if new_key is not None:
+        _add(conn, new_key, 1)
+
+
+_lock = threading.Lock()
+_state = {'key': None, 'index': None}
+
+
+def _load_store_cells(path):
+    try:
+        with closing(store.connect(path)) as conn:
+            return [tuple(row) for row in conn.execute('SELECT * FROM rollups')]
+    except sqlite3.Error:
+        return None  # 집계 테이블이 없는 이전 버전 스냅샷
+
+
+def get_index():
+    """현재 데이터 버전의 집계 인덱스: (데이터 버전, RollupIndex) (스냅샷이 없으면 (None, None))
+
+    SQLite 스냅샷이 있으면 그 집계 테이블을, 없으면 열 단위 스냅샷 헤더의 집계 행을 사용한다.
+    데이터 버전이 바뀔 때만 다시 읽는다.
+    """
+    version = store.data_version()
+    snapshot = None
+    if version is None:
+        snapshot = columnar.get()
+        if snapshot is None or snapshot.rollups is None:
+            return None, None
+        version = snapshot.data_version
+
+    key = ('store' if snapshot is None else snapshot.path, version)
+    with _lock:
+        if _state['key'] != key:
+            if snapshot is None:
+                loaded = _load_store_cells(store.SNAPSHOT_DB)
+            else:
+                loaded = [tuple(cell) for cell in snapshot.rollups]
+            if loaded is None:
+                return version, None
+            _state.update(key=key, index=RollupIndex(loaded))
+        return version, _state['index']
+
+
+def parse(params):
+    """집계 조회 파라미터: (groupBy 목록, 조건 dict, all_of, any_of) (잘못된 값이면 ValueError)"""
+    group_by = [name.strip() for name in (params.get('groupBy') or 'siDoCd').split(',') if name.strip()]
+    unknown = [name for name in group_by if name not in GROUP_BY]
+    if unknown:
+        raise ValueError(f"Unknown groupBy: {', '.join(unknown)} (allowed: {', '.join(GROUP_BY)})")
+    filters = {key: params[key] for key in DIMENSIONS if params.get(key)}
+    all_of, any_of = exam_index.match_mask(params)
+    return list(dict.fromkeys(group_by)), filters, all_of, any_of
+
+
+class RollupIndex:
+    """집계 행을 NumPy 배열로 보관 (기준 값은 정렬된 값 목록의 번호로 저장)"""
+
+    def __init__(self, cells):
+        import numpy as np  # 집계를 처음 조회할 때 불러옴 (콜드 스타트 단축)
+
+        self.vocab = {}
+        self.lookup = {}  # 기준 값 -> 번호
+        self.codes = {}
+        for i, name in enumerate(CELL_FIELDS):
+            if name == 'examMask':
+                continue
+            values = sorted({cell[i] for cell in cells})
+            index = {value: code for code, value in enumerate(values)}
+            self.vocab[name] = values
+            self.lookup[name] = index
+            self.codes[name] = np.fromiter((index[cell[i]] for cell in cells), dtype=np.int64, count=len(cells))
+        self.masks = np.fromiter((cell[3] for cell in cells), dtype=np.int64, count=len(cells))
+        self.counts = np.fromiter((cell[5] for cell in cells), dtype=np.int64, count=len(cells))
+
+    def aggregate(self, group_by, filters=None, all_of=0, any_of=0):
+        """조건으로 거른 뒤 group_by 기준으로 묶음: (전체 기관 수, [{...기준 값, 'count'}, ...])
+
+        examType으로 묶으면 한 기관이 가능한 검진종류마다 한 번씩 센다.
+        """
+        import numpy as np
+
+        selected = np.ones(len(self.counts), dtype=bool)
+        for key, value in (filters or {}).items():
+            code = self.lookup[key].get(value)
+            if code is None:
+                return 0, []
+            selected &= self.codes[key] == code
+        if all_of:
+            selected &= (self.masks & all_of) == all_of
+        if any_of:
+            selected &= (self.masks & any_of) != 0
+        counts = self.counts[selected]
+        masks = self.masks[selected]
+
+        # 검진종류 외 기준 값 번호를 하나의 정수 키로 합침
+        plain = [name for name in group_by if name != EXAM_DIMENSION]
+        combined = np.zeros(len(counts), dtype=np.int64)
+        for name in plain:
+            combined = combined * len(self.vocab[name]) + self.codes[name][selected]
+        keys, inverse = np.unique(combined, return_inverse=True)
+
+        def decode(key):
+            values = []
+            for name in reversed(plain):
+                key, code = divmod(int(key), len(self.vocab[name]))
+                values.append(self.vocab[name][code])
+            return values[::-1]
+
+        decoded = [decode(key) for key in keys]
+        rows = []
+        if EXAM_DIMENSION not in group_by:
+            for values, count in zip(decoded, np.bincount(inverse, weights=counts, minlength=len(keys))):
+                rows.append((tuple(values), int(count)))
+        else:
+            slot = group_by.index(EXAM_DIMENSION)
+            for bit, (code, _, _, _) in enumerate(exam_index.EXAM_TYPES):
+                weights = counts * ((masks >> bit) & 1)
+                for values, count in zip(decoded, np.bincount(inverse, weights=weights, minlength=len(keys))):
+                    if count:
+                        rows.append((tuple(values[:slot] + [code] + values[slot:]), int(count)))
+        rows.sort()
+        return int(counts.sum()), [dict(zip(group_by, key), count=count) for key, count in rows]
+
+
+def query(params):
+    """집계 조회 응답 (스냅샷이 없으면 None, 잘못된 파라미터면 ValueError)"""
+    group_by, filters, all_of, any_of = parse(params)
+    version, index = get_index()
+    if index is None:
+        return None
+    total, rows = index.aggregate(group_by, filters, all_of, any_of)
+    return {
+        'status': 'success',
+        'data_version': version,
+        'group_by': group_by,
+        'total_count': total,
+        'groups': rows
+    }
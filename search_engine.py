@@ -0,0 +1,197 @@
+import os
+from array import array
+from collections import Counter
+
+import exam_index
+import registry
+import store
+
+# 한글 자모 표
+CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+JUNGSEONG = 'ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ'
+JONGSEONG = ['', 'ㄱ', 'ㄲ', 'ㄳ', 'ㄴ', 'ㄵ', 'ㄶ', 'ㄷ', 'ㄹ', 'ㄺ', 'ㄻ', 'ㄼ', 'ㄽ', 'ㄾ', 'ㄿ', 'ㅀ',
+             'ㅁ', 'ㅂ', 'ㅄ', 'ㅅ', 'ㅆ', 'ㅇ', 'ㅈ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ']
+HANGUL_FIRST, HANGUL_LAST = 0xAC00, 0xD7A3
+CONSONANTS = set('ㄱㄲㄳㄴㄵㄶㄷㄸㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅃㅄㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ')
+
+FUZZY_MIN_SIMILARITY = float(os.environ.get('FUZZY_MIN_SIMILARITY', '0.5'))
+
+# 필드별 가중치 (이름 일치를 주소 일치보다 우선)
+FIELD_WEIGHTS = {'name': 1.0, 'addr': 0.6}
+EXACT_BONUS = {'name': 1.0, 'addr': 0.5}
+PREFIX_BONUS = 0.2
+
+FILTER_PARAMS = ['siDoCd', 'siGunGuCd', 'hmcRdatCd']
+
+
+def normalize(text):
+    """소문자로 바꾸고 공백/기호 제거"""
+    return ''.join(ch for ch in (text or '').lower() if ch.isalnum() or ch in CONSONANTS)
+
+
+def decompose(text):
+    """완성형 한글을 자모 단위로 분해 (오타 허용 비교용)"""
+    result = []
+    for ch in text:
+        code = ord(ch)
+        if HANGUL_FIRST <= code <= HANGUL_LAST:
+            code -= HANGUL_FIRST
+            result.append(CHOSEONG[code // 588])
+            result.append(JUNGSEONG[(code % 588) // 28])
+            result.append(JONGSEONG[code % 28])
+        else:
+            result.append(ch)
+    return ''.join(result)
+
+
+def choseong(text):
+    """완성형 한글을 초성으로 변환 (그 외 문자는 그대로)"""
+    return ''.join(
+        CHOSEONG[(ord(ch) - HANGUL_FIRST) // 588] if HANGUL_FIRST <= ord(ch) <= HANGUL_LAST else ch
+        for ch in text
+    )
+
+
+def is_choseong_query(text):
+    """'ㅅㅇㅂㅇ'처럼 자음으로만 된 검색어인지 여부"""
+    return bool(text) and all(ch in CONSONANTS for ch in text)
+
+
+def ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class SearchEngine:
+    """검진기관명/주소에 대한 메모리 n-gram 역색인
+
+    - 일반 검색어: 자모 3-gram 일치 비율로 오타를 허용하고 부분 문자열 일치에 가산점
+    - 초성 검색어: 기관명 초성 2-gram으로 후보를 찾고 초성 부분 문자열로 확인
+    """
+
+    def __init__(self, hospitals):
+        self.hospitals = hospitals
+        self.names = [normalize(h.get('hmcNm')) for h in hospitals]
+        self.addrs = [normalize(h.get('locAddr')) for h in hospitals]
+        self.name_choseong = [choseong(name) for name in self.names]
+        self.index = {
+            'name': self._build([decompose(name) for name in self.names], 3),
+            'addr': self._build([decompose(addr) for addr in self.addrs], 3)
+        }
+        self.choseong_index = self._build(self.name_choseong, 2)
+
+    @staticmethod
+    def _build(texts, n):
+        postings = {}
+        for doc_id, text in enumerate(texts):
+            for gram in ngrams(text, n):
+                postings.setdefault(gram, []).append(doc_id)
+        return {gram: array('I', ids) for gram, ids in postings.items()}
+
+    def _match_choseong(self, query):
+        grams = ngrams(query, 2)
+        if grams:
+            candidates = None
+            for gram in grams:
+                ids = set(self.choseong_index.get(gram, ()))
+                candidates = ids if candidates is None else candidates & ids
+                if not candidates:
+                    return {}
+        else:
+            candidates = range(len(self.hospitals))
+
+        scores = {}
+        for doc_id in candidates:
+            position = self.name_choseong[doc_id].find(query)
+            if position >= 0:
+                scores[doc_id] = 1.0 + (PREFIX_BONUS if position == 0 else 0) + \
+                    len(query) / max(len(self.name_choseong[doc_id]), 1)
+        return scores
+
+    def _match_text(self, query, fields):
+        grams = ngrams(decompose(query), 3)
+        texts = {'name': self.names, 'addr': self.addrs}
+        scores = {}
+        for field in fields:
+            if grams:
+                counts = Counter()
+                for gram in grams:
+                    counts.update(self.index[field].get(gram, ()))
+                matched = ((doc_id, count / len(grams)) for doc_id, count in counts.items())
+            else:
+                # 한 글자 검색어는 부분 문자열로만 비교
+                matched = ((doc_id, 1.0) for doc_id, text in enumerate(texts[field]) if query in text)
+
+            for doc_id, similarity in matched:
+                if similarity < FUZZY_MIN_SIMILARITY:
+                    continue
+                score = similarity * FIELD_WEIGHTS[field]
+                position = texts[field][doc_id].find(query)
+                if position >= 0:
+                    score += EXACT_BONUS[field] + (PREFIX_BONUS if position == 0 else 0)
+                if score > scores.get(doc_id, 0):
+                    scores[doc_id] = score
+        return scores
+
+    def search(self, text, fields=('name', 'addr'), filters=None):
+        """검색어에 맞는 병원 번호를 점수 순으로 반환: [(doc_id, score), ...]"""
+        query = normalize(text)
+        if not query:
+            # 검색어가 없으면 필터만 적용
+            scores = dict.fromkeys(range(len(self.hospitals)), 0.0)
+        elif is_choseong_query(query):
+            scores = self._match_choseong(query)
+        else:
+            scores = self._match_text(query, fields)
+
+        if filters:
+            scores = {doc_id: score for doc_id, score in scores.items() if self._accept(doc_id, filters)}
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def _accept(self, doc_id, filters):
+        hospital = self.hospitals[doc_id]
+        for key in FILTER_PARAMS:
+            if filters.get(key) and hospital.get(key) != filters[key]:
+                return False
+        if filters.get('hchType') and filters['hchType'] not in store.hch_types_of(hospital):
+            return False
+        return True
+
+
+def get_engine(snapshot=None):
+    """현재(또는 snapshot) 데이터 버전의 검색 엔진 (데이터가 바뀌면 다시 생성, 전체 목록이 준비되지 않았으면 None)"""
+    return registry.derived('search_engine', SearchEngine, snapshot=snapshot)
+
+
+def is_fuzzy(params):
+    return params.get('searchMode') == 'fuzzy'
+
+
+def query(params, default_rows=10):
+    """searchMode=fuzzy 검색 (공공데이터 API와 같은 형식의 응답, 전체 목록이 준비되지 않았으면 registry.NotReady)
+
+    검색어는 q(기관명+주소), hmcNm(기관명), locAddr(주소) 순으로 사용한다.
+    """
+    if params.get('q'):
+        text, fields = params['q'], ('name', 'addr')
+    elif params.get('hmcNm'):
+        text, fields = params['hmcNm'], ('name',)
+    else:
+        text, fields = params.get('locAddr', ''), ('addr',)
+
+    # 검색 엔진과 검진종류 인덱스는 같은 버전의 목록으로 만든 것을 사용 (행 번호 = 문서 번호)
+    snapshot = registry.snapshot()
+    engine = get_engine(snapshot)
+    exams = exam_index.get_index(snapshot)
+    if engine is None or exams is None:
+        # 원본 API는 q/searchMode를 지원하지 않으므로 조건 없는 결과를 돌려주지 않도록 거절
+        raise registry.NotReady("Hospital list is still loading; retry shortly")
+    results = engine.search(text, fields=fields, filters=params)
+    if exam_index.has_exam_filter(params):
+        all_of, any_of = exam_index.match_mask(params)
+        allowed = set(exams.select(all_of, any_of, params).tolist())
+        results = [result for result in results if result[0] in allowed]
+    page_no, num_of_rows = store.page_params(params, default_rows)
+    start = (page_no - 1) * num_of_rows
+    page = [doc_id for doc_id, _ in results[start:start + num_of_rows]]
+    items = [engine.hospitals[doc_id] for doc_id in page]
+    return store.envelope(items, page_no, num_of_rows, len(results), [int(exams.masks[i]) for i in page])
@@ -0,0 +1,288 @@
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime
+
+import store
+
+# 검색 기록 저장 설정
+SEARCH_LOG_DIR = os.environ.get('SEARCH_LOG_DIR', os.path.join(store.DATA_DIR, 'search_log'))
+SEARCH_LOG_BATCH_SIZE = int(os.environ.get('SEARCH_LOG_BATCH_SIZE', '100'))
+SEARCH_LOG_FLUSH_INTERVAL = float(os.environ.get('SEARCH_LOG_FLUSH_INTERVAL', '1.0'))  # 초
+SEARCH_LOG_SEGMENT_BYTES = int(os.environ.get('SEARCH_LOG_SEGMENT_BYTES', str(16 * 1024 * 1024)))
+
+# 인덱스로 조회할 수 있는 검색 파라미터
+PARAM_COLUMNS = ['hmcNm', 'siDoCd', 'siGunGuCd', 'locAddr', 'hmcRdatCd', 'hchType']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS searches (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    hmcNm TEXT,
+    siDoCd TEXT,
+    siGunGuCd TEXT,
+    locAddr TEXT,
+    hmcRdatCd TEXT,
+    hchType TEXT,
+    params TEXT NOT NULL,
+    payload_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS payloads (
+    hash TEXT PRIMARY KEY,
+    segment TEXT NOT NULL,
+    member_offset INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_searches_ts ON searches (ts);
+CREATE INDEX IF NOT EXISTS idx_searches_siDoCd ON searches (siDoCd, siGunGuCd, ts);
+CREATE INDEX IF NOT EXISTS idx_searches_hmcNm ON searches (hmcNm, ts);
+CREATE INDEX IF NOT EXISTS idx_searches_hchType ON searches (hchType, ts);
+"""
+
+
+def payload_hash(data):
+    """응답 내용 해시 (같은 응답은 한 번만 저장)"""
+    return hashlib.sha256(json.dumps(data, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class SearchLog:
+    """검색 기록을 백그라운드에서 모아서 압축 세그먼트 파일에 추가 기록
+
+    - searches-NNNNNN.ndjson.gz: 검색 한 건당 한 줄 (시각, 파라미터, 응답 해시)
+    - payloads-NNNNNN.ndjson.gz: 응답 전체, 해시별로 한 번만 기록
+    - index.db: 시각/검색 파라미터 인덱스와 응답 위치
+    배치마다 gzip 멤버 하나를 덧붙이므로 파일은 항상 추가만 된다.
+    """
+
+    def __init__(self, log_dir=SEARCH_LOG_DIR, batch_size=SEARCH_LOG_BATCH_SIZE,
+                 flush_interval=SEARCH_LOG_FLUSH_INTERVAL, segment_bytes=SEARCH_LOG_SEGMENT_BYTES):
+        self.log_dir = log_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.index_path = os.path.join(log_dir, 'index.db')
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._known_hashes = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_ready(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            self._known_hashes = {row['hash'] for row in conn.execute('SELECT hash FROM payloads')}
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._ensure_ready()
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def record(self, search_params, data):
+        """검색 결과 기록 (요청 처리 스레드에서는 큐에 넣기만 함)"""
+        if self._thread is None:
+            self._start()
+        self._queue.put((time.time(), dict(search_params), data))
+
+    def flush(self):
+        """큐에 쌓인 기록이 모두 파일에 쓰일 때까지 대기"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                print(f"Error writing search log: {str(e)}")
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _segment_path(self, prefix):
+        """기록할 세그먼트 파일 (크기를 넘으면 다음 번호로 교체)"""
+        numbers = [
+            int(name[len(prefix) + 1:len(prefix) + 7]) for name in os.listdir(self.log_dir)
+            if name.startswith(f'{prefix}-') and name.endswith('.ndjson.gz')
+        ]
+        number = max(numbers) if numbers else 1
+        path = os.path.join(self.log_dir, f'{prefix}-{number:06d}.ndjson.gz')
+        if os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+            path = os.path.join(self.log_dir, f'{prefix}-{number + 1:06d}.ndjson.gz')
+        return path
+
+    def _append_member(self, prefix, lines):
+        """gzip 멤버 하나로 줄들을 덧붙이고 (파일명, 멤버 시작 위치) 반환
+
+        prefork 워커들이 같은 세그먼트에 쓰므로 세그먼트 선택부터 기록까지 잠금 파일로 한 프로세스씩 처리한다
+        (그렇지 않으면 기록한 위치가 다른 워커의 멤버 중간을 가리키거나 교체가 엇갈릴 수 있음).
+        """
+        import fcntl  # 검색 기록을 쓸 때만 필요 (POSIX)
+
+        member = gzip.compress(('\n'.join(lines) + '\n').encode('utf-8'))
+        with open(os.path.join(self.log_dir, f'{prefix}.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            path = self._segment_path(prefix)
+            with open(path, 'ab') as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(member)
+        return os.path.basename(path), offset
+
+    def _write_batch(self, batch):
+        search_rows = []
+        search_lines = []
+        payload_lines = []
+        new_hashes = []
+        for ts, params, data in batch:
+            digest = payload_hash(data)
+            if digest not in self._known_hashes and digest not in new_hashes:
+                new_hashes.append(digest)
+                payload_lines.append(json.dumps({'hash': digest, 'data': data}, ensure_ascii=False))
+            search_lines.append(json.dumps({'ts': ts, 'search_params': params, 'payload_hash': digest},
+                                           ensure_ascii=False))
+            search_rows.append([ts] + [params.get(key) or None for key in PARAM_COLUMNS] +
+                               [json.dumps(params, ensure_ascii=False), digest])
+
+        payload_rows = []
+        if payload_lines:
+            segment, offset = self._append_member('payloads', payload_lines)
+            payload_rows = [(digest, segment, offset) for digest in new_hashes]
+        self._append_member('searches', search_lines)
+
+        with closing(self._connect()) as conn:
+            with conn:
+                conn.executemany('INSERT OR IGNORE INTO payloads VALUES (?, ?, ?)', payload_rows)
+                conn.executemany(
+                    f"INSERT INTO searches (ts, {', '.join(PARAM_COLUMNS)}, params, payload_hash) "
+                    f"VALUES ({', '.join('?' * (len(PARAM_COLUMNS) + 3))})",
+                    search_rows
+                )
+        self._known_hashes.update(new_hashes)
+
+    def load_payload(self, digest):
+        """해시로 저장된 응답 전체 읽기 (해당 gzip 멤버만 압축 해제)"""
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT segment, member_offset FROM payloads WHERE hash = ?', (digest,)).fetchone()
+        if row is None:
+            return None
+        with open(os.path.join(self.log_dir, row['segment']), 'rb') as f:
+            f.seek(row['member_offset'])
+            with gzip.GzipFile(fileobj=f) as member:
+                for line in member:
+                    entry = json.loads(line)
+                    if entry['hash'] == digest:
+                        return entry['data']
+        return None
+
+    def query(self, filters=None, since=None, until=None, limit=20, offset=0, include_data=False):
+        """저장된 검색 기록 조회 (최신순)"""
+        if not os.path.exists(self.index_path):
+            return 0, []
+        clauses = []
+        args = []
+        for key in PARAM_COLUMNS:
+            if filters and filters.get(key):
+                clauses.append(f'{key} = ?')
+                args.append(filters[key])
+        if since is not None:
+            clauses.append('ts >= ?')
+            args.append(since)
+        if until is not None:
+            clauses.append('ts < ?')
+            args.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+
+        with closing(self._connect()) as conn:
+            total_count = conn.execute(f'SELECT COUNT(*) FROM searches {where}', args).fetchone()[0]
+            rows = conn.execute(
+                f'SELECT id, ts, params, payload_hash FROM searches {where} ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?',
+                args + [limit, offset]
+            ).fetchall()
+
+        searches = []
+        for row in rows:
+            entry = {
+                'id': row['id'],
+                'timestamp': datetime.fromtimestamp(row['ts']).isoformat(),
+                'search_params': json.loads(row['params']),
+                'payload_hash': row['payload_hash']
+            }
+            if include_data:
+                entry['data'] = self.load_payload(row['payload_hash'])
+            searches.append(entry)
+        return total_count, searches
+
+
+search_log = SearchLog()
+
+
+def record(search_params, data):
+    search_log.record(search_params, data)
+
+
+def parse_time(value):
+    """ISO 형식 또는 epoch 초 문자열을 epoch 초로 변환"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def _to_int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def export_params(query):
+    """검색 기록 조회 파라미터: (since, until, limit, offset)
+
+    limit은 1~100, offset은 0 이상으로 맞추고, from/to 시각 형식이 잘못되면 ValueError.
+    """
+    try:
+        since, until = parse_time(query.get('from')), parse_time(query.get('to'))
+    except ValueError:
+        raise ValueError("from/to must be ISO 8601 or epoch seconds")
+    limit = min(max(_to_int(query.get('limit'), 20), 1), 100)
+    offset = max(_to_int(query.get('offset'), 0), 0)
+    return since, until, limit, offset
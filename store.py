@@ -0,0 +1,459 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+# 스냅샷 저장소 설정
+DATA_DIR = os.environ.get('DATA_DIR', '/tmp/data')
+SNAPSHOT_DB = os.environ.get('SNAPSHOT_DB', os.path.join(DATA_DIR, 'hospitals.db'))
+SNAPSHOT_MAX_AGE = int(os.environ.get('SNAPSHOT_MAX_AGE', '86400'))  # 초 단위, 기본 1일
+CHANGE_RETENTION = int(os.environ.get('CHANGE_RETENTION', str(30 * 86400)))  # 변경 내역 보관 기간(초)
+
+# 부분 일치로 검색하는 파라미터 (나머지는 완전 일치)
+LIKE_PARAMS = ['hmcNm', 'locAddr']
+
+# 검진종류타입(hchType) -> 해당 검진을 담당하는지 판단할 필드와 값
+# 레코드에 hchType 필드가 없으므로 검진담당구분 코드로부터 유도함
+HCH_TYPE_FIELDS = {
+    '1': [('grenChrgTypeCd', '1')],
+    '2': [('grenChrgTypeCd', '1')],
+    '3': [
+        ('bcExmdChrgTypeCd', '0'), ('ccExmdChrgTypeCd', '0'), ('cvxcaExmdChrgTypeCd', '0'),
+        ('lvcaExmdChrgTypeCd', '0'), ('stmcaExmdChrgTypeCd', '0')
+    ],
+    '4': [('ichkChrgTypeCd', '1')]
+}
+
+SCHEMA = """
+CREATE TABLE hospitals (
+    seq INTEGER PRIMARY KEY,
+    hmcNo TEXT,
+    siDoCd TEXT,
+    siGunGuCd TEXT,
+    hmcRdatCd TEXT,
+    hmcNm TEXT,
+    locAddr TEXT,
+    data TEXT NOT NULL,
+    examMask INTEGER
+);
+CREATE TABLE hch_types (
+    seq INTEGER NOT NULL,
+    hchType TEXT NOT NULL
+);
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX idx_hospitals_hmcNo ON hospitals (hmcNo);
+CREATE INDEX idx_hospitals_siDoCd ON hospitals (siDoCd, siGunGuCd);
+CREATE INDEX idx_hospitals_siGunGuCd ON hospitals (siGunGuCd);
+CREATE INDEX idx_hospitals_hmcRdatCd ON hospitals (hmcRdatCd);
+CREATE INDEX idx_hch_types ON hch_types (hchType, seq);
+"""
+
+# 증분 동기화용 테이블 (기존 스냅샷 파일에도 추가할 수 있도록 IF NOT EXISTS)
+SYNC_SCHEMA = """
+CREATE TABLE IF NOT EXISTS record_hashes (
+    hmcNo TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    hmcNo TEXT NOT NULL,
+    op TEXT NOT NULL,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS sync_runs (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    status TEXT NOT NULL,
+    num_of_rows INTEGER NOT NULL,
+    total_count INTEGER NOT NULL,
+    next_page INTEGER NOT NULL,
+    pages_fetched INTEGER NOT NULL DEFAULT 0,
+    records_seen INTEGER NOT NULL DEFAULT 0,
+    inserted INTEGER NOT NULL DEFAULT 0,
+    updated INTEGER NOT NULL DEFAULT 0,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    unchanged INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS sync_seen (
+    run_id INTEGER NOT NULL,
+    hmcNo TEXT NOT NULL,
+    PRIMARY KEY (run_id, hmcNo)
+);
+CREATE INDEX IF NOT EXISTS idx_changes_ts ON changes (ts, id);
+"""
+
+
+def hch_types_of(hospital):
+    """병원 레코드가 담당하는 검진종류타입 목록"""
+    if hospital.get('hchType'):
+        return [str(hospital['hchType'])]
+    return [
+        hch_type for hch_type, fields in HCH_TYPE_FIELDS.items()
+        if any(hospital.get(field) == value for field, value in fields)
+    ]
+
+
+def record_hash(hospital):
+    """레코드 내용 해시 (필드 순서와 관계없이 같은 내용이면 같은 값)"""
+    return hashlib.sha1(json.dumps(hospital, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def hospital_row(seq, hospital):
+    """hospitals 테이블 한 행 (검진종류 비트마스크는 저장할 때 한 번 계산)"""
+    import exam_index  # exam_index가 store를 불러오므로 함수 안에서 불러옴
+
+    return (
+        seq,
+        hospital.get('hmcNo'),
+        hospital.get('siDoCd'),
+        hospital.get('siGunGuCd'),
+        hospital.get('hmcRdatCd'),
+        hospital.get('hmcNm', ''),
+        hospital.get('locAddr', ''),
+        json.dumps(hospital, ensure_ascii=False),
+        exam_index.exam_mask(hospital)
+    )
+
+
+HOSPITAL_INSERT = 'INSERT INTO hospitals VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'
+
+
+def connect(path=None):
+    """스냅샷 DB 연결 (읽기용)"""
+    conn = sqlite3.connect(path or SNAPSHOT_DB)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def write_snapshot(hospitals, path=None):
+    """전체 검진기관 목록으로 스냅샷 DB를 새로 생성
+
+    임시 파일에 기록한 뒤 교체하므로 조회 중인 요청은 항상 완전한 스냅샷을 본다.
+    기존 스냅샷의 변경 내역은 옮겨 오고, 기존 레코드와 달라진 부분을 변경 내역에 추가한다.
+    """
+    path = path or SNAPSHOT_DB
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    now = time.time()
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA + SYNC_SCHEMA)
+        rows = []
+        hch_rows = []
+        hash_rows = {}
+        for seq, hospital in enumerate(hospitals):
+            rows.append(hospital_row(seq, hospital))
+            hch_rows.extend((seq, hch_type) for hch_type in hch_types_of(hospital))
+            if hospital.get('hmcNo') is not None:
+                hash_rows[hospital['hmcNo']] = (hospital['hmcNo'], seq, record_hash(hospital))
+        conn.executemany(HOSPITAL_INSERT, rows)
+        conn.executemany('INSERT INTO hch_types VALUES (?, ?)', hch_rows)
+        conn.executemany('INSERT INTO record_hashes VALUES (?, ?, ?)', hash_rows.values())
+        # 집계 통계 테이블 (import 순환을 피하려고 함수 안에서 불러옴)
+        import rollup
+        rollup.build(conn, hospitals)
+        changed = _carry_over_changes(conn, path, now)
+        version = now if changed else data_version(path) or now
+        conn.executemany('INSERT INTO meta VALUES (?, ?)', [
+            ('synced_at', str(now)),
+            ('data_version', str(version)),
+            ('total_count', str(len(rows)))
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+    if path == SNAPSHOT_DB:
+        # 콜드 스타트용 열 단위 스냅샷도 함께 갱신
+        import columnar
+        columnar.write_snapshot(hospitals, now, version)
+    return len(hospitals)
+
+
+def _carry_over_changes(conn, old_path, ts):
+    """기존 스냅샷의 변경 내역을 복사하고 새 스냅샷과의 차이를 기록 (기록한 변경 수 반환)
+
+    첫 스냅샷이면 변경 내역은 비어 있는 상태로 시작한다.
+    """
+    if synced_at(old_path) is None:
+        return 0
+    with closing(connect(old_path)) as old:
+        ensure_sync_schema(old)
+    conn.execute('ATTACH DATABASE ? AS old', (old_path,))
+    try:
+        # 마지막 변경은 보관 기간이 지나도 옮겨 변경 id(조회 cursor)가 새 스냅샷에서도 이어지게 함
+        conn.execute(
+            'INSERT INTO changes SELECT * FROM old.changes WHERE ts >= ? OR id = (SELECT MAX(id) FROM old.changes)',
+            (ts - CHANGE_RETENTION,)
+        )
+        before = conn.execute('SELECT COUNT(*) FROM changes').fetchone()[0]
+        conn.execute("""
+            INSERT INTO changes (ts, hmcNo, op, data)
+            SELECT ?, r.hmcNo, CASE WHEN o.hmcNo IS NULL THEN 'insert' ELSE 'update' END, h.data
+            FROM record_hashes r
+            JOIN hospitals h ON h.seq = r.seq
+            LEFT JOIN old.record_hashes o ON o.hmcNo = r.hmcNo
+            WHERE o.hmcNo IS NULL OR o.hash != r.hash
+        """, (ts,))
+        conn.execute("""
+            INSERT INTO changes (ts, hmcNo, op, data)
+            SELECT ?, hmcNo, 'delete', NULL FROM old.record_hashes
+            WHERE hmcNo NOT IN (SELECT hmcNo FROM record_hashes)
+        """, (ts,))
+        changed = conn.execute('SELECT COUNT(*) FROM changes').fetchone()[0] - before
+        conn.commit()
+    finally:
+        conn.execute('DETACH DATABASE old')
+    return changed
+
+
+def ensure_sync_schema(conn):
+    """증분 동기화 테이블 생성 (이전 버전 스냅샷이면 레코드 해시와 검진종류 비트마스크도 채움)"""
+    conn.executescript(SYNC_SCHEMA)
+    if 'examMask' not in {row[1] for row in conn.execute('PRAGMA table_info(hospitals)')}:
+        import exam_index  # exam_index가 store를 불러오므로 함수 안에서 불러옴
+
+        conn.execute('ALTER TABLE hospitals ADD COLUMN examMask INTEGER')
+        conn.executemany('UPDATE hospitals SET examMask = ? WHERE seq = ?', [
+            (exam_index.exam_mask(json.loads(data)), seq) for seq, data in conn.execute('SELECT seq, data FROM hospitals')
+        ])
+        conn.commit()
+    if conn.execute('SELECT 1 FROM record_hashes LIMIT 1').fetchone() is None:
+        rows = {}
+        for seq, data in conn.execute('SELECT seq, data FROM hospitals'):
+            hospital = json.loads(data)
+            if hospital.get('hmcNo') is not None:
+                rows[hospital['hmcNo']] = (hospital['hmcNo'], seq, record_hash(hospital))
+        conn.executemany('INSERT INTO record_hashes VALUES (?, ?, ?)', rows.values())
+        conn.commit()
+
+
+def synced_at(path=None):
+    """마지막 동기화 시각 (스냅샷이 없으면 None)"""
+    path = path or SNAPSHOT_DB
+    if not os.path.exists(path):
+        return None
+    try:
+        with closing(connect(path)) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'synced_at'").fetchone()
+        return float(row['value']) if row else None
+    except sqlite3.Error:
+        return None
+
+
+def data_version(path=None):
+    """데이터가 마지막으로 바뀐 시각 (내용이 같으면 재동기화해도 그대로, 스냅샷이 없으면 None)"""
+    path = path or SNAPSHOT_DB
+    if not os.path.exists(path):
+        return None
+    try:
+        with closing(connect(path)) as conn:
+            row = conn.execute(
+                "SELECT value FROM meta WHERE key IN ('data_version', 'synced_at') "
+                "ORDER BY key = 'data_version' DESC LIMIT 1"
+            ).fetchone()
+        return float(row['value']) if row else None
+    except sqlite3.Error:
+        return None
+
+
+def is_fresh(path=None):
+    """스냅샷이 존재하고 만료되지 않았는지 여부"""
+    ts = synced_at(path)
+    return ts is not None and time.time() - ts <= SNAPSHOT_MAX_AGE
+
+
+def _to_int(value, default):
+    try:
+        return max(int(value), 1)
+    except (TypeError, ValueError):
+        return default
+
+
+def _where_clause(params):
+    """검색 파라미터를 SQL WHERE 절로 변환"""
+    clauses = []
+    args = []
+    for key in ['siDoCd', 'siGunGuCd', 'hmcRdatCd']:
+        if params.get(key):
+            clauses.append(f'{key} = ?')
+            args.append(params[key])
+    for key in LIKE_PARAMS:
+        if params.get(key):
+            clauses.append(f"{key} LIKE ? ESCAPE '\\'")
+            escaped = params[key].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            args.append(f'%{escaped}%')
+    if params.get('hchType'):
+        clauses.append('seq IN (SELECT seq FROM hch_types WHERE hchType = ?)')
+        args.append(params['hchType'])
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    return where, args
+
+
+def query(params, path=None):
+    """스냅샷에서 검색하여 공공데이터 API와 같은 형식의 응답을 반환
+
+    스냅샷이 없거나 만료된 경우 None을 반환하며, 이때 호출측은 원본 API를 사용한다.
+    """
+    path = path or SNAPSHOT_DB
+    if not is_fresh(path):
+        return None
+
+    page_no, num_of_rows = page_params(params)
+    where, args = _where_clause(params)
+
+    try:
+        with closing(connect(path)) as conn:
+            total_count = conn.execute(f'SELECT COUNT(*) FROM hospitals {where}', args).fetchone()[0]
+            rows = conn.execute(
+                f'SELECT * FROM hospitals {where} ORDER BY seq LIMIT ? OFFSET ?',
+                args + [num_of_rows, (page_no - 1) * num_of_rows]
+            ).fetchall()
+    except sqlite3.Error as e:
+        print(f"Snapshot query failed: {str(e)}")
+        return None
+
+    # 이전 버전 스냅샷에는 검진종류 비트마스크 열이 없음
+    exam_masks = [row['examMask'] for row in rows] if rows and 'examMask' in rows[0].keys() else None
+    return envelope([json.loads(row['data']) for row in rows], page_no, num_of_rows, total_count, exam_masks)
+
+
+def envelope(items, page_no, num_of_rows, total_count, exam_masks=None):
+    """공공데이터 API와 같은 형식의 응답
+
+    exam_masks(항목별 검진종류 비트마스크)를 주면 body의 examMasks로 함께 넘긴다 (GPTs 응답에서 다시 계산하지 않음).
+    examMasks는 내부 전달용으로, local_search.query_with_masks가 응답에서 떼어 낸다.
+    """
+    body = {
+        'items': {'item': items},
+        'numOfRows': num_of_rows,
+        'pageNo': page_no,
+        'totalCount': total_count
+    }
+    if exam_masks is not None:
+        body['examMasks'] = exam_masks
+    return {
+        'response': {
+            'header': {'resultCode': '00', 'resultMsg': 'NORMAL SERVICE.'},
+            'body': body
+        }
+    }
+
+
+def page_params(params, default_rows=10):
+    """pageNo/numOfRows 파라미터를 정수로 변환"""
+    return _to_int(params.get('pageNo'), 1), _to_int(params.get('numOfRows'), default_rows)
+
+
+def load_all(path=None):
+    """스냅샷의 전체 검진기관 목록 (스냅샷이 없으면 None)"""
+    path = path or SNAPSHOT_DB
+    if synced_at(path) is None:
+        return None
+    with closing(connect(path)) as conn:
+        return [json.loads(row['data']) for row in conn.execute('SELECT data FROM hospitals ORDER BY seq')]
+
+
+def load_all_with_masks(path=None):
+    """스냅샷의 전체 검진기관 목록과 저장된 검진종류 비트마스크: (목록, masks) (스냅샷이 없으면 (None, None))
+
+    검진종류 비트마스크 열이 없는 이전 버전 스냅샷이면 masks는 None.
+    """
+    path = path or SNAPSHOT_DB
+    if synced_at(path) is None:
+        return None, None
+    with closing(connect(path)) as conn:
+        rows = conn.execute('SELECT * FROM hospitals ORDER BY seq').fetchall()
+    hospitals = [json.loads(row['data']) for row in rows]
+    if rows and 'examMask' in rows[0].keys() and all(row['examMask'] is not None for row in rows):
+        return hospitals, [row['examMask'] for row in rows]
+    return hospitals, None
+
+
+def change_params(query):
+    """변경 내역 조회 파라미터: (since, cursor, limit, offset) (잘못된 값이면 ValueError)"""
+    def non_negative(name, default):
+        value = int(query.get(name) or default)
+        if value < 0:
+            raise ValueError(f"{name} must be >= 0")
+        return value
+
+    from search_log import parse_time  # search_log이 store를 불러오므로 함수 안에서 불러옴 (시각 형식 공유)
+
+    since = parse_time(query.get('since'))
+    cursor = non_negative('cursor', 0) if query.get('cursor') else None
+    return since, cursor, min(non_negative('limit', 100), 1000), non_negative('offset', 0)
+
+
+def changes(since=None, cursor=None, limit=100, offset=0, path=None):
+    """변경 내역 (기록된 순서, 변경 id 오름차순)
+
+    cursor(변경 id)를 주면 그 뒤의 변경만, 없으면 since(epoch 초) 이후의 변경을 돌려준다.
+    반환값: (cursor, total_count, entries). cursor는 이번에 돌려준 마지막 변경의 id로,
+    다음 조회 때 cursor로 넘기면 빠짐없이 이어서 받는다 (돌려준 변경이 없으면 현재 마지막 id).
+    total_count는 조건에 맞는 남은 변경 수이며, 한 트랜잭션 안에서 함께 읽는다.
+    """
+    path = path or SNAPSHOT_DB
+    if synced_at(path) is None:
+        return cursor, 0, []
+    if cursor is not None:
+        where, args = 'WHERE id > ?', [cursor]
+    elif since is not None:
+        where, args = 'WHERE ts > ?', [since]
+    else:
+        where, args = '', []
+    with closing(connect(path)) as conn:
+        try:
+            conn.execute('BEGIN')
+            total_count = conn.execute(f'SELECT COUNT(*) FROM changes {where}', args).fetchone()[0]
+            rows = conn.execute(
+                f'SELECT id, ts, hmcNo, op, data FROM changes {where} ORDER BY id LIMIT ? OFFSET ?',
+                args + [limit, offset]
+            ).fetchall()
+            last_id = conn.execute('SELECT MAX(id) FROM changes').fetchone()[0]
+            conn.execute('COMMIT')
+        except sqlite3.OperationalError:
+            return cursor, 0, []  # 변경 내역 테이블이 없는 이전 버전 스냅샷
+    entries = [{
+        'id': row['id'],
+        'changed_at': row['ts'],
+        'hmcNo': row['hmcNo'],
+        'op': row['op'],
+        'data': json.loads(row['data']) if row['data'] else None
+    } for row in rows]
+    if entries:
+        cursor = entries[-1]['id']
+    elif total_count == 0:
+        cursor = last_id if last_id is not None else cursor  # 남은 변경이 없으면 지금까지 기록된 끝
+    return cursor, total_count, entries
+
+
+def sync(fetch_all):
+    """fetch_all()로 전체 데이터를 받아 스냅샷 갱신
+
+    fetch_all()이 예외를 내면(일부 페이지 수집 실패 등) 기존 스냅샷을 그대로 둔다.
+    """
+    hospitals = fetch_all()
+    if not hospitals:
+        raise Exception("No data available")
+    return write_snapshot(hospitals)
+
+
+if __name__ == '__main__':
+    # 동기화 작업: python store.py
+    from app import get_all_hospitals
+
+    count = sync(get_all_hospitals)
+    print(f"Snapshot written: {count} hospitals -> {SNAPSHOT_DB}")
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+import artifacts
+import store
+from bench.synthetic import make_hospitals
+from test_registry import _reset
+
+
+@pytest.fixture
+def export_dir(monkeypatch, tmp_path):
+    _reset(monkeypatch, tmp_path)
+    path = str(tmp_path / 'exports')
+    monkeypatch.setattr(artifacts, 'EXPORT_DIR', path)
+    monkeypatch.setattr(artifacts, 'MANIFEST_PATH', os.path.join(path, 'manifest.json'))
+    return path
+
+
+def _no_upstream():
+    raise Exception("Incomplete fetch: upstream not configured")
+
+
+def test_artifact_is_built_from_the_snapshot(export_dir, monkeypatch, tmp_path):
+    path = str(tmp_path / 'hospitals.db')
+    monkeypatch.setattr(store, 'SNAPSHOT_DB', path)
+    store.write_snapshot(make_hospitals(20), path=path)
+
+    artifact = artifacts.get_artifact('ndjson', _no_upstream)
+    with open(artifact['path'], 'rb') as f:
+        assert len(f.read().splitlines()) == 20
+
+
+def test_replaced_files_are_kept_for_the_retention_period(export_dir, monkeypatch):
+    first = artifacts.build(lambda: make_hospitals(5))
+    artifacts.build(lambda: make_hospitals(6))
+    artifacts.build(lambda: make_hospitals(7))
+    # 두 번 교체된 파일도 보관 기간 안에는 남아 있음
+    assert os.path.exists(os.path.join(export_dir, first['files']['csv']))
+
+    monkeypatch.setattr(artifacts, 'EXPORT_RETENTION', 0)
+    latest = artifacts.build(lambda: make_hospitals(8))
+    assert set(os.listdir(export_dir)) == artifacts._files(latest) | {'manifest.json'}
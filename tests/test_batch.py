@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+import batch
+
+
+def test_body_length_limits():
+    assert batch.body_length('12') == 12
+    assert batch.body_length(None) == 0
+    for value in ['abc', '-1', str(batch.BATCH_MAX_BODY + 1)]:
+        with pytest.raises(ValueError):
+            batch.body_length(value)
+
+
+def test_parse_specs_validates_and_stringifies():
+    assert batch.parse_specs({'searches': [{'siDoCd': 11, 'k': 3, 'hmcNm': None}]}) == [{'siDoCd': '11', 'k': '3'}]
+    assert batch.parse_specs([{'postNo': '06351'}]) == [{'postNo': '06351'}]
+    for body in [{}, [], {'searches': ['siDoCd=11']}, [{}] * (batch.BATCH_MAX_SPECS + 1)]:
+        with pytest.raises(ValueError):
+            batch.parse_specs(body)
+
+
+def test_run_batch_deduplicates_and_keeps_order():
+    calls = []
+    lock = threading.Lock()
+
+    def search(spec):
+        with lock:
+            calls.append(spec['siDoCd'])
+        if spec['siDoCd'] == '99':
+            raise ValueError("Unknown region")
+        return {'siDoCd': spec['siDoCd']}
+
+    specs = [{'siDoCd': '11'}, {'siDoCd': '99'}, {'siDoCd': '11'}]
+    results = batch.run_batch(specs, search)
+    assert sorted(calls) == ['11', '99']
+    assert [result['index'] for result in results] == [0, 1, 2]
+    assert [result['status'] for result in results] == ['success', 'error', 'success']
+    assert results[1]['message'] == 'Unknown region'
+    assert [result['deduplicated'] for result in results] == [False, False, True]
+    assert results[2]['result'] is results[0]['result']
@@ -0,0 +1,40 @@
+import asyncio
+
+import cache
+
+
+def test_cancelled_leader_does_not_cancel_coalesced_waiters():
+    response_cache = cache.ResponseCache(max_bytes=1 << 20, ttl=60)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return b'body'
+
+    async def scenario():
+        leader = asyncio.create_task(response_cache.get_or_fetch_async('key', fetch))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(response_cache.get_or_fetch_async('key', fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        assert leader.cancelled()
+        return results
+
+    assert asyncio.run(scenario()) == [b'body'] * 3
+    assert len(calls) == 1
+    assert response_cache.stats()['coalesced'] == 3
+
+
+def test_shared_hit_keeps_remaining_ttl(tmp_path, monkeypatch):
+    shared = cache.SharedCache(str(tmp_path / 'cache.db'), ttl=600)
+    response_cache = cache.ResponseCache(max_bytes=1 << 20, ttl=600)
+    monkeypatch.setattr(cache, 'shared_cache', shared)
+    monkeypatch.setattr(cache, 'response_cache', response_cache)
+    key = ('http://upstream', ('pageNo', '1'))
+    shared.put(key, cache.upstream.UpstreamResponse(200, b'{"resultCode":"00"}'), ttl=30)
+
+    response = cache.cached_get('http://upstream', params={'pageNo': '1'})
+    assert response.content == b'{"resultCode":"00"}'
+    assert 0 < response_cache.ttl_left(key) <= 30
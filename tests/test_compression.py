@@ -0,0 +1,44 @@
+import gzip
+
+import pytest
+
+import compression
+
+BODY = ('{"status": "success", "hospitals": [' + ', '.join(['{"hmcNm": "서울의원"}'] * 200) + ']}').encode('utf-8')
+
+
+def test_negotiate_honours_q_values(monkeypatch):
+    monkeypatch.setattr(compression, 'ENCODINGS', ['br', 'gzip'])
+    assert compression.negotiate('gzip, deflate, br') == 'br'
+    assert compression.negotiate('br;q=0.5, gzip') == 'gzip'
+    assert compression.negotiate('br;q=0, gzip;q=0') is None
+    assert compression.negotiate('*') == 'br'
+    assert compression.negotiate('identity') is None
+    assert compression.negotiate(None) is None
+
+
+def test_encode_body_skips_small_or_binary_bodies():
+    assert compression.encode_body(b'{}', 'application/json', 'gzip') == (b'{}', {})
+    xlsx = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    assert compression.encode_body(BODY, xlsx, 'gzip') == (BODY, {})
+    assert compression.encode_body(BODY, 'application/json', None) == (BODY, {'Vary': 'Accept-Encoding'})
+
+
+def test_compressed_bodies_are_cached():
+    cache = compression.CompressedCache(max_bytes=1024 * 1024)
+    first = cache.encode(BODY, 'gzip')
+    assert gzip.decompress(first) == BODY
+    assert cache.encode(BODY, 'gzip') is first
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 1)
+
+
+@pytest.mark.parametrize('encoding', compression.ENCODINGS)
+def test_compress_file_round_trip(tmp_path, encoding):
+    src, dst = tmp_path / 'export.csv', tmp_path / 'export.csv.enc'
+    src.write_bytes(BODY * 10)
+    compression.compress_file(str(src), str(dst), encoding, chunk_bytes=1000)
+    data = dst.read_bytes()
+    if encoding == 'br':
+        assert compression.brotli.decompress(data) == BODY * 10
+    else:
+        assert gzip.decompress(data) == BODY * 10
@@ -0,0 +1,36 @@
+import pytest
+
+import exam_index
+
+HOSPITALS = [
+    {'siDoCd': '11', 'grenChrgTypeCd': '1', 'stmcaExmdChrgTypeCd': '0', 'ccExmdChrgTypeCd': '0'},
+    {'siDoCd': '11', 'grenChrgTypeCd': '1', 'stmcaExmdChrgTypeCd': '2'},
+    {'siDoCd': '26', 'stmcaExmdChrgTypeCd': '0'},
+]
+
+
+def test_parse_exam_types_accepts_codes_and_korean_names():
+    stomach, colon = exam_index.EXAM_BITS['stomach'], exam_index.EXAM_BITS['colon']
+    assert exam_index.parse_exam_types('stomach, colon') == stomach | colon
+    assert exam_index.parse_exam_types('위암,대장암검진') == stomach | colon
+    assert exam_index.parse_exam_types('') == 0
+    with pytest.raises(ValueError):
+        exam_index.parse_exam_types('stomach,xray')
+
+
+def test_exam_mask_and_status():
+    assert exam_index.exam_labels(exam_index.exam_mask(HOSPITALS[0])) == '일반검진, 대장암검진, 위암검진'
+    assert exam_index.exam_labels(exam_index.exam_mask({})) == '-'
+    # 불가능('2')과 값 없음을 구분
+    values = exam_index.exam_status_values(exam_index.exam_status(HOSPITALS[1]))
+    assert values[0] == '가능' and values[6] == '불가능' and values[3] is None
+
+
+def test_select_all_or_any_with_region_filter():
+    index = exam_index.ExamIndex(HOSPITALS)
+    stomach, colon = exam_index.EXAM_BITS['stomach'], exam_index.EXAM_BITS['colon']
+    assert index.select(all_of=stomach).tolist() == [0, 2]
+    assert index.select(all_of=stomach | colon).tolist() == [0]
+    assert index.select(any_of=stomach | colon, filters={'siDoCd': '26'}).tolist() == [2]
+    assert index.select(all_of=stomach, filters={'siDoCd': '99'}).tolist() == []
+    assert exam_index.match_mask({'examTypes': 'stomach,colon', 'examMatch': 'any'}) == (0, stomach | colon)
@@ -0,0 +1,56 @@
+import pytest
+
+import geo
+
+CENTROIDS = {
+    '04524': (37.5665, 126.9780),  # 서울시청
+    '06351': (37.4979, 127.0276),  # 강남
+    '48058': (35.1631, 129.1636),  # 부산 해운대
+}
+HOSPITALS = [
+    {'hmcNo': '1', 'hmcNm': '부산의원', 'locPostNo': '48058'},
+    {'hmcNo': '2', 'hmcNm': '강남의원', 'locPostNo': '06351'},
+    {'hmcNo': '3', 'hmcNm': '시청의원', 'locPostNo': '04524'},
+    {'hmcNo': '4', 'hmcNm': '좌표없음', 'locPostNo': ''},
+]
+
+
+@pytest.fixture
+def centroids(monkeypatch):
+    monkeypatch.setattr(geo, 'load_centroids', lambda path=None: (CENTROIDS, {}))
+
+
+@pytest.mark.parametrize('params', [
+    {'lat': 'inf', 'lng': '127'},
+    {'lat': '37.5', 'lng': 'nan'},
+    {'lat': '91', 'lng': '127'},
+    {'lat': '37.5', 'lng': '-181'},
+])
+def test_query_point_rejects_invalid_coordinates(params):
+    with pytest.raises(ValueError):
+        geo.query_point(params)
+
+
+def test_nearest_hospitals_rejects_invalid_radius(centroids):
+    for radius in ['inf', 'nan', '0', '-3']:
+        with pytest.raises(ValueError):
+            geo.nearest_hospitals({'lat': '37.5', 'lng': '127', 'radius': radius})
+
+
+def test_utmk_origin_maps_to_the_projection_center():
+    lat, lng = geo.utmk_to_wgs84(1000000.0, 2000000.0)
+    assert lat == pytest.approx(38.0) and lng == pytest.approx(127.5)
+
+
+def test_build_centroids_averages_by_postcode():
+    rows = [{'zip': '04524', 'lat': '37.0', 'lng': '127.0'}, {'zip': '04524', 'lat': '38.0', 'lng': '128.0'},
+            {'zip': '123', 'lat': '37.0', 'lng': '127.0'}, {'zip': '06351', 'lat': '', 'lng': ''}]
+    assert geo.build_centroids(rows, 'zip', lat='lat', lng='lng') == [('04524', 37.5, 127.5)]
+
+
+def test_grid_index_returns_nearest_first(centroids):
+    index = geo.GeoIndex(HOSPITALS)
+    assert index.located == 3
+    lat, lng = CENTROIDS['04524']
+    assert [i for i, _ in index.nearest(lat, lng, 2)] == [2, 1]
+    assert [i for i, _ in index.nearest(lat, lng, 5, radius_km=50)] == [2, 1]
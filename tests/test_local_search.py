@@ -0,0 +1,46 @@
+import columnar
+import exam_index
+import local_search
+import store
+from bench.synthetic import make_hospitals
+
+
+def test_exam_masks_stay_out_of_the_response_body(tmp_path, monkeypatch):
+    hospitals = make_hospitals(30)
+    path = str(tmp_path / 'hospitals.db')
+    store.write_snapshot(hospitals, path=path)
+    monkeypatch.setattr(store, 'SNAPSHOT_DB', path)
+    monkeypatch.setattr(columnar, 'query', lambda params: None)
+
+    params = {'pageNo': '1', 'numOfRows': '10'}
+    data, exam_masks = local_search.query_with_masks(params)
+    # 응답 본문은 원본 API와 같은 키만 가짐
+    assert set(data['response']['body']) == {'items', 'numOfRows', 'pageNo', 'totalCount'}
+    assert exam_masks == [exam_index.exam_mask(hospital) for hospital in hospitals[:10]]
+    assert local_search.query(params) == data
+
+
+def test_exam_index_uses_the_stored_masks(tmp_path, monkeypatch):
+    import registry
+    from test_registry import _reset
+
+    _reset(monkeypatch, tmp_path)
+    hospitals = make_hospitals(50)
+    expected = [exam_index.exam_mask(hospital) for hospital in hospitals]
+    path = str(tmp_path / 'hospitals.db')
+    store.write_snapshot(hospitals, path=path)
+    monkeypatch.setattr(store, 'SNAPSHOT_DB', path)
+
+    def recompute(hospital):
+        raise AssertionError("exam mask recomputed")
+
+    monkeypatch.setattr(exam_index, 'exam_mask', recompute)
+    index = exam_index.get_index()
+    assert registry.get_hospitals() == hospitals
+    assert index.masks.tolist() == expected
+
+    # examTypes 검색은 저장된 비트마스크로 거름
+    data, exam_masks = local_search.query_with_masks({'examTypes': 'stomach', 'pageNo': '1', 'numOfRows': '100'})
+    stomach = exam_index.EXAM_BITS['stomach']
+    assert data['response']['body']['totalCount'] == sum(1 for mask in expected if mask & stomach)
+    assert all(mask & stomach for mask in exam_masks)
@@ -0,0 +1,23 @@
+import json
+
+import passthrough
+import upstream
+
+BODY = '{"response": {"header": {"resultCode": "00", "resultMsg": "NORMAL SERVICE."}, ' \
+       '"body": {"items": {"item": [{"hmcNm": "서울의원"}]}, "totalCount": 1}}}'
+
+
+def test_upstream_body_is_embedded_unchanged():
+    params = {'pageNo': '1', 'hmcNm': '서울'}
+    body = passthrough.web_body(params, upstream.UpstreamResponse(200, BODY.encode('utf-8') + b'\n'))
+    assert BODY.encode('utf-8') in body
+    assert json.loads(body) == {'status': 'success', 'request_params': params, 'data': json.loads(BODY)}
+
+
+def test_non_json_or_error_responses_fall_back(monkeypatch):
+    xml = b'<OpenAPI_ServiceResponse><returnReasonCode>30</returnReasonCode></OpenAPI_ServiceResponse>'
+    assert passthrough.web_body({}, upstream.UpstreamResponse(200, xml)) is None
+    assert passthrough.web_body({}, upstream.UpstreamResponse(200, b'{"message": "no resultCode"}')) is None
+    assert passthrough.web_body({}, upstream.UpstreamResponse(500, BODY.encode('utf-8'))) is None
+    monkeypatch.setattr(passthrough, 'WEB_PASSTHROUGH', False)
+    assert passthrough.web_body({}, upstream.UpstreamResponse(200, BODY.encode('utf-8'))) is None
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+import registry
+import store
+
+
+def _reset(monkeypatch, tmp_path):
+    monkeypatch.setattr(store, 'SNAPSHOT_DB', str(tmp_path / 'missing.db'))
+    monkeypatch.setattr(registry.columnar, 'get', lambda: None)
+    monkeypatch.setattr(registry, '_state', {'version': None, 'loaded_at': 0, 'expires_at': 0, 'hospitals': None,
+                                             'exam_masks': None, 'from_snapshot': False, 'retry_at': 0})
+    monkeypatch.setattr(registry, '_derived', {})
+    monkeypatch.setattr(registry, '_fresh', {'key': None, 'snapshot': None})
+    monkeypatch.setattr(registry, '_loader', None)
+
+
+def test_api_load_runs_off_the_request_path(monkeypatch, tmp_path):
+    _reset(monkeypatch, tmp_path)
+    release = threading.Event()
+
+    def slow_fetch(base_url, service_key):
+        release.wait(5)
+        return [{'hmcNo': '1'}], {'fetched': 1}
+
+    monkeypatch.setattr(registry, 'fetch_all_hospitals', slow_fetch)
+    started = time.monotonic()
+    assert registry.get_hospitals() is None
+    assert registry.derived('test', len) is None
+    assert time.monotonic() - started < 1
+    release.set()
+    registry._loader.join(5)
+    assert registry.get_hospitals() == [{'hmcNo': '1'}]
+
+
+def test_expired_snapshot_is_not_served(monkeypatch, tmp_path):
+    _reset(monkeypatch, tmp_path)
+    path = str(tmp_path / 'snapshot.db')
+    monkeypatch.setattr(store, 'SNAPSHOT_DB', path)
+    store.write_snapshot([{'hmcNo': '1', 'hmcNm': '병원'}], path=path)
+    monkeypatch.setattr(registry, 'fetch_all_hospitals', lambda base_url, service_key: ([], {'fetched': 0}))
+    assert registry.get_hospitals() == [{'hmcNo': '1', 'hmcNm': '병원'}]
+
+    monkeypatch.setattr(store, 'SNAPSHOT_MAX_AGE', -1)
+    assert registry.get_hospitals() is None
+
+
+@pytest.fixture
+def loading_registry(monkeypatch, tmp_path):
+    """원본 API에서 전체 목록을 읽는 중인 상태 (테스트가 끝나면 읽기를 마치고 스레드를 기다림)"""
+    _reset(monkeypatch, tmp_path)
+    release = threading.Event()
+
+    def slow_fetch(base_url, service_key):
+        release.wait(5)
+        return [], {'fetched': 0}
+
+    monkeypatch.setattr(registry, 'fetch_all_hospitals', slow_fetch)
+    yield
+    release.set()
+    if registry._loader is not None:
+        registry._loader.join(5)
+
+
+def test_fuzzy_search_is_refused_while_loading(loading_registry):
+    import main
+
+    response = main.app.test_client().get('/api/hospitals/search?searchMode=fuzzy&q=강남')
+    assert response.status_code == 503
+    assert response.get_json()['status'] == 'error'
+
+
+def test_exam_filter_is_refused_while_loading(loading_registry):
+    from api import index
+
+    with pytest.raises(registry.NotReady):
+        index.search_hospitals_for_gpts({'examTypes': 'stomach'})
+
+
+def _hold_lock(path, locked, release):
+    import fcntl
+
+    with open(path, 'a') as f:
+        fcntl.lockf(f, fcntl.LOCK_EX)
+        locked.set()
+        release.wait(10)
+
+
+def test_only_the_lock_holder_loads_from_the_api(monkeypatch, tmp_path):
+    import multiprocessing
+
+    _reset(monkeypatch, tmp_path)
+    lock_path = str(tmp_path / 'registry.lock')
+    monkeypatch.setattr(registry, 'REGISTRY_LOCK', lock_path)
+    monkeypatch.setattr(store, 'SNAPSHOT_DB', str(tmp_path / 'hospitals.db'))
+    monkeypatch.setattr(registry.columnar, 'COLUMNAR_SNAPSHOT', '')
+
+    # 다른 프로세스가 잠금을 갖고 있으면 원본 API를 호출하지 않음
+    context = multiprocessing.get_context('fork')
+    locked, release = context.Event(), context.Event()
+    holder = context.Process(target=_hold_lock, args=(lock_path, locked, release))
+    holder.start()
+    try:
+        assert locked.wait(10)
+        fetched = []
+        monkeypatch.setattr(registry, 'fetch_all_hospitals',
+                            lambda base_url, service_key: fetched.append(1) or ([{'hmcNo': '1'}], {'fetched': 1}))
+        registry._load_from_api()
+        assert fetched == []
+        assert registry._state['hospitals'] is None
+    finally:
+        release.set()
+        holder.join(10)
+
+    # 잠금을 얻으면 읽은 목록을 스냅샷으로 기록해 다른 프로세스가 읽게 함
+    registry._load_from_api()
+    assert fetched == [1]
+    assert store.load_all() == [{'hmcNo': '1'}]
+    assert registry._state['from_snapshot'] and registry._state['version'] == store.data_version()
@@ -0,0 +1,49 @@
+import sqlite3
+from collections import Counter
+
+import pytest
+
+import exam_index
+import rollup
+from bench.synthetic import make_hospitals
+
+HOSPITALS = make_hospitals(500)
+
+
+def test_aggregate_matches_counting_records():
+    index = rollup.RollupIndex(rollup.cells(HOSPITALS))
+    total, groups = index.aggregate(['siDoCd', 'hmcRdatCd'], {'ykindnm': '의원'})
+    expected = Counter((h['siDoCd'], h['hmcRdatCd']) for h in HOSPITALS if h['ykindnm'] == '의원')
+    assert total == sum(expected.values())
+    assert {(g['siDoCd'], g['hmcRdatCd']): g['count'] for g in groups} == expected
+
+
+def test_exam_type_groups_count_each_available_exam():
+    index = rollup.RollupIndex(rollup.cells(HOSPITALS))
+    stomach = exam_index.EXAM_BITS['stomach']
+    total, groups = index.aggregate(['examType'], all_of=stomach)
+    selected = [exam_index.exam_mask(h) for h in HOSPITALS if exam_index.exam_mask(h) & stomach]
+    assert total == len(selected)
+    expected = {code: sum(1 for mask in selected if mask & (1 << bit))
+                for bit, (code, _, _, _) in enumerate(exam_index.EXAM_TYPES)}
+    assert {g['examType']: g['count'] for g in groups} == {code: n for code, n in expected.items() if n}
+
+
+def test_apply_keeps_the_table_equal_to_a_rebuild():
+    conn = sqlite3.connect(':memory:')
+    rollup.build(conn, HOSPITALS[:100])
+    changed = [dict(h) for h in HOSPITALS[:100]]
+    changed[0]['siDoCd'] = '11'
+    changed[1]['stmcaExmdChrgTypeCd'] = '2' if changed[1]['stmcaExmdChrgTypeCd'] == '0' else '0'
+    rollup.apply(conn, HOSPITALS[0], changed[0])
+    rollup.apply(conn, HOSPITALS[1], changed[1])
+    rollup.apply(conn, HOSPITALS[2], None)  # 삭제
+    rollup.apply(conn, None, HOSPITALS[100])  # 추가
+    result = sorted(conn.execute('SELECT * FROM rollups'))
+    assert result == rollup.cells(changed[:2] + changed[3:] + [HOSPITALS[100]])
+
+
+def test_parse_rejects_unknown_group_by():
+    assert rollup.parse({'groupBy': 'siDoCd,examType,siDoCd'})[0] == ['siDoCd', 'examType']
+    with pytest.raises(ValueError):
+        rollup.parse({'groupBy': 'hmcNm'})
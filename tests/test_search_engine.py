@@ -0,0 +1,51 @@
+import exam_index
+import registry
+import search_engine
+import store
+from bench.synthetic import make_hospitals
+from test_registry import _reset
+
+HOSPITALS = [
+    {'hmcNo': '1', 'hmcNm': '서울밝은내과의원', 'locAddr': '서울특별시 중구 세종대로 1', 'siDoCd': '11'},
+    {'hmcNo': '2', 'hmcNm': '부산중앙병원', 'locAddr': '부산광역시 중구 중앙대로 2', 'siDoCd': '26'},
+    {'hmcNo': '3', 'hmcNm': '밝은서울의원', 'locAddr': '경기도 수원시 팔달로 3', 'siDoCd': '41'},
+]
+
+
+def test_fuzzy_search_matches_choseong_and_typos():
+    engine = search_engine.SearchEngine(HOSPITALS)
+    assert [doc_id for doc_id, _ in engine.search('ㅅㅇㅂㅇ')] == [0]
+    assert engine.search('부산중앙벙원')[0][0] == 1  # 오타 허용
+    assert [doc_id for doc_id, _ in engine.search('서울', filters={'siDoCd': '41'})] == [2]
+    assert [doc_id for doc_id, _ in engine.search('수원', fields=('name',))] == []
+
+
+def test_fuzzy_query_uses_one_data_version(monkeypatch, tmp_path):
+    _reset(monkeypatch, tmp_path)
+    path = str(tmp_path / 'hospitals.db')
+    monkeypatch.setattr(store, 'SNAPSHOT_DB', path)
+    store.write_snapshot(make_hospitals(20), path=path)
+    snapshot = registry.snapshot()
+
+    # 검색 엔진을 만든 뒤 스냅샷이 바뀌어도 검진종류 인덱스는 같은 버전의 목록으로 만듦
+    engine = search_engine.get_engine(snapshot)
+    store.write_snapshot(make_hospitals(30, seed=1), path=path)
+    exams = exam_index.get_index(snapshot)
+    assert exams.hospitals is engine.hospitals
+    assert len(exam_index.get_index().hospitals) == 30
+
+
+def test_fuzzy_query_does_not_reopen_the_snapshot(monkeypatch, tmp_path):
+    _reset(monkeypatch, tmp_path)
+    path = str(tmp_path / 'hospitals.db')
+    monkeypatch.setattr(store, 'SNAPSHOT_DB', path)
+    store.write_snapshot(make_hospitals(20), path=path)
+    params = {'searchMode': 'fuzzy', 'q': '건강', 'examTypes': 'general', 'pageNo': '1', 'numOfRows': '5'}
+    search_engine.query(params)
+
+    opened = []
+    connect = store.connect
+    monkeypatch.setattr(store, 'connect', lambda path=None: opened.append(path) or connect(path))
+    result = search_engine.query(params)
+    assert result['response']['body']['totalCount'] > 0
+    assert opened == []
@@ -0,0 +1,41 @@
+import pytest
+
+import search_log
+
+
+def test_export_params_clamps_paging():
+    assert search_log.export_params({'limit': '-5', 'offset': '-3'})[2:] == (1, 0)
+    assert search_log.export_params({'limit': '1000'})[2:] == (100, 0)
+    assert search_log.export_params({'limit': 'abc'})[2:] == (20, 0)
+
+
+def test_export_params_rejects_bad_time():
+    with pytest.raises(ValueError):
+        search_log.export_params({'from': 'yesterday'})
+    assert search_log.export_params({'to': '0'})[1] == 0.0
+
+
+def _append_members(log_dir, worker, queue):
+    log = search_log.SearchLog(log_dir=log_dir, segment_bytes=2048)
+    queue.put([(worker, i) + log._append_member('payloads', [f'{worker}-{i}-{"x" * 200}']) for i in range(30)])
+
+
+def test_concurrent_workers_append_whole_members(tmp_path):
+    import gzip
+    import multiprocessing
+
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    workers = [context.Process(target=_append_members, args=(str(tmp_path), n, queue)) for n in range(4)]
+    for worker in workers:
+        worker.start()
+    results = [entry for _ in workers for entry in queue.get(timeout=30)]
+    for worker in workers:
+        worker.join(10)
+
+    # 기록한 위치마다 그 워커가 쓴 멤버가 그대로 있음
+    for worker, i, segment, offset in results:
+        with open(tmp_path / segment, 'rb') as f:
+            f.seek(offset)
+            with gzip.GzipFile(fileobj=f) as member:
+                assert member.readline().decode('utf-8').startswith(f'{worker}-{i}-')
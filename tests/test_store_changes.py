@@ -0,0 +1,38 @@
+import store
+from bench.synthetic import make_hospitals
+
+
+def test_cursor_pages_every_change_once(tmp_path):
+    path = str(tmp_path / 'hospitals.db')
+    hospitals = make_hospitals(400)
+    store.write_snapshot(hospitals, path=path)
+
+    # 한 번의 동기화로 같은 시각의 변경 250건 기록 (200건 변경 + 50건 삭제)
+    changed = [dict(hospital) for hospital in hospitals[:-50]]
+    for hospital in changed[:200]:
+        hospital['hmcNm'] += ' (이전)'
+    store.write_snapshot(changed, path=path)
+
+    seen = []
+    cursor, total_count, entries = store.changes(limit=100, path=path)
+    assert total_count == 250
+    pages = 0
+    while entries:
+        pages += 1
+        seen.extend(entry['id'] for entry in entries)
+        cursor, _, entries = store.changes(cursor=cursor, limit=100, path=path)
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 250
+    assert {entry['op'] for entry in store.changes(limit=1000, path=path)[2]} == {'update', 'delete'}
+
+    # 새 변경이 없으면 같은 cursor를 돌려줌
+    assert store.changes(cursor=cursor, path=path) == (cursor, 0, [])
+
+
+def test_change_params_rejects_negative_values():
+    for query in ({'limit': '-1'}, {'offset': '-5'}, {'cursor': '-1'}, {'since': 'yesterday'}):
+        try:
+            store.change_params(query)
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted {query}")
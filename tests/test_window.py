@@ -0,0 +1,48 @@
+import pytest
+
+import registry
+import window
+
+
+def test_cursor_round_trip():
+    cursor = window.encode_cursor({'siDoCd': '11', 'q': '강남'}, 300)
+    assert window.decode_cursor(cursor) == ({'siDoCd': '11', 'q': '강남'}, 300)
+    with pytest.raises(ValueError):
+        window.decode_cursor('not-a-cursor')
+
+
+def test_parse_rejects_out_of_range_values():
+    assert window.parse({'offset': '10', 'limit': '20', 'siDoCd': '11'}) == ({'siDoCd': '11'}, 10, 20)
+    for params in ({'offset': '-1'}, {'limit': '0'}, {'limit': str(window.WINDOW_MAX_LIMIT + 1)}, {'offset': 'x'}):
+        with pytest.raises(ValueError):
+            window.parse(params)
+
+
+def test_plan_splits_window_into_pages():
+    assert window.plan(150, 200, 1000, 100) == [(2, 50, 50), (3, 0, 100), (4, 0, 50)]
+    assert window.plan(950, 200, 1000, 100) == [(10, 50, 50)]
+    assert window.plan(1000, 10, 1000, 100) == []
+
+
+def test_local_only_filters_are_not_sent_upstream(monkeypatch):
+    monkeypatch.setattr(window.local_search, 'query', lambda params: None)
+
+    def upstream_page(*args):
+        raise AssertionError("upstream must not be queried without the local-only filters")
+
+    monkeypatch.setattr(window, 'fetch_page', upstream_page)
+    with pytest.raises(registry.NotReady):
+        window.open_window({'limit': '10', 'examTypes': 'stomach'}, 'http://upstream', 'key')
+
+
+def test_window_streams_pages_in_order():
+    rows = [{'hmcNo': str(i)} for i in range(250)]
+
+    def fetch(page_no, num_of_rows):
+        start = (page_no - 1) * num_of_rows
+        return rows[start:start + num_of_rows], len(rows)
+
+    result = window.Window({}, 30, 200, fetch, workers=3, page_size=50).open()
+    streamed = [hospital for items in result.iter_pages() for hospital in items]
+    assert [h['hmcNo'] for h in streamed] == [str(i) for i in range(30, 230)]
+    assert window.decode_cursor(result.next_cursor()) == ({}, 230)
@@ -0,0 +1,415 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+
+import metrics
+
+# 공공데이터 API 호출 설정
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', '16'))  # 유지할 keep-alive 연결 수
+UPSTREAM_RATE = float(os.environ.get('UPSTREAM_RATE', '30'))  # 초당 호출 수 (트래픽 한도)
+UPSTREAM_BURST = int(os.environ.get('UPSTREAM_BURST', '30'))
+UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', '3'))
+UPSTREAM_READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', '10'))
+UPSTREAM_DEADLINE = float(os.environ.get('UPSTREAM_DEADLINE', '20'))  # 재시도를 포함한 호출 한 건의 제한 시간
+UPSTREAM_MAX_ATTEMPTS = int(os.environ.get('UPSTREAM_MAX_ATTEMPTS', '3'))
+UPSTREAM_BACKOFF = float(os.environ.get('UPSTREAM_BACKOFF', '0.3'))  # 첫 재시도 대기 시간(초)
+UPSTREAM_FAILURE_THRESHOLD = int(os.environ.get('UPSTREAM_FAILURE_THRESHOLD', '5'))  # 연속 실패 시 차단
+UPSTREAM_COOLDOWN = float(os.environ.get('UPSTREAM_COOLDOWN', '30'))  # 차단 유지 시간(초)
+
+# 재시도하는 HTTP 상태 코드
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# 재시도해도 결과가 같은 resultCode (파라미터 오류, 인증키/권한 오류, 호출 한도 초과)
+PERMANENT_RESULT_CODES = {'03', '10', '11', '12', '20', '22', '30', '31', '32'}
+
+RESULT_CODE = re.compile(rb'"resultCode"\s*:\s*"(\d+)"')
+
+
+class UpstreamUnavailable(Exception):
+    """차단기가 열려 있거나 제한 시간 안에 호출할 수 없음"""
+
+
+def result_code(content):
+    """응답 본문의 resultCode (JSON 전체를 파싱하지 않고 찾음)"""
+    match = RESULT_CODE.search(content or b'')
+    return match.group(1).decode() if match else None
+
+
+def is_transient(response):
+    """재시도하면 나아질 수 있는 실패 응답인지 여부"""
+    if response.status_code in RETRY_STATUS:
+        return True
+    if response.status_code != 200:
+        return False
+    code = result_code(response.content)
+    # XML 오류 응답 등 resultCode가 없는 본문도 일시적인 오류로 봄
+    return code != '00' and code not in PERMANENT_RESULT_CODES
+
+
+class TokenBucket:
+    """초당 rate개씩 채워지고 최대 burst개까지 쌓이는 호출 토큰"""
+
+    def __init__(self, rate=UPSTREAM_RATE, burst=UPSTREAM_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def reserve(self, deadline=None):
+        """토큰 하나를 예약하고 기다려야 하는 시간(초)을 반환 (deadline을 넘기면 UpstreamUnavailable)"""
+        if self.rate <= 0:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # 토큰을 미리 빼 두고 모자란 만큼만 기다림 (대기 순서대로 차례가 돌아옴)
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0
+            if deadline is not None and now + wait > deadline:
+                raise UpstreamUnavailable("Upstream rate limit wait exceeds deadline")
+            self._tokens -= 1
+            self.waited += wait
+        return wait
+
+    def acquire(self, deadline=None):
+        """토큰 하나를 얻을 때까지 대기"""
+        wait = self.reserve(deadline)
+        if wait:
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """연속 실패가 threshold번 이어지면 cooldown 동안 호출을 막고, 이후 한 건만 시험 호출"""
+
+    def __init__(self, threshold=UPSTREAM_FAILURE_THRESHOLD, cooldown=UPSTREAM_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at < self.cooldown or self._probing:
+            return 'open'
+        return 'half-open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open':
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release(self):
+        """결과 없이 끝난 호출 (취소 등): 시험 호출이었다면 다음 요청이 다시 시험하도록 함"""
+        with self._lock:
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                if self._opened_at is None or self._probing:
+                    self.trips += 1
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class UpstreamClient:
+    """공공데이터 API 공용 클라이언트
+
+    - 연결 풀을 공유하는 keep-alive 세션
+    - 토큰 버킷으로 초당 호출 수 제한
+    - 호출마다 전체 제한 시간(deadline) 안에서 지터를 준 지수 백오프로 재시도
+      (연결 오류, 타임아웃, 5xx/429, 일시적인 resultCode 오류)
+    - 연속 실패 시 차단기를 열어 바로 UpstreamUnavailable을 발생
+    """
+
+    def __init__(self, pool_size=UPSTREAM_POOL_SIZE, limiter=None, breaker=None,
+                 max_attempts=UPSTREAM_MAX_ATTEMPTS, deadline=UPSTREAM_DEADLINE, backoff=UPSTREAM_BACKOFF):
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+        self.limiter = limiter or TokenBucket()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+        self.status_codes = {}  # 시도별 HTTP 상태 코드 (연결 오류는 'error')
+
+    def _get_session(self):
+        # requests는 처음 호출할 때 불러옴 (스냅샷만으로 응답하는 콜드 스타트에서는 불러오지 않음)
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size,
+                                          pool_block=False)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def _count_status(self, status):
+        with self._lock:
+            self.status_codes[str(status)] = self.status_codes.get(str(status), 0) + 1
+
+    def _begin(self, timeout, deadline):
+        """호출 시작: 차단기 확인 후 (시도별 (연결, 읽기) 제한 시간, 전체 만료 시각) 반환"""
+        if not self.breaker.allow():
+            raise UpstreamUnavailable("Upstream circuit breaker is open")
+        self._count('calls')
+        timeout = timeout or (UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT)
+        if not isinstance(timeout, tuple):
+            timeout = (min(UPSTREAM_CONNECT_TIMEOUT, timeout), timeout)
+        return timeout, time.monotonic() + (deadline or self.deadline)
+
+    def _retry_delay(self, attempt, expires_at):
+        """attempt번째 시도 전 대기 시간 (full jitter, 만료 시각을 넘기면 None)"""
+        self._count('retries')
+        delay = random.uniform(0, self.backoff * (2 ** (attempt - 2)))
+        if time.monotonic() + delay >= expires_at:
+            return None
+        return delay
+
+    def _finish(self, response, error):
+        """호출 결과를 차단기에 반영하고 응답 반환 (응답이 없으면 예외)"""
+        if response is not None and error is None and not is_transient(response):
+            self.breaker.success()
+            return response
+        self._count('failures')
+        self.breaker.failure()
+        if response is not None and error is None:
+            return response
+        raise error or UpstreamUnavailable("Upstream deadline exceeded")
+
+    def _attempt(self, url, params, timeout, expires_at, max_attempts=None):
+        """deadline 안에서 재시도하며 호출: (마지막 응답, 마지막 오류)"""
+        session = self._get_session()
+        from requests import RequestException
+
+        response = None
+        error = None
+        for attempt in range(1, (max_attempts or self.max_attempts) + 1):
+            if attempt > 1:
+                delay = self._retry_delay(attempt, expires_at)
+                if delay is None:
+                    break
+                time.sleep(delay)
+            try:
+                self.limiter.acquire(expires_at)
+                remaining = expires_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._count('attempts')
+                response = session.get(
+                    url, params=params, timeout=(min(timeout[0], remaining), min(timeout[1], remaining))
+                )
+                self._count_status(response.status_code)
+                error = None
+                if not is_transient(response):
+                    break
+            except UpstreamUnavailable as e:
+                error = e
+                break
+            except RequestException as e:
+                self._count_status('error')
+                error = e
+        return response, error
+
+    def get(self, url, params=None, timeout=None, deadline=None, max_attempts=None):
+        """GET 호출 (재시도 후 마지막 응답 반환, 응답을 못 받으면 예외)
+
+        timeout: 시도 한 번의 (연결, 읽기) 제한 시간, deadline: 재시도를 포함한 전체 제한 시간(초)
+        max_attempts: 이 호출의 최대 시도 횟수 (기본 UPSTREAM_MAX_ATTEMPTS)
+        """
+        timeout, expires_at = self._begin(timeout, deadline)
+        try:
+            response, error = self._attempt(url, params, timeout, expires_at, max_attempts)
+        except Exception:
+            self.breaker.failure()
+            raise
+        return self._finish(response, error)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'attempts': self.attempts,
+                'retries': self.retries,
+                'failures': self.failures,
+                'rate_limit_wait': round(self.limiter.waited, 3),
+                'circuit': self.breaker.state,
+                'circuit_trips': self.breaker.trips,
+                'circuit_rejected': self.breaker.rejected,
+                'pool_size': self.pool_size,
+                'status_codes': dict(self.status_codes)
+            }
+
+
+class UpstreamResponse:
+    """비동기 호출 응답 (본문을 모두 읽은 뒤 requests.Response와 같은 속성으로 제공)
+
+    ttl은 공유 캐시에서 읽은 응답의 남은 유효 시간(초)이다 (원본 응답이면 None).
+    """
+
+    def __init__(self, status_code, content, encoding=None, ttl=None):
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding or 'utf-8'
+        self.ttl = ttl
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncUpstreamClient(UpstreamClient):
+    """asyncio용 클라이언트 (aiohttp)
+
+    호출 수 제한, 차단기, 통계는 동기 클라이언트와 공유해 같은 한도를 함께 쓴다.
+    """
+
+    def __init__(self, shared, pool_size=UPSTREAM_POOL_SIZE):
+        self._shared = shared
+        self.pool_size = pool_size
+        self.limiter = shared.limiter
+        self.breaker = shared.breaker
+        self.max_attempts = shared.max_attempts
+        self.deadline = shared.deadline
+        self.backoff = shared.backoff
+        self._session = None
+
+    def _count(self, name, amount=1):
+        self._shared._count(name, amount)
+
+    def _count_status(self, status):
+        self._shared._count_status(status)
+
+    def stats(self):
+        return self._shared.stats()
+
+    def _get_session(self):
+        # 세션은 실행 중인 이벤트 루프 안에서 처음 호출할 때 생성
+        if self._session is None:
+            import aiohttp
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size))
+        return self._session
+
+    async def _fetch(self, session, url, params, timeout):
+        import aiohttp
+
+        async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(
+            total=timeout[1], sock_connect=timeout[0]
+        )) as response:
+            return UpstreamResponse(response.status, await response.read(), response.charset)
+
+    async def _attempt(self, url, params, timeout, expires_at, max_attempts=None):
+        import asyncio
+
+        import aiohttp
+
+        session = self._get_session()
+        response = None
+        error = None
+        for attempt in range(1, (max_attempts or self.max_attempts) + 1):
+            if attempt > 1:
+                delay = self._retry_delay(attempt, expires_at)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+            try:
+                wait = self.limiter.reserve(expires_at)
+                if wait:
+                    await asyncio.sleep(wait)
+                remaining = expires_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._count('attempts')
+                response = await self._fetch(
+                    session, url, params, (min(timeout[0], remaining), min(timeout[1], remaining))
+                )
+                self._count_status(response.status_code)
+                error = None
+                if not is_transient(response):
+                    break
+            except UpstreamUnavailable as e:
+                error = e
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self._count_status('error')
+                error = e
+        return response, error
+
+    async def get(self, url, params=None, timeout=None, deadline=None, max_attempts=None):
+        import asyncio
+
+        timeout, expires_at = self._begin(timeout, deadline)
+        try:
+            response, error = await self._attempt(url, params, timeout, expires_at, max_attempts)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.failure()
+            raise
+        return self._finish(response, error)
+
+    async def aclose(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+client = UpstreamClient()
+async_client = AsyncUpstreamClient(client)
+
+
+def get(url, params=None, **kwargs):
+    return client.get(url, params=params, **kwargs)
+
+
+async def async_get(url, params=None, **kwargs):
+    return await async_client.get(url, params=params, **kwargs)
+
+
+def stats():
+    return client.stats()
+
+
+metrics.register_collector('upstream', stats, label='status')
@@ -0,0 +1,228 @@
+import base64
+import binascii
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import fastjson
+import local_search
+import metrics
+import registry
+from fetcher import FETCH_PAGE_SIZE, FETCH_WORKERS, extract_items, fetch_page
+
+# 큰 결과 구간(offset/limit) 조회 설정
+WINDOW_MAX_LIMIT = int(os.environ.get('WINDOW_MAX_LIMIT', '5000'))  # 한 번에 받을 수 있는 최대 건수
+WINDOW_PAGE_SIZE = int(os.environ.get('WINDOW_PAGE_SIZE', str(FETCH_PAGE_SIZE)))  # 원본 API 한 페이지 건수
+# 동시에 받는 페이지 수 (메모리에는 이 수만큼의 페이지만 올라옴)
+WINDOW_WORKERS = int(os.environ.get('WINDOW_WORKERS', str(FETCH_WORKERS)))
+
+CONTENT_TYPE = 'application/x-ndjson; charset=utf-8'
+
+# 구간 조회 요청임을 나타내는 파라미터 (하나라도 있으면 NDJSON 스트리밍으로 응답)
+WINDOW_PARAMS = ['offset', 'limit', 'cursor']
+
+# 원본 API로 보내는 검색 조건과 로컬 검색에만 쓰는 조건
+FILTER_PARAMS = ['hmcNm', 'siDoCd', 'siGunGuCd', 'locAddr', 'hmcRdatCd', 'hchType']
+FILTER_KEYS = FILTER_PARAMS + local_search.LOCAL_PARAMS
+
+
+def is_window_request(params):
+    return any(key in params for key in WINDOW_PARAMS)
+
+
+def encode_cursor(filters, offset):
+    """다음 구간을 가리키는 커서 (검색 조건과 시작 위치를 담은 base64url 문자열)"""
+    data = json.dumps({'f': filters, 'o': offset}, ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        filters, offset = data['f'], int(data['o'])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(filters, dict) or offset < 0:
+        raise ValueError("Invalid cursor")
+    return {key: str(value) for key, value in filters.items() if key in FILTER_KEYS}, offset
+
+
+def _int_param(params, key, default):
+    value = params.get(key)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {key}: {value}")
+
+
+def parse(params):
+    """구간 조회 파라미터: (검색 조건, offset, limit)
+
+    cursor가 있으면 커서의 검색 조건과 시작 위치를 쓰고, limit만 새로 받을 수 있다.
+    잘못된 값이면 ValueError.
+    """
+    if params.get('cursor'):
+        filters, offset = decode_cursor(params['cursor'])
+    else:
+        filters = {key: params[key] for key in FILTER_KEYS if params.get(key)}
+        offset = _int_param(params, 'offset', 0)
+    limit = _int_param(params, 'limit', WINDOW_PAGE_SIZE)
+    if offset < 0:
+        raise ValueError(f"Invalid offset: {offset}")
+    if not 1 <= limit <= WINDOW_MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {WINDOW_MAX_LIMIT}")
+    return filters, offset, limit
+
+
+def plan(offset, limit, total_count, page_size):
+    """구간에 필요한 페이지 목록: [(pageNo, 페이지 안 시작 위치, 건수), ...]"""
+    end = min(offset + limit, total_count)
+    pages = []
+    position = offset
+    while position < end:
+        page_no = position // page_size + 1
+        skip = position - (page_no - 1) * page_size
+        take = min(page_size - skip, end - position)
+        pages.append((page_no, skip, take))
+        position += take
+    return pages
+
+
+def _local_source(filters):
+    """로컬 데이터 조회 함수 (로컬로 처리할 수 없으면 None)"""
+    def fetch(page_no, num_of_rows):
+        data = local_search.query({**filters, 'pageNo': page_no, 'numOfRows': num_of_rows})
+        if data is None:
+            return None, None
+        return extract_items(data), int(data['response']['body'].get('totalCount', 0))
+    return fetch
+
+
+def _upstream_source(base_url, service_key, filters):
+    upstream_filters = {key: value for key, value in filters.items() if key in FILTER_PARAMS}
+
+    def fetch(page_no, num_of_rows):
+        return fetch_page(base_url, service_key, page_no, num_of_rows, upstream_filters)
+    return fetch
+
+
+class Window:
+    """offset부터 limit건을 원본 페이지 단위로 나눠 받아 순서대로 내보내는 구간 조회
+
+    첫 페이지는 open()에서 받아 전체 건수와 다음 커서를 먼저 알려 주고,
+    나머지 페이지는 동시에 받되(최대 workers개) 받은 순서가 아니라 페이지 순서대로 내보낸다.
+    """
+
+    def __init__(self, filters, offset, limit, fetch, workers, page_size=WINDOW_PAGE_SIZE):
+        self.filters = filters
+        self.offset = offset
+        self.limit = limit
+        self.fetch = fetch
+        self.workers = workers
+        self.page_size = page_size
+        self.total_count = 0
+        self.pages = []
+        self.first_items = None
+
+    def open(self):
+        """구간의 첫 페이지 조회 (실패하면 예외)"""
+        page_no = self.offset // self.page_size + 1
+        items, total_count = self.fetch(page_no, self.page_size)
+        if items is None:
+            raise Exception(f"Failed to fetch page {page_no}")
+        # 원본 API가 numOfRows를 제한하면 요청보다 적게 오므로 받은 건수를 페이지 크기로 다시 나눔
+        if items and len(items) < self.page_size and total_count > (page_no - 1) * self.page_size + len(items):
+            self.page_size = len(items)
+            page_no = self.offset // self.page_size + 1
+            items, total_count = self.fetch(page_no, self.page_size)
+            if items is None:
+                raise Exception(f"Failed to fetch page {page_no}")
+        self.total_count = total_count
+        self.pages = plan(self.offset, self.limit, total_count, self.page_size)
+        self.first_items = items
+        return self
+
+    @property
+    def count(self):
+        """이 구간에서 내보낼 건수"""
+        return sum(take for _, _, take in self.pages)
+
+    def next_cursor(self):
+        """다음 구간 커서 (마지막 구간이면 None)"""
+        next_offset = self.offset + self.count
+        if not self.count or next_offset >= self.total_count:
+            return None
+        return encode_cursor(self.filters, next_offset)
+
+    def headers(self):
+        headers = {'X-Total-Count': str(self.total_count)}
+        cursor = self.next_cursor()
+        if cursor is not None:
+            headers['X-Next-Cursor'] = cursor
+        return headers
+
+    def iter_pages(self):
+        """페이지별 병원 목록을 순서대로 생성 (실패한 페이지에서 예외)"""
+        if not self.pages:
+            return
+        page_no, skip, take = self.pages[0]
+        first, self.first_items = self.first_items, None
+        yield first[skip:skip + take]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pages = iter(self.pages[1:])
+            pending = deque()
+
+            def fill():
+                while len(pending) < self.workers:
+                    page = next(pages, None)
+                    if page is None:
+                        return
+                    pending.append((page, executor.submit(self.fetch, page[0], self.page_size)))
+
+            fill()
+            try:
+                while pending:
+                    (page_no, skip, take), future = pending.popleft()
+                    items, _ = future.result()
+                    if items is None:
+                        raise Exception(f"Failed to fetch page {page_no}")
+                    fill()
+                    yield items[skip:skip + take]
+            finally:
+                # 클라이언트가 끊었거나 실패하면 아직 시작하지 않은 페이지는 받지 않음
+                for _, future in pending:
+                    future.cancel()
+
+    def iter_ndjson(self):
+        """NDJSON 본문을 페이지 단위 청크로 생성
+
+        중간에 페이지를 받지 못하면 마지막 줄에 {"status": "error", ...}를 보내고 끝낸다.
+        """
+        try:
+            for items in self.iter_pages():
+                with metrics.span('serialize'):
+                    yield b''.join(fastjson.dumps(hospital) + b'\n' for hospital in items)
+        except Exception as e:
+            print(f"Window stream failed: {str(e)}")
+            yield fastjson.dumps({'status': 'error', 'message': str(e)}) + b'\n'
+
+
+def open_window(params, base_url, service_key):
+    """요청 파라미터로 구간 조회 시작 (로컬 데이터가 있으면 로컬, 없으면 원본 API 페이지를 동시에 조회)
+
+    잘못된 파라미터면 ValueError, 로컬 검색에만 있는 조건(LOCAL_PARAMS)을 처리할 데이터가 없으면
+    registry.NotReady (원본 API로는 조건을 뺀 결과가 나오므로), 첫 페이지를 받지 못하면 Exception.
+    """
+    filters, offset, limit = parse(params)
+    local = _local_source(filters)
+    if local(1, 1)[0] is not None:
+        # 로컬 조회는 CPU 작업이므로 동시에 실행하지 않음
+        return Window(filters, offset, limit, local, 1).open()
+    local_only = [key for key in local_search.LOCAL_PARAMS if filters.get(key)]
+    if local_only:
+        raise registry.NotReady(f"Local search data is not available for: {', '.join(local_only)}")
+    return Window(filters, offset, limit, _upstream_source(base_url, service_key, filters), WINDOW_WORKERS).open()